@@ -0,0 +1,113 @@
+# app/cancellation.py
+"""Cancelación del reporte cuando el cliente se desconecta.
+
+Si el usuario cierra la pestaña o vuelve a correr el reporte con otros filtros
+(el frontend aborta la petición anterior), antes la consulta seguía corriendo
+en SQL Server y después se seguía armando el resultado para nadie.
+
+La dependencia `CancelTokenDep` crea un `CancelToken` por petición y una tarea
+que espera el mensaje ASGI "http.disconnect". FastAPI ya leyó el cuerpo antes
+de resolver las dependencias, así que lo único que puede llegar después es la
+desconexión. Cuando el cliente se desconecta:
+
+- las consultas en curso registradas en el token se cancelan con
+  `cursor.cancel()` (fetch_all las registra al pasarle `cancel=`);
+- el procesamiento revisa el token cada CANCEL_CHECK_ROWS filas (`iter_rows`)
+  y se detiene; los exportadores de streaming dejan de recibir filas
+  (`stream_rows`).
+
+Si la respuesta aún no empezó, la petición termina con 499 (Client Closed
+Request), que queda en el log y en el historial de consultas (query_stats.py).
+"""
+
+import asyncio
+import os
+import threading
+from typing import Annotated, Iterable, Iterator
+
+import pyodbc
+from fastapi import Depends, HTTPException, Request
+
+CANCEL_CHECK_ROWS = int(os.getenv("CANCEL_CHECK_ROWS", "5000"))
+
+# No es estándar HTTP (nginx); el cliente ya no está para leerla
+CLIENT_CLOSED_REQUEST = 499
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._cursors = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Marca el token y cancela las consultas en curso. Se puede llamar desde otro hilo."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except pyodbc.Error:
+                pass
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+    def register(self, cursor) -> None:
+        with self._lock:
+            self._cursors.add(cursor)
+        # Si se canceló justo antes de registrar, no se llega a ejecutar
+        self.check()
+
+    def unregister(self, cursor) -> None:
+        with self._lock:
+            self._cursors.discard(cursor)
+
+    def iter_rows(self, rows: Iterable, every: int = CANCEL_CHECK_ROWS) -> Iterator:
+        """Recorre las filas revisando el token cada `every` filas."""
+        for i, row in enumerate(rows):
+            if not i % every:
+                self.check()
+            yield row
+
+    def stream_rows(self, rows: Iterable, every: int = CANCEL_CHECK_ROWS) -> Iterator:
+        """
+        Igual que iter_rows pero para exportadores de streaming: la respuesta ya
+        empezó, así que al cancelar simplemente deja de entregar filas.
+        """
+        for i, row in enumerate(rows):
+            if not i % every and self._event.is_set():
+                return
+            yield row
+
+
+async def _watch_disconnect(request: Request, token: CancelToken) -> None:
+    # request.is_disconnected() solo mira si ya hay un mensaje disponible, sin
+    # esperarlo; aquí se espera hasta que llegue.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            # cursor.cancel() hace un viaje al servidor: fuera del event loop
+            await asyncio.to_thread(token.cancel)
+            return
+
+
+async def get_cancel_token(request: Request):
+    """Dependencia de FastAPI: token que se cancela si el cliente se desconecta."""
+    token = CancelToken()
+    watcher = asyncio.create_task(_watch_disconnect(request, token))
+    try:
+        yield token
+    finally:
+        watcher.cancel()
+
+
+CancelTokenDep = Annotated[CancelToken, Depends(get_cancel_token)]
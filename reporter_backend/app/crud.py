@@ -1,10 +1,8 @@
 # reporter_backend/app/crud.py
 from sqlalchemy.orm import Session
 from . import models, schemas
-from passlib.context import CryptContext
-
-# Configuración de hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .passwords import get_password_hash
+from .principals import invalidate_user
 
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -12,8 +10,10 @@ def get_user(db: Session, user_id: int):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str | None = None):
+    # Los endpoints async pasan el hash ya calculado fuera del event loop
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         hashed_password=hashed_password,
@@ -32,8 +32,10 @@ def create_user(db: Session, user: schemas.UserCreate):
 def delete_user(db: Session, user_id: int):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
+        username = user.username
         db.delete(user)
         db.commit()
+        invalidate_user(username)
         return True
     return False
 
@@ -43,6 +45,7 @@ def update_user_role(db: Session, user_id: int, is_admin: bool):
         user.is_admin = is_admin
         db.commit()
         db.refresh(user)
+        invalidate_user(user.username)
     return user
 
 def update_user_status(db: Session, user_id: int, is_active: bool):
@@ -52,6 +55,7 @@ def update_user_status(db: Session, user_id: int, is_active: bool):
         user.is_active = is_active
         db.commit()
         db.refresh(user)
+        invalidate_user(user.username)
     return user
 
 def update_user_profile(db: Session, user_id: int, first_name: str, last_name: str):
@@ -62,13 +66,15 @@ def update_user_profile(db: Session, user_id: int, first_name: str, last_name: s
         user.last_name = last_name
         db.commit()
         db.refresh(user)
+        invalidate_user(user.username)
     return user
 
 def update_user_password(db: Session, user_id: int, new_password: str):
     """Cambiar contraseña de un usuario"""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
-        user.hashed_password = pwd_context.hash(new_password)
+        user.hashed_password = get_password_hash(new_password)
         db.commit()
         db.refresh(user)
+        invalidate_user(user.username)
     return user
\ No newline at end of file
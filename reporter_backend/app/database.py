@@ -1,8 +1,9 @@
 # app/database.py
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import os
 
+from .storage import create_sqlite_engine, LastLoginBuffer
+
 # Define la URL de la base de datos.
 # Usará un archivo llamado 'reporter.db' en la carpeta raíz (reporter_backend)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -10,9 +11,11 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///" + os.path.join(BASE_DIR, "reporter.db")
 
 # Crea el "motor" de SQLAlchemy
 # check_same_thread=False es necesario solo para SQLite.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# WAL, PRAGMAs y pool de conexiones: ver app/storage.py
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
+
+# Los logins registran last_login aquí; se escribe a la BD por lotes
+last_login_buffer = LastLoginBuffer(engine)
 
 # Crea una "Sesión" que usaremos para hablar con la base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -4,16 +4,20 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 from fastapi import HTTPException
+import asyncio
 import datetime
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 # Importamos los NUEVOS routers
 from . import security, models
 from . import companies
-from .reports import receivables
-from .database import engine
+from . import scheduler
+from .reports import receivables, exports, diagnostics, statements
+from .database import engine, last_login_buffer
+from .sql_server_conn import sql_pool
 
 # --- Configuración de Logging (¡La dejamos!) ---
 log_path = os.getenv("LOG_FILE_PATH", "api_debug.log")  # Y ahora usa esa variable en lugar del texto fijo
@@ -30,7 +34,35 @@ log = logging.getLogger(__name__)
 
 # --- Creación de la App ---
 models.Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Reporting App API", version="0.1.0")
+
+def _log_task_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.error(f"[API] Background task {task.get_name()} failed: {task.exception()!r}", exc_info=task.exception())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up programado de la vista por defecto del dashboard (ver app/scheduler.py)
+    if scheduler.WARMUP_ENABLED:
+        scheduler.scheduler.start()
+    # Escritura periódica de last_login (ver app/storage.py)
+    last_login_buffer.start()
+    # Precarga opcional de openpyxl/reportlab sin retrasar el arranque (ver app/reports/exports.py)
+    warmup_formats = exports.warm_up_keys_from_env()
+    warmup_task = None
+    if warmup_formats:
+        warmup_task = asyncio.create_task(asyncio.to_thread(exports.warm_up, warmup_formats), name="export-warm-up")
+        warmup_task.add_done_callback(_log_task_failure)
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    await scheduler.scheduler.stop()
+    await last_login_buffer.stop()
+    sql_pool.close_all()
+    # Procesos que generan los estados de cuenta en lote (ver app/reports/statements.py)
+    statements.shutdown_pool()
+
+app = FastAPI(title="Reporting App API", version="0.1.0", lifespan=lifespan)
 
 # --- Middlewares (CORS y Logging) ---
 app.add_middleware(
@@ -86,6 +118,9 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
 app.include_router(security.router, prefix="/api") # Incluye /api/token, /api/users, etc.
 app.include_router(companies.router, prefix="/api") # Incluye /api/companies
 app.include_router(receivables.router, prefix="/api/reports") # Incluye /api/reports/...
+app.include_router(diagnostics.router, prefix="/api/reports") # Incluye /api/reports/diagnostics/... (solo admins)
+app.include_router(statements.router, prefix="/api/reports") # Incluye /api/reports/receivables-statements
+app.include_router(scheduler.router, prefix="/api") # Incluye /api/scheduler/... (solo admins)
 
 # --- Endpoints de la Raíz ---
 @app.get("/")
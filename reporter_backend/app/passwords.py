@@ -0,0 +1,227 @@
+# app/passwords.py
+"""Hashing y verificación de contraseñas (bcrypt) fuera del event loop.
+
+bcrypt es lento a propósito (~250 ms con el costo por defecto). Los endpoints
+`async def` de login y registro lo llamaban directamente, bloqueando el event
+loop y con él todas las peticiones concurrentes. Aquí:
+
+- El trabajo de bcrypt corre en un ThreadPoolExecutor acotado
+  (PASSWORD_HASH_WORKERS hilos). Si hay más de PASSWORD_HASH_MAX_PENDING
+  operaciones en espera se responde 503 en lugar de encolar sin límite.
+- Las verificaciones exitosas se recuerdan PASSWORD_VERIFY_CACHE_TTL segundos,
+  de modo que los re-login del mismo usuario (cambio de turno, varias pestañas)
+  no vuelven a pagar bcrypt. La clave es un HMAC con un secreto aleatorio del
+  proceso; nunca se guarda la contraseña en claro. Como la clave incluye el hash
+  guardado, cambiar la contraseña invalida la entrada automáticamente.
+- Los intentos fallidos se limitan por usuario e IP (LOGIN_MAX_FAILURES en
+  LOGIN_FAILURE_WINDOW segundos) y por IP (LOGIN_MAX_FAILURES_PER_IP) para
+  cortar ráfagas antes de llegar a bcrypt. Como la IP es parte de la clave,
+  fallar a propósito con el nombre de otro usuario no le bloquea la cuenta
+  desde su propio equipo.
+- El costo (rounds) es configurable con BCRYPT_ROUNDS y ajustable por un admin
+  en tiempo de ejecución (solo para este proceso). Los hashes con otro costo se
+  siguen verificando y se re-hashean con el costo actual en el siguiente login.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Hashable, List, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .reports.report_cache import ResultCache
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 15
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_VERIFY_CACHE_TTL = float(os.getenv("PASSWORD_VERIFY_CACHE_TTL", "600"))
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+# Fallidos desde una misma IP con cualquier usuario (quien prueba muchos nombres)
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "50"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_pending_lock = threading.Lock()
+
+_cache_secret = secrets.token_bytes(32)
+_verify_cache = ResultCache(ttl=PASSWORD_VERIFY_CACHE_TTL, max_entries=1024)
+
+
+# --- Costo (rounds) ---
+def current_rounds() -> int:
+    return pwd_context.to_dict()["bcrypt__rounds"]
+
+
+def set_rounds(rounds: int) -> int:
+    """Cambia el costo de bcrypt para los hashes nuevos de este proceso."""
+    if not BCRYPT_MIN_ROUNDS <= rounds <= BCRYPT_MAX_ROUNDS:
+        raise ValueError(f"bcrypt rounds must be between {BCRYPT_MIN_ROUNDS} and {BCRYPT_MAX_ROUNDS}")
+    pwd_context.update(bcrypt__rounds=rounds)
+    return rounds
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Costo con el que se generó un hash bcrypt ('$2b$12$...' -> 12)."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_rounds(hashed_password) != current_rounds()
+
+
+# --- Versiones síncronas (scripts y endpoints `def`) ---
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _cache_key(plain_password: str, hashed_password: str) -> bytes:
+    return hmac.new(
+        _cache_secret, f"{hashed_password}\0{plain_password}".encode("utf-8"), hashlib.sha256
+    ).digest()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    key = _cache_key(plain_password, hashed_password)
+    if _verify_cache.get(key):
+        return True
+    ok = pwd_context.verify(plain_password, hashed_password)
+    if ok:
+        _verify_cache.put(key, True)
+    return ok
+
+
+# --- Versiones async: corren bcrypt en el executor acotado ---
+async def _run_bounded(func, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    # Acierto en caché: no hace falta ir al executor
+    if _verify_cache.get(_cache_key(plain_password, hashed_password)):
+        return True
+    return await _run_bounded(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_bounded(get_password_hash, password)
+
+
+# --- Límite de intentos fallidos por usuario e IP ---
+class LoginRateLimiter:
+    def __init__(
+        self,
+        max_failures: int = LOGIN_MAX_FAILURES,
+        window: float = LOGIN_FAILURE_WINDOW,
+        max_failures_per_ip: int = LOGIN_MAX_FAILURES_PER_IP
+    ):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_failures_per_ip = max_failures_per_ip
+        # (usuario, ip) -> intentos y ip -> intentos
+        self._failures: Dict[Hashable, Deque[float]] = {}
+        self._ip_failures: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, failures: Dict[Hashable, Deque[float]], key: Hashable, now: float) -> Deque[float]:
+        attempts = failures.get(key)
+        if attempts is None:
+            return deque()
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del failures[key]
+        return attempts
+
+    def _reject(self, attempts: Deque[float], now: float) -> None:
+        retry_after = int(attempts[0] + self.window - now) + 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def check(self, username: str, client_ip: str) -> None:
+        """Lanza 429 si el usuario desde esa IP, o la IP, ya agotó sus intentos dentro de la ventana."""
+        now = time.monotonic()
+        with self._lock:
+            if self.max_failures > 0:
+                attempts = self._recent(self._failures, (username.lower(), client_ip), now)
+                if len(attempts) >= self.max_failures:
+                    self._reject(attempts, now)
+            if self.max_failures_per_ip > 0:
+                attempts = self._recent(self._ip_failures, client_ip, now)
+                if len(attempts) >= self.max_failures_per_ip:
+                    self._reject(attempts, now)
+
+    def record_failure(self, username: str, client_ip: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._failures.setdefault((username.lower(), client_ip), deque()).append(now)
+            self._ip_failures.setdefault(client_ip, deque()).append(now)
+
+    def reset(self, username: str, client_ip: str) -> None:
+        """Login correcto: borra los fallidos de ese usuario desde esa IP (no los de la IP con otros usuarios)."""
+        with self._lock:
+            self._failures.pop((username.lower(), client_ip), None)
+
+
+login_limiter = LoginRateLimiter()
+
+
+# --- Benchmark del costo ---
+def benchmark_rounds(rounds_list: List[int], samples: int = 3) -> List[dict]:
+    """Mide el tiempo de hash y verificación para cada costo (bloqueante)."""
+    results = []
+    for rounds in rounds_list:
+        ctx = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hash_ms, verify_ms = [], []
+        for _ in range(samples):
+            t0 = time.perf_counter()
+            hashed = ctx.hash("benchmark-password")
+            t1 = time.perf_counter()
+            ctx.verify("benchmark-password", hashed)
+            t2 = time.perf_counter()
+            hash_ms.append((t1 - t0) * 1000)
+            verify_ms.append((t2 - t1) * 1000)
+        verify_avg = sum(verify_ms) / samples
+        results.append({
+            "rounds": rounds,
+            "hash_ms": round(sum(hash_ms) / samples, 1),
+            "verify_ms": round(verify_avg, 1),
+            # Logins por segundo que aguanta el executor sin caché
+            "logins_per_second": round(PASSWORD_HASH_WORKERS * 1000 / verify_avg, 1) if verify_avg else None,
+        })
+    return results
+
+
+async def benchmark_rounds_async(rounds_list: List[int], samples: int = 3) -> List[dict]:
+    return await _run_bounded(benchmark_rounds, rounds_list, samples)
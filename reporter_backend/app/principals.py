@@ -0,0 +1,52 @@
+# app/principals.py
+"""Caché en memoria del usuario autenticado (principal) por token.
+
+`get_current_user` decodificaba el JWT y luego consultaba SQLite en cada
+petición autenticada (incluida cada descarga de reporte). Con esta caché, la
+consulta se hace una vez por (usuario, jti del token) y se reutiliza durante
+PRINCIPAL_CACHE_TTL segundos.
+
+Para que desactivar, borrar o cambiar el rol/contraseña de un usuario tenga
+efecto inmediato, las funciones de crud.py llaman a `invalidate_user` después
+del commit. La caché es por proceso: con varios workers, los demás ven el
+cambio al expirar el TTL (por eso es corto).
+"""
+
+import os
+from typing import Optional
+
+from . import models
+from .reports.report_cache import ResultCache
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "1024"))
+
+principal_cache = ResultCache(ttl=PRINCIPAL_CACHE_TTL, max_entries=PRINCIPAL_CACHE_MAX_ENTRIES)
+
+# Columnas que se copian al principal desconectado de la sesión
+_USER_FIELDS = ("id", "username", "hashed_password", "first_name", "last_name", "is_active", "is_admin", "last_login")
+
+
+def snapshot_user(user: models.User) -> models.User:
+    """
+    Copia del usuario sin sesión de SQLAlchemy, para poder compartirla entre
+    peticiones e hilos sin que una sesión cerrada la expire.
+    """
+    return models.User(**{f: getattr(user, f) for f in _USER_FIELDS})
+
+
+def get_principal(username: str, token_id: str) -> Optional[models.User]:
+    return principal_cache.get((username, token_id))
+
+
+def put_principal(username: str, token_id: str, user: models.User) -> models.User:
+    principal = snapshot_user(user)
+    principal_cache.put((username, token_id), principal)
+    return principal
+
+
+def invalidate_user(username: Optional[str]) -> int:
+    """Descarta los principals en caché de un usuario (todos sus tokens)."""
+    if not username:
+        return 0
+    return principal_cache.invalidate(lambda key: key[0] == username)
@@ -0,0 +1,115 @@
+# app/query_stats.py
+"""Historial acotado de las consultas a SQL Server.
+
+`fetch_all` y `fetch_batch` (sql_server_conn.py) registran aquí cada consulta:
+nombre lógico (ej. "receivables_report.upto.slim" o "customer_list", ver
+reports/query_catalog.py), empresa, tiempo de ejecución
+(cursor.execute), tiempo de lectura (fetchall) y filas devueltas. Se guardan
+las últimas QUERY_HISTORY_SIZE ejecuciones más un acumulado por
+(empresa, nombre), que no crece con el tráfico.
+
+Las capturas de diagnóstico (STATISTICS IO/TIME y plan estimado en XML, ver
+app/reports/diagnostics.py) se guardan aparte y en menor cantidad
+(QUERY_CAPTURE_HISTORY_SIZE) porque el XML del plan es grande.
+"""
+
+import datetime
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+QUERY_HISTORY_SIZE = int(os.getenv("QUERY_HISTORY_SIZE", "500"))
+QUERY_CAPTURE_HISTORY_SIZE = int(os.getenv("QUERY_CAPTURE_HISTORY_SIZE", "20"))
+
+
+class QueryStats:
+    def __init__(self, size: int = QUERY_HISTORY_SIZE, capture_size: int = QUERY_CAPTURE_HISTORY_SIZE):
+        self._history: Deque[dict] = deque(maxlen=size)
+        self._captures: Deque[dict] = deque(maxlen=capture_size)
+        # (empresa, nombre) -> [ejecuciones, errores, total_ms, max_ms, filas]
+        self._totals: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        name: str,
+        company: Optional[str],
+        exec_ms: float,
+        fetch_ms: float,
+        rows: int,
+        error: Optional[str] = None
+    ) -> None:
+        total_ms = exec_ms + fetch_ms
+        entry = {
+            "name": name,
+            "company": company,
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "exec_ms": round(exec_ms, 2),
+            "fetch_ms": round(fetch_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "rows": rows,
+            "error": error,
+        }
+        key = (company or "", name)
+        with self._lock:
+            self._history.append(entry)
+            agg = self._totals.get(key)
+            if agg is None:
+                agg = self._totals[key] = [0, 0, 0.0, 0.0, 0]
+            agg[0] += 1
+            agg[1] += 1 if error else 0
+            agg[2] += total_ms
+            agg[3] = max(agg[3], total_ms)
+            agg[4] += rows
+
+    def recent(self, limit: int = 50, company: Optional[str] = None, name: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            items = list(self._history)
+        items = [
+            e for e in reversed(items)
+            if (company is None or e["company"] == company) and (name is None or e["name"] == name)
+        ]
+        return items[:limit]
+
+    def slowest(self, limit: int = 20, company: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            items = [e for e in self._history if company is None or e["company"] == company]
+        return sorted(items, key=lambda e: e["total_ms"], reverse=True)[:limit]
+
+    def summary(self) -> List[dict]:
+        with self._lock:
+            totals = list(self._totals.items())
+        result = [
+            {
+                "company": company or None,
+                "name": name,
+                "executions": n,
+                "errors": errors,
+                "avg_ms": round(total / n, 2) if n else 0.0,
+                "max_ms": round(max_ms, 2),
+                "avg_rows": round(rows / n, 1) if n else 0.0,
+            }
+            for (company, name), (n, errors, total, max_ms, rows) in totals
+        ]
+        return sorted(result, key=lambda r: r["avg_ms"] * r["executions"], reverse=True)
+
+    def add_capture(self, capture: dict) -> None:
+        with self._lock:
+            self._captures.append(capture)
+
+    def captures(self, include_plan: bool = False) -> List[dict]:
+        with self._lock:
+            items = list(self._captures)
+        if include_plan:
+            return list(reversed(items))
+        return [{k: v for k, v in c.items() if k != "plan_xml"} for c in reversed(items)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._history.clear()
+            self._captures.clear()
+            self._totals.clear()
+
+
+query_stats = QueryStats()
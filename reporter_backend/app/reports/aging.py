@@ -0,0 +1,162 @@
+# app/reports/aging.py
+"""Esquemas de antigüedad de saldos (aging buckets).
+
+Un esquema define los límites de cada rango (bucket) y la fecha base con la que
+se calculan los días: llegada (arrival), vencimiento (due) o factura (invoice).
+
+Los límites son superiores e inclusivos: (21, 30, 45) produce los rangos
+"0-21", "22-30", "31-45" y "45+". Los días <= 0 siempre caen en "Not Due".
+
+Cada esquema se "compila" una sola vez a un `Bucketer`, que asigna el rango
+con una búsqueda binaria (bisect) sobre los límites, de modo que el
+procesamiento del reporte clasifica cada fila en una sola pasada.
+"""
+
+import bisect
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+NOT_DUE_LABEL = "Not Due"
+NOT_DUE_KEY = "not_yet_due"
+
+# Campos fijos de AgingSummary que corresponden al esquema "standard"
+LEGACY_BUCKET_FIELDS = ("bucket_0_21", "bucket_22_30", "bucket_31_45", "bucket_45_plus")
+
+# Fecha contra la que se miden los días de antigüedad
+AGING_BASES = ("arrival", "due", "invoice")
+
+# Máximo de límites por esquema: cada rango es una columna más en el resumen
+# del Excel y del PDF
+MAX_AGING_BOUNDARIES = 24
+
+
+@dataclass(frozen=True)
+class AgingScheme:
+    key: str
+    name: str
+    boundaries: Tuple[int, ...]
+    basis: str = "arrival"
+
+    @property
+    def labels(self) -> List[str]:
+        """Etiquetas de los rangos vencidos, ej. ['0-21', '22-30', '31-45', '45+']."""
+        labels = []
+        lower = 0
+        for upper in self.boundaries:
+            labels.append(f"{lower}-{upper}")
+            lower = upper + 1
+        labels.append(f"{self.boundaries[-1]}+")
+        return labels
+
+    @property
+    def bucket_keys(self) -> List[str]:
+        """Claves estables de cada rango, ej. 'bucket_0_21', 'bucket_45_plus'."""
+        return [
+            "bucket_" + label.replace("-", "_").replace("+", "_plus")
+            for label in self.labels
+        ]
+
+    def compile(self) -> "Bucketer":
+        return _compile(self)
+
+    def with_overrides(
+        self,
+        basis: Optional[str] = None,
+        boundaries: Optional[Sequence[int]] = None
+    ) -> "AgingScheme":
+        """
+        Copia con otra fecha base y/o otros límites. La clave y el nombre dicen
+        lo que cambió ("custom" con límites propios, "<clave>@<base>" con otra
+        base), para no confundirse con el esquema original en la respuesta ni en
+        los documentos.
+        """
+        basis = basis or self.basis
+        if basis == self.basis and not boundaries:
+            return self
+        new_bounds = tuple(boundaries) if boundaries else self.boundaries
+        key = self.key if not boundaries else "custom"
+        name = self.name if not boundaries else "Custom"
+        if basis != self.basis:
+            key = f"{key}@{basis}"
+            name = f"{name} by {basis} date"
+        return make_scheme(key, name, new_bounds, basis)
+
+
+class Bucketer:
+    """
+    Versión "compilada" de un esquema. `index(days)` devuelve la posición del
+    rango: 0 = Not Due, 1..n = rangos vencidos en orden.
+    """
+    __slots__ = ("scheme", "labels", "keys", "bounds")
+
+    def __init__(self, scheme: AgingScheme):
+        self.scheme = scheme
+        # El 0 inicial separa "Not Due" (días <= 0) del primer rango vencido.
+        self.bounds = (0,) + tuple(scheme.boundaries)
+        self.labels = (NOT_DUE_LABEL,) + tuple(scheme.labels)
+        self.keys = (NOT_DUE_KEY,) + tuple(scheme.bucket_keys)
+
+    def index(self, days: int) -> int:
+        return bisect.bisect_left(self.bounds, days)
+
+    def label(self, days: int) -> str:
+        return self.labels[bisect.bisect_left(self.bounds, days)]
+
+
+@lru_cache(maxsize=64)
+def _compile(scheme: AgingScheme) -> Bucketer:
+    return Bucketer(scheme)
+
+
+def make_scheme(key: str, name: str, boundaries: Sequence[int], basis: str = "arrival") -> AgingScheme:
+    """Valida y construye un esquema. Lanza ValueError si la definición no es válida."""
+    bounds = tuple(int(b) for b in boundaries)
+    if not bounds:
+        raise ValueError("Aging scheme needs at least one boundary.")
+    if len(bounds) > MAX_AGING_BOUNDARIES:
+        raise ValueError(f"Aging scheme allows at most {MAX_AGING_BOUNDARIES} boundaries.")
+    if bounds[0] <= 0:
+        raise ValueError("Aging boundaries must be positive day counts.")
+    if any(b <= a for a, b in zip(bounds, bounds[1:])):
+        raise ValueError("Aging boundaries must be strictly increasing.")
+    if basis not in AGING_BASES:
+        raise ValueError(f"Invalid aging basis '{basis}'. Allowed: {', '.join(AGING_BASES)}")
+    return AgingScheme(key=key, name=name, boundaries=bounds, basis=basis)
+
+
+# --- Catálogo de esquemas ---
+# "standard" es el esquema histórico del reporte (0-21 / 22-30 / 31-45 / 45+).
+AGING_SCHEMES: Dict[str, AgingScheme] = {
+    "standard": make_scheme("standard", "Standard (21/30/45)", (21, 30, 45)),
+    "monthly": make_scheme("monthly", "Monthly (30/60/90)", (30, 60, 90)),
+    "due_monthly": make_scheme("due_monthly", "Monthly by Due Date (30/60/90)", (30, 60, 90), basis="due"),
+}
+
+# Esquemas adicionales desde el entorno, en JSON:
+#   AGING_SCHEMES='{"weekly": {"name": "Weekly", "boundaries": [7, 14, 21, 28], "basis": "due"}}'
+_extra = os.getenv("AGING_SCHEMES")
+if _extra:
+    for _key, _spec in json.loads(_extra).items():
+        AGING_SCHEMES[_key] = make_scheme(
+            _key, _spec.get("name", _key), _spec["boundaries"], _spec.get("basis", "arrival")
+        )
+
+DEFAULT_AGING_SCHEME = "standard"
+
+
+def get_scheme(key: Optional[str]) -> AgingScheme:
+    scheme = AGING_SCHEMES.get(key or DEFAULT_AGING_SCHEME)
+    if scheme is None:
+        allowed = ", ".join(AGING_SCHEMES.keys())
+        raise ValueError(f"Unknown aging scheme '{key}'. Allowed: {allowed}")
+    return scheme
+
+
+def list_schemes() -> List[dict]:
+    return [
+        {"key": s.key, "name": s.name, "basis": s.basis, "boundaries": list(s.boundaries), "labels": s.labels}
+        for s in AGING_SCHEMES.values()
+    ]
@@ -0,0 +1,229 @@
+# app/reports/artifact_cache.py
+"""Caché en disco de los documentos ya generados (Excel, PDF, HTML).
+
+Generar un documento cuesta mucho más que leer los datos (el Excel de 5k
+documentos tarda segundos en openpyxl) y antes se volvía a generar en cada
+descarga aunque los datos no hubieran cambiado.
+
+Cada documento se identifica por el contenido que lo produce
+(`artifact_fingerprint`): los datos ya procesados por moneda, los filtros, el
+crédito del cliente, el esquema de antigüedad, el formato y la versión del
+generador (fecha y tamaño de su archivo .py). Si cualquiera cambia, la huella
+es otra; por eso no hace falta invalidar nada, las versiones viejas solo dejan
+de pedirse y salen por LRU.
+
+Los archivos se guardan en ARTIFACT_CACHE_DIR/<empresa>/<huella>.<ext> y se
+sirven con FileResponse: se leen del disco por bloques (o con sendfile si el
+servidor ASGI soporta "http.response.pathsend") en lugar de armar la
+respuesta en memoria, con ETag = huella y soporte de Range / If-Range.
+
+El tamaño total se limita a ARTIFACT_CACHE_MAX_MB: se borran primero los
+archivos usados hace más tiempo (la fecha de modificación se actualiza en cada
+acierto). Lo usado en los últimos ARTIFACT_CACHE_GRACE_SECONDS no se borra
+porque puede haber una descarga leyéndolo. El directorio puede ser compartido
+por varios workers del mismo equipo.
+
+ARTIFACT_CACHE_DIR vacío desactiva la caché (se genera en cada descarga, como antes).
+"""
+
+import hashlib
+import inspect
+import io
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from .aging import AgingScheme
+from .exports import ExportFormat
+from .report_schemas import CurrencyGroup, CustomerCreditInfo, ReportFilters
+
+log = logging.getLogger(__name__)
+
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "artifact_cache")
+ARTIFACT_CACHE_MAX_MB = float(os.getenv("ARTIFACT_CACHE_MAX_MB", "1024"))
+ARTIFACT_CACHE_GRACE_SECONDS = float(os.getenv("ARTIFACT_CACHE_GRACE_SECONDS", "120"))
+
+# No se actualiza la fecha del archivo en cada acierto (sería una escritura por descarga)
+_TOUCH_SECONDS = 60.0
+# Temporales de una generación que murió a medio camino
+_STALE_TMP_SECONDS = 3600.0
+
+_groups_adapter = TypeAdapter(Dict[str, CurrencyGroup])
+_builder_stamps: Dict[str, str] = {}
+
+
+def _builder_stamp(fmt: ExportFormat) -> str:
+    """Versión del generador: cambia al desplegar un report_builder.py distinto."""
+    stamp = _builder_stamps.get(fmt.builder)
+    if stamp is None:
+        source = inspect.getsourcefile(fmt.load())
+        st = os.stat(source)
+        stamp = _builder_stamps[fmt.builder] = f"{fmt.builder}:{st.st_mtime_ns}:{st.st_size}"
+    return stamp
+
+
+def artifact_fingerprint(
+    fmt: ExportFormat,
+    data: Dict[str, CurrencyGroup],
+    filters: ReportFilters,
+    credit_info: Optional[CustomerCreditInfo],
+    scheme: AgingScheme
+) -> str:
+    """Huella (hex de 32) de todo lo que entra al generador del documento."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_builder_stamp(fmt).encode("utf-8"))
+    h.update(repr(scheme).encode("utf-8"))
+    h.update(filters.model_dump_json().encode("utf-8"))
+    h.update(credit_info.model_dump_json().encode("utf-8") if credit_info is not None else b"-")
+    h.update(_groups_adapter.dump_json(data))
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = int(ARTIFACT_CACHE_MAX_MB * 1_048_576),
+        grace_seconds: float = ARTIFACT_CACHE_GRACE_SECONDS
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self._lock = threading.Lock()
+        self._rendering: Dict[str, threading.Lock] = {}
+        self._evict_lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def path_for(self, company_key: str, name: str) -> str:
+        return os.path.join(self.root, company_key, name)
+
+    def get(self, company_key: str, name: str) -> Optional[Tuple[str, os.stat_result]]:
+        """(ruta, stat) del documento guardado, o None."""
+        path = self.path_for(company_key, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if now - st.st_mtime > _TOUCH_SECONDS:
+            try:
+                os.utime(path, (now, now))
+                st = os.stat(path)
+            except FileNotFoundError:
+                return None
+        return path, st
+
+    def put(self, company_key: str, name: str, content: io.BytesIO) -> Tuple[str, os.stat_result]:
+        path = self.path_for(company_key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Se escribe a un temporal y se renombra: otro worker nunca ve un archivo a medias
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content.getbuffer())
+        os.replace(tmp, path)
+        self._evict()
+        return path, os.stat(path)
+
+    def get_or_render(
+        self,
+        company_key: str,
+        name: str,
+        render: Callable[[], io.BytesIO]
+    ) -> Tuple[str, os.stat_result]:
+        """Documento guardado o generado con `render`; una sola generación por documento a la vez."""
+        found = self.get(company_key, name)
+        if found is not None:
+            self.hits += 1
+            return found
+
+        lock_key = f"{company_key}/{name}"
+        with self._lock:
+            render_lock = self._rendering.setdefault(lock_key, threading.Lock())
+        with render_lock:
+            try:
+                # Otro hilo pudo haberlo generado mientras esperábamos
+                found = self.get(company_key, name)
+                if found is not None:
+                    self.hits += 1
+                    return found
+                self.misses += 1
+                t0 = time.perf_counter()
+                content = render()
+                found = self.put(company_key, name, content)
+                log.info(f"[ARTIFACT] Rendered {company_key}/{name} ({found[1].st_size / 1024:.0f} KB) "
+                         f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+                return found
+            finally:
+                with self._lock:
+                    self._rendering.pop(lock_key, None)
+
+    def _files(self):
+        """(ruta, stat) de cada archivo del directorio."""
+        try:
+            companies = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+        for company in companies:
+            if not company.is_dir():
+                continue
+            for entry in os.scandir(company.path):
+                try:
+                    yield entry.path, entry.stat()
+                except FileNotFoundError:
+                    continue
+
+    def _evict(self) -> None:
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            files = []
+            total = 0
+            for path, st in self._files():
+                if path.endswith(".tmp"):
+                    if now - st.st_mtime > _STALE_TMP_SECONDS:
+                        self._remove(path)
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+            # Los menos usados primero, hasta quedar en 90% del límite (para no evictar en cada put)
+            target = self.max_bytes * 0.9
+            for mtime, size, path in sorted(files):
+                if total <= target:
+                    break
+                if now - mtime < self.grace_seconds:
+                    break
+                if self._remove(path):
+                    total -= size
+                    self.evictions += 1
+        finally:
+            self._evict_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stats(self) -> dict:
+        files = [st.st_size for path, st in self._files() if not path.endswith(".tmp")]
+        return {
+            "path": os.path.abspath(self.root),
+            "max_mb": round(self.max_bytes / 1_048_576, 1),
+            "files": len(files),
+            "mb": round(sum(files) / 1_048_576, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+artifact_cache: Optional[ArtifactCache] = ArtifactCache(ARTIFACT_CACHE_DIR) if ARTIFACT_CACHE_DIR else None
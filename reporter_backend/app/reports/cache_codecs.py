@@ -0,0 +1,139 @@
+# app/reports/cache_codecs.py
+"""Codificación binaria compacta de los valores de caché que se comparten entre workers.
+
+Cada codec convierte el valor en estructuras simples (tuplas, listas, números,
+texto, fechas), las serializa con pickle y las comprime con zlib (nivel 1:
+rápido; los datos de reporte son muy repetitivos y comprimen bien).
+
+- RowsCodec: filas crudas de SQL en forma columnar (nombres + una lista por
+  columna). Al decodificar se vuelven namedtuples: mismo acceso por atributo
+  e índice que pyodbc.Row.
+- CurrencyGroupsCodec: Dict[str, CurrencyGroup] ya procesado; los documentos
+  (ReceivableEntry) también van por columnas y se reconstruyen con
+  model_construct (sin volver a validar).
+- ModelCodec: cualquier otro modelo Pydantic (KPIs, crédito del cliente).
+- PlainCodec: listas y diccionarios simples (lista de clientes).
+
+Al leer solo se permiten los tipos que escriben estos codecs (fechas, Decimal y
+tipos básicos), no objetos arbitrarios.
+"""
+
+import datetime
+import decimal
+import io
+import pickle
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel
+
+from .report_schemas import CurrencyGroup, ReceivableEntry, AgingSummary
+
+_ALLOWED = {
+    ("datetime", "date"), ("datetime", "datetime"), ("datetime", "time"), ("datetime", "timedelta"),
+    ("decimal", "Decimal"),
+    ("builtins", "set"), ("builtins", "frozenset"),
+    # Las claves de report_kpis_cache llevan el esquema de antigüedad
+    ("app.reports.aging", "AgingScheme"),
+}
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        if (module, name) in _ALLOWED:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Type not allowed in cache: {module}.{name}")
+
+
+def dumps(obj: Any) -> bytes:
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def loads(blob: bytes) -> Any:
+    return _SafeUnpickler(io.BytesIO(zlib.decompress(blob))).load()
+
+
+class PlainCodec:
+    def encode(self, value: Any) -> bytes:
+        return dumps(value)
+
+    def decode(self, blob: bytes) -> Any:
+        return loads(blob)
+
+
+@lru_cache(maxsize=64)
+def _row_type(names: tuple) -> type:
+    return namedtuple("Row", names, rename=True)
+
+
+def _column_names(row) -> tuple:
+    description = getattr(row, "cursor_description", None)
+    if description is not None:
+        return tuple(d[0] for d in description)
+    for attr in ("_fields", "__slots__"):
+        names = getattr(row, attr, None)
+        if names:
+            return tuple(names)
+    raise TypeError(f"Cannot determine columns of {type(row).__name__}")
+
+
+class RowsCodec:
+    def encode(self, rows: List[Any]) -> bytes:
+        if not rows:
+            return dumps(((), []))
+        names = _column_names(rows[0])
+        return dumps((names, [list(column) for column in zip(*rows)]))
+
+    def decode(self, blob: bytes) -> List[Any]:
+        names, columns = loads(blob)
+        if not names:
+            return []
+        row_type = _row_type(names)
+        return [row_type._make(values) for values in zip(*columns)]
+
+
+_ENTRY_FIELDS = tuple(ReceivableEntry.model_fields)
+
+
+class CurrencyGroupsCodec:
+    def encode(self, groups: Dict[str, CurrencyGroup]) -> bytes:
+        payload = []
+        for key, group in groups.items():
+            entries = group.entries
+            columns = [[getattr(e, f) for e in entries] for f in _ENTRY_FIELDS] if entries else []
+            payload.append((
+                key, group.currency, group.customer_name, columns, len(entries), dict(group.totals),
+                {k: s.model_dump() for k, s in group.aging_summary.items()}
+            ))
+        return dumps(payload)
+
+    def decode(self, blob: bytes) -> Dict[str, CurrencyGroup]:
+        groups = {}
+        construct_entry = ReceivableEntry.model_construct
+        for key, currency, customer_name, columns, count, totals, summaries in loads(blob):
+            entries = [
+                construct_entry(**dict(zip(_ENTRY_FIELDS, values))) for values in zip(*columns)
+            ] if count else []
+            groups[key] = CurrencyGroup.model_construct(
+                currency=currency, customer_name=customer_name, entries=entries, totals=totals,
+                aging_summary={k: AgingSummary.model_construct(**s) for k, s in summaries.items()}
+            )
+        return groups
+
+
+class ModelCodec:
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+
+    def encode(self, value: BaseModel) -> bytes:
+        return dumps(value.model_dump())
+
+    def decode(self, blob: bytes) -> BaseModel:
+        return self.model.model_validate(loads(blob))
+
+
+ROWS_CODEC = RowsCodec()
+CURRENCY_GROUPS_CODEC = CurrencyGroupsCodec()
+PLAIN_CODEC = PlainCodec()
@@ -0,0 +1,301 @@
+# app/reports/columnar_export.py
+"""Exportación columnar (Parquet y Arrow IPC) para el equipo de BI.
+
+Las columnas se construyen directo desde las filas de SQL, por lotes de
+COLUMNAR_BATCH_ROWS filas; cada lote se escribe como un row group (Parquet) o
+un record batch (Arrow) y sus bytes se entregan de inmediato, así que la
+memoria depende del tamaño del lote y no del reporte.
+
+Tipos:
+- cliente, módulo, moneda, términos y rango de antigüedad: columnas con
+  diccionario (dictionary-encoded). El diccionario es único para todo el
+  archivo y solo crece (las filas vienen ordenadas por cliente), lo que en
+  Arrow se escribe como "deltas".
+- fechas: date32. Importes: decimal128(18, 4); tipo de cambio: decimal128(18, 6).
+
+Se publican dos tablas: el detalle de documentos y el resumen de antigüedad
+por moneda y cliente (formatos "*-summary").
+
+Requiere `pyarrow` (dependencia opcional: pip install pyarrow). Si no está
+instalado, estos formatos responden 501.
+"""
+
+import datetime
+import os
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from fastapi import HTTPException
+
+from .aging import AgingScheme
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pq = None
+
+COLUMNAR_BATCH_ROWS = int(os.getenv("COLUMNAR_BATCH_ROWS", "50000"))
+
+_AMOUNT_EXP = Decimal("0.0001")
+_RATE_EXP = Decimal("0.000001")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Parquet/Arrow export requires the 'pyarrow' package on the server.")
+
+
+def _amount_type():
+    return pa.decimal128(18, 4)
+
+
+def _dict_type():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value if isinstance(value, datetime.date) else None
+
+
+def _dec(value, exp: Decimal = _AMOUNT_EXP) -> Decimal:
+    if value is None:
+        return Decimal(0).quantize(exp)
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(exp)
+
+
+class _ChunkSink:
+    """Archivo en memoria que entrega y descarta lo escrito en cada `drain`."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _Dictionary:
+    """Diccionario de strings compartido por todos los lotes del archivo."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value) -> int:
+        value = value or ""
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def array(self, codes: List[int]):
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def detail_schema():
+    amount = _amount_type()
+    return pa.schema([
+        ("customer", _dict_type()),
+        ("customer_id", pa.int64()),
+        ("module", _dict_type()),
+        ("invoice_date", pa.date32()),
+        ("folio", pa.string()),
+        ("arrival_date", pa.date32()),
+        ("due_date", pa.date32()),
+        ("reference", pa.string()),
+        ("po", pa.string()),
+        ("currency", _dict_type()),
+        ("fx_rate", pa.decimal128(18, 6)),
+        ("subtotal", amount),
+        ("total", amount),
+        ("paid", amount),
+        ("balance", amount),
+        ("days_since", pa.int32()),
+        ("days_overdue", pa.int32()),
+        ("credit_days", _dict_type()),
+        ("aging_bucket", _dict_type()),
+    ])
+
+
+def _detail_batches(rows: Iterable, as_of: datetime.date, scheme: AgingScheme):
+    """Genera RecordBatch del detalle, de COLUMNAR_BATCH_ROWS filas cada uno."""
+    schema = detail_schema()
+    bucketer = scheme.compile()
+    bounds, labels, basis = bucketer.bounds, bucketer.labels, scheme.basis
+    dicts = {name: _Dictionary() for name in ("customer", "module", "currency", "credit_days", "aging_bucket")}
+
+    def new_columns():
+        return {name: [] for name in schema.names}
+
+    cols = new_columns()
+    n = 0
+
+    def to_batch(cols):
+        arrays = []
+        for field in schema:
+            values = cols[field.name]
+            if field.name in dicts:
+                arrays.append(dicts[field.name].array(values))
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    for row in rows:
+        currency = row.Moneda
+        if not currency:
+            continue
+        invoice = _as_date(row.InvoiceDate)
+        arrival = _as_date(row.ArrivalDate)
+        due = _as_date(row.Vencimiento)
+        days_since = (as_of - arrival).days if arrival else 0
+        days_overdue = (as_of - due).days if due else 0
+        if basis == "arrival":
+            d = days_since
+        elif basis == "due":
+            d = days_overdue
+        else:
+            d = (as_of - invoice).days if invoice else 0
+
+        cols["customer"].append(dicts["customer"].code(row.Cliente))
+        cols["customer_id"].append(row.BusinessEntityID)
+        cols["module"].append(dicts["module"].code(row.Modulo))
+        cols["invoice_date"].append(invoice)
+        cols["folio"].append(row.Folio)
+        cols["arrival_date"].append(arrival)
+        cols["due_date"].append(due)
+        cols["reference"].append(row.Referencia)
+        cols["po"].append(row.PO)
+        cols["currency"].append(dicts["currency"].code(currency))
+        cols["fx_rate"].append(_dec(row.TC, _RATE_EXP))
+        cols["subtotal"].append(_dec(row.SubTotal))
+        cols["total"].append(_dec(row.Total))
+        cols["paid"].append(_dec(row.Pagado))
+        cols["balance"].append(_dec(row.Saldo))
+        cols["days_since"].append(days_since)
+        cols["days_overdue"].append(days_overdue)
+        cols["credit_days"].append(dicts["credit_days"].code(row.CreditDaysLabel))
+        cols["aging_bucket"].append(dicts["aging_bucket"].code(labels[bisect_left(bounds, d)]))
+        n += 1
+        if n >= COLUMNAR_BATCH_ROWS:
+            yield to_batch(cols)
+            cols = new_columns()
+            n = 0
+
+    if n:
+        yield to_batch(cols)
+
+
+def summary_schema(scheme: AgingScheme):
+    amount = _amount_type()
+    fields = [
+        ("currency", _dict_type()),
+        ("customer", pa.string()),
+        ("documents", pa.int32()),
+        ("total_balance", amount),
+        ("not_yet_due", amount),
+        ("overdue", amount),
+    ]
+    fields += [(key, amount) for key in scheme.bucket_keys]
+    return pa.schema(fields)
+
+
+def _summary_batches(rows: Iterable, as_of: datetime.date, scheme: AgingScheme):
+    """Resumen de antigüedad por (moneda, cliente), acumulado en Decimal."""
+    schema = summary_schema(scheme)
+    bucketer = scheme.compile()
+    bounds, basis = bucketer.bounds, scheme.basis
+    n_slots = len(bucketer.keys)
+    zero = Decimal(0)
+    # (moneda, cliente) -> [documentos, saldo, vencido, rango_0..rango_n]
+    acc: Dict[Tuple[str, str], list] = {}
+
+    for row in rows:
+        currency = row.Moneda
+        if not currency:
+            continue
+        if basis == "arrival":
+            ref = _as_date(row.ArrivalDate)
+        elif basis == "due":
+            ref = _as_date(row.Vencimiento)
+        else:
+            ref = _as_date(row.InvoiceDate)
+        slot = bisect_left(bounds, (as_of - ref).days if ref else 0)
+        saldo = _dec(row.Saldo)
+        a = acc.get((currency, row.Cliente))
+        if a is None:
+            a = acc[(currency, row.Cliente)] = [0, zero, zero] + [zero] * n_slots
+        a[0] += 1
+        a[1] += saldo
+        a[3 + slot] += saldo
+        if slot:
+            a[2] += saldo
+
+    currencies = _Dictionary()
+    keys = sorted(acc)
+    columns = [
+        currencies.array([currencies.code(cur) for cur, _ in keys]),
+        pa.array([cust for _, cust in keys], pa.string()),
+        pa.array([acc[k][0] for k in keys], pa.int32()),
+    ]
+    # Orden del esquema: total_balance, not_yet_due (rango_0), overdue, rangos vencidos
+    positions = [1, 3, 2] + list(range(4, 3 + n_slots))
+    columns += [pa.array([acc[k][p] for k in keys], _amount_type()) for p in positions]
+    yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _stream(batches_factory: Callable, schema, kind: str) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    if kind == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_batch
+    else:
+        options = pa.ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True)
+        writer = pa.ipc.new_stream(sink, schema, options=options)
+        write = writer.write_batch
+    try:
+        for batch in batches_factory():
+            write(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _writer(table: str, kind: str):
+    def build(rows: Iterable, as_of: datetime.date, scheme: AgingScheme) -> Iterator[bytes]:
+        # Se valida antes de crear el generador, para responder 501 y no un stream vacío
+        _require_pyarrow()
+        if table == "detail":
+            return _stream(lambda: _detail_batches(rows, as_of, scheme), detail_schema(), kind)
+        return _stream(lambda: _summary_batches(rows, as_of, scheme), summary_schema(scheme), kind)
+    return build
+
+
+stream_parquet = _writer("detail", "parquet")
+stream_arrow = _writer("detail", "arrow")
+stream_parquet_summary = _writer("summary", "parquet")
+stream_arrow_summary = _writer("summary", "arrow")
@@ -0,0 +1,96 @@
+# app/reports/customer_index.py
+"""Índice por cliente sobre el resultado de "todos los clientes".
+
+ReportsPage.js carga primero el reporte global y después el usuario entra a
+un cliente, lo que antes lanzaba otra consulta a SQL Server con
+`AND d.BusinessEntityID = ?`. Esa consulta devuelve exactamente el
+subconjunto del resultado global con ese BusinessEntityID (mismas fechas,
+mismo orden), así que si el global ya está en `report_rows_cache` basta con
+recortarlo.
+
+`CustomerIndex` reacomoda las filas del global agrupadas por cliente en una
+sola lista (conservando el orden de la consulta dentro de cada cliente) y
+guarda el rango de cada uno, junto con agregados precalculados (documentos y
+saldo por moneda). Recortar un cliente es una rebanada de lista.
+
+El índice se arma la primera vez que se pide un cliente y se guarda en
+`customer_index_cache` con la misma clave que las filas globales, junto con la
+versión de la entrada de filas de la que salió (`ResultCache.get_entry`). Si
+las filas se reemplazan (refresh, warm-up) cambia la versión y el índice se
+vuelve a armar. Con la caché compartida la versión es la misma en todos los
+workers y no cambia cuando la copia local de las filas se vuelve a decodificar
+del almacén.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pyodbc
+
+from .report_cache import ResultCache, REPORT_CACHE_MAX_ENTRIES
+
+# Índices por clave de filas globales (empresa, sql, parámetros)
+customer_index_cache = ResultCache(max_entries=REPORT_CACHE_MAX_ENTRIES)
+
+
+@dataclass
+class CustomerSlice:
+    start: int
+    end: int
+    name: str
+    documents: int = 0
+    balance_by_currency: Dict[str, float] = field(default_factory=dict)
+
+
+class CustomerIndex:
+    def __init__(self, rows: List[pyodbc.Row], version: Optional[float] = None):
+        # Versión de la entrada de report_rows_cache de la que salió el índice
+        self.version = version
+        grouped: Dict[int, List[pyodbc.Row]] = {}
+        for row in rows:
+            grouped.setdefault(row.BusinessEntityID, []).append(row)
+
+        self.rows: List[pyodbc.Row] = []
+        self.customers: Dict[int, CustomerSlice] = {}
+        for customer_id, customer_rows in grouped.items():
+            start = len(self.rows)
+            self.rows.extend(customer_rows)
+            entry = CustomerSlice(start, len(self.rows), customer_rows[0].Cliente, len(customer_rows))
+            for row in customer_rows:
+                currency = row.Moneda or "MXN"
+                entry.balance_by_currency[currency] = entry.balance_by_currency.get(currency, 0.0) + float(row.Saldo or 0)
+            self.customers[customer_id] = entry
+
+    def rows_for(self, customer_id: int) -> List[pyodbc.Row]:
+        """Filas del cliente en el orden de la consulta; [] si no tiene documentos."""
+        entry = self.customers.get(customer_id)
+        if entry is None:
+            return []
+        return self.rows[entry.start:entry.end]
+
+    def aggregates(self, customer_id: int) -> Optional[CustomerSlice]:
+        return self.customers.get(customer_id)
+
+    def stats(self) -> dict:
+        return {"rows": len(self.rows), "customers": len(self.customers)}
+
+
+_build_lock = threading.Lock()
+
+
+def index_for(key: tuple, rows: List[pyodbc.Row], version: float) -> CustomerIndex:
+    """
+    Índice de `rows`, las filas globales guardadas con `key` en la versión
+    `version` (ver ResultCache.get_entry), armándolo si hace falta.
+    """
+    index = customer_index_cache.get(key)
+    if index is not None and index.version == version:
+        return index
+    with _build_lock:
+        # Otro hilo pudo haberlo armado mientras esperábamos
+        index = customer_index_cache.get(key)
+        if index is None or index.version != version:
+            index = CustomerIndex(rows, version)
+            customer_index_cache.put(key, index)
+        return index
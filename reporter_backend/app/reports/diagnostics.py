@@ -0,0 +1,231 @@
+# app/reports/diagnostics.py
+"""Diagnóstico de consultas SQL (solo administradores).
+
+- Historial de tiempos por consulta (lo registra `fetch_all`, ver query_stats.py):
+  recientes, más lentas y acumulado por empresa + nombre de consulta.
+- Captura bajo demanda de la consulta del reporte con los filtros indicados:
+  plan estimado (SET SHOWPLAN_XML) y salida de SET STATISTICS IO/TIME de una
+  ejecución real. Del plan se extraen el costo estimado y los índices
+  faltantes que sugiere SQL Server; de STATISTICS IO, las lecturas por tabla.
+  Es la información para decidir qué índices pedirle al DBA.
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Annotated, List, Optional
+
+import pyodbc
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..query_stats import query_stats
+from ..security import CurrentUser
+from ..sql_server_conn import get_sql_server_conn, get_company_key, sql_pool
+from .report_schemas import ReportFilters
+from .query_catalog import REPORT_QUERIES
+from .receivables import report_variant_for
+
+router = APIRouter(tags=["Diagnostics"])
+
+SqlServerConnDep = Annotated[pyodbc.Connection, Depends(get_sql_server_conn)]
+CompanyKeyDep = Annotated[str, Depends(get_company_key)]
+
+_SHOWPLAN_NS = {"sp": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+_IO_LINE = re.compile(
+    r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+), physical reads (\d+)"
+)
+_TIME_LINE = re.compile(r"CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+
+
+def _require_admin(user) -> None:
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
+def _drain_messages(cursor, messages: List[str]) -> None:
+    messages.extend(text for _, text in (cursor.messages or []))
+
+
+def parse_statistics(messages: List[str]) -> dict:
+    """Resume la salida de STATISTICS IO/TIME: lecturas por tabla y CPU/elapsed totales."""
+    tables = {}
+    cpu_ms = elapsed_ms = 0
+    for text in messages:
+        for m in _IO_LINE.finditer(text):
+            t = tables.setdefault(m.group(1), {"table": m.group(1), "scan_count": 0, "logical_reads": 0, "physical_reads": 0})
+            t["scan_count"] += int(m.group(2))
+            t["logical_reads"] += int(m.group(3))
+            t["physical_reads"] += int(m.group(4))
+        for m in _TIME_LINE.finditer(text):
+            cpu_ms += int(m.group(1))
+            elapsed_ms += int(m.group(2))
+    return {
+        "tables": sorted(tables.values(), key=lambda t: t["logical_reads"], reverse=True),
+        "cpu_ms": cpu_ms,
+        "elapsed_ms": elapsed_ms,
+    }
+
+
+def parse_plan(plan_xml: Optional[str]) -> dict:
+    """Costo estimado y sugerencias de índices faltantes del plan XML."""
+    if not plan_xml:
+        return {"estimated_cost": None, "missing_indexes": []}
+    try:
+        root = ET.fromstring(plan_xml)
+    except ET.ParseError:
+        return {"estimated_cost": None, "missing_indexes": []}
+
+    cost = None
+    for stmt in root.iterfind(".//sp:StmtSimple", _SHOWPLAN_NS):
+        value = stmt.get("StatementSubTreeCost")
+        if value is not None:
+            cost = (cost or 0.0) + float(value)
+
+    missing = []
+    for group in root.iterfind(".//sp:MissingIndexGroup", _SHOWPLAN_NS):
+        for index in group.iterfind("sp:MissingIndex", _SHOWPLAN_NS):
+            columns = {}
+            for col_group in index.iterfind("sp:ColumnGroup", _SHOWPLAN_NS):
+                columns[col_group.get("Usage", "").lower()] = [
+                    c.get("Name", "").strip("[]") for c in col_group.iterfind("sp:Column", _SHOWPLAN_NS)
+                ]
+            missing.append({
+                "impact": float(group.get("Impact", 0)),
+                "table": index.get("Table", "").strip("[]"),
+                "equality": columns.get("equality", []),
+                "inequality": columns.get("inequality", []),
+                "include": columns.get("include", []),
+            })
+    return {"estimated_cost": cost, "missing_indexes": missing}
+
+
+def capture_query_diagnostics(
+    conn: pyodbc.Connection,
+    sql: str,
+    params: list,
+    include_plan: bool = True,
+    execute: bool = True
+) -> dict:
+    """Obtiene el plan estimado y/o ejecuta la consulta con STATISTICS IO/TIME."""
+    plan_xml = None
+    messages: List[str] = []
+    rows = None
+    exec_ms = fetch_ms = None
+    with conn.cursor() as cursor:
+        if include_plan:
+            # SHOWPLAN_XML tiene que ir solo en su lote; mientras está activo no se ejecuta nada
+            cursor.execute("SET SHOWPLAN_XML ON")
+            try:
+                cursor.execute(sql, params) if params else cursor.execute(sql)
+                row = cursor.fetchone()
+                plan_xml = row[0] if row else None
+                while cursor.nextset():
+                    pass
+            finally:
+                cursor.execute("SET SHOWPLAN_XML OFF")
+
+        if execute:
+            cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON;")
+            try:
+                t0 = time.perf_counter()
+                cursor.execute(sql, params) if params else cursor.execute(sql)
+                t1 = time.perf_counter()
+                _drain_messages(cursor, messages)
+                rows = len(cursor.fetchall())
+                exec_ms, fetch_ms = (t1 - t0) * 1000, (time.perf_counter() - t1) * 1000
+                _drain_messages(cursor, messages)
+                while cursor.nextset():
+                    _drain_messages(cursor, messages)
+            finally:
+                cursor.execute("SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
+
+    return {
+        "exec_ms": round(exec_ms, 2) if exec_ms is not None else None,
+        "fetch_ms": round(fetch_ms, 2) if fetch_ms is not None else None,
+        "rows": rows,
+        "statistics": parse_statistics(messages),
+        "messages": messages,
+        "plan": parse_plan(plan_xml),
+        "plan_xml": plan_xml,
+    }
+
+
+# --- Endpoints ---
+@router.get("/diagnostics/queries")
+def get_recent_queries(
+    current_user: CurrentUser,
+    limit: int = 50,
+    company: Optional[str] = None,
+    name: Optional[str] = None
+):
+    _require_admin(current_user)
+    return query_stats.recent(max(1, min(limit, 500)), company=company, name=name)
+
+
+@router.get("/diagnostics/slowest")
+def get_slowest_queries(current_user: CurrentUser, limit: int = 20, company: Optional[str] = None):
+    _require_admin(current_user)
+    return query_stats.slowest(max(1, min(limit, 500)), company=company)
+
+
+@router.get("/diagnostics/summary")
+def get_query_summary(current_user: CurrentUser):
+    """Acumulado por empresa y consulta, ordenado por tiempo total consumido."""
+    _require_admin(current_user)
+    return query_stats.summary()
+
+
+@router.get("/diagnostics/captures")
+def get_query_captures(current_user: CurrentUser, include_plan: bool = False):
+    _require_admin(current_user)
+    return query_stats.captures(include_plan=include_plan)
+
+
+@router.get("/diagnostics/query-catalog")
+def get_query_catalog(current_user: CurrentUser):
+    """Variantes fijas de la consulta del reporte y estado del pool de conexiones."""
+    _require_admin(current_user)
+    return {
+        "variants": [
+            {"name": v.name, "params": list(v.params), "skewed": v.skewed, "recompile": v.recompile}
+            for v in REPORT_QUERIES.values()
+        ],
+        "pool": sql_pool.stats(),
+    }
+
+
+@router.delete("/diagnostics")
+def clear_query_stats(current_user: CurrentUser):
+    _require_admin(current_user)
+    query_stats.clear()
+    return {"status": "cleared"}
+
+
+@router.post("/diagnostics/receivables")
+def capture_receivables_diagnostics(
+    filters: ReportFilters,
+    current_user: CurrentUser,
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    include_plan: bool = True,
+    execute: bool = True
+):
+    """
+    Captura plan estimado y STATISTICS IO/TIME de la consulta del reporte con
+    estos filtros (no usa la caché de resultados). Queda en el historial de capturas.
+    """
+    _require_admin(current_user)
+    variant, params = report_variant_for(filters)
+    try:
+        capture = capture_query_diagnostics(sql_conn, variant.sql, params, include_plan=include_plan, execute=execute)
+    except pyodbc.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+    capture = {
+        "name": variant.name,
+        "company": company_key,
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "filters": filters.model_dump(mode="json"),
+        **capture,
+    }
+    query_stats.add_capture(capture)
+    return capture
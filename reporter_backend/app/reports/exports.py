@@ -0,0 +1,124 @@
+# app/reports/exports.py
+"""Registro de formatos de exportación del reporte.
+
+Los generadores (report_builder.py) importan openpyxl y reportlab, que son
+pesados. Antes se importaban al cargar receivables.py, es decir, al arrancar
+cada worker, aunque la mayoría de las peticiones son vistas previas en JSON.
+Ahora cada formato declara dónde está su generador ("modulo:funcion") y el
+módulo se importa la primera vez que se pide ese formato.
+
+Hay dos tipos de generador:
+- documento (streaming=False): recibe los datos ya procesados por moneda
+  (`process_report_data`) y devuelve un BytesIO. Excel, PDF, HTML.
+- streaming (streaming=True): recibe directamente las filas de SQL, el `as_of`
+  y el esquema de antigüedad, y devuelve un iterador de bytes. CSV, TSV.
+
+`warm_up` permite precargar los generadores en segundo plano después del
+arranque (EXPORT_WARMUP=excel,pdf o "all") para que la primera descarga no
+pague la importación.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+EXPORT_WARMUP = os.getenv("EXPORT_WARMUP", "")
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    key: str
+    extension: str
+    media_type: str
+    # "modulo:funcion", relativo al paquete app.reports
+    builder: str
+    streaming: bool = False
+
+    def load(self) -> Callable:
+        return _load_builder(self.builder)
+
+
+_builders: Dict[str, Callable] = {}
+_builders_lock = threading.Lock()
+
+
+def _load_builder(path: str) -> Callable:
+    func = _builders.get(path)
+    if func is not None:
+        return func
+    with _builders_lock:
+        func = _builders.get(path)
+        if func is None:
+            module_name, func_name = path.split(":")
+            t0 = time.perf_counter()
+            module = importlib.import_module(module_name, package=__package__)
+            func = _builders[path] = getattr(module, func_name)
+            log.info(f"[EXPORT] Loaded {path} in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    return func
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "excel": ExportFormat(
+        "excel", "xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ".report_builder:create_excel_report",
+    ),
+    "pdf": ExportFormat("pdf", "pdf", "application/pdf", ".report_builder:create_pdf_report"),
+    "html": ExportFormat("html", "html", "text/html", ".report_builder:create_html_report"),
+    "csv": ExportFormat(
+        "csv", "csv", "text/csv; charset=utf-8", ".delimited_export:stream_csv", streaming=True
+    ),
+    "tsv": ExportFormat(
+        "tsv", "tsv", "text/tab-separated-values; charset=utf-8", ".delimited_export:stream_tsv", streaming=True
+    ),
+    # Requieren pyarrow (opcional); ver columnar_export.py
+    "parquet": ExportFormat(
+        "parquet", "parquet", "application/vnd.apache.parquet", ".columnar_export:stream_parquet", streaming=True
+    ),
+    "arrow": ExportFormat(
+        "arrow", "arrows", "application/vnd.apache.arrow.stream", ".columnar_export:stream_arrow", streaming=True
+    ),
+    "parquet-summary": ExportFormat(
+        "parquet-summary", "parquet", "application/vnd.apache.parquet",
+        ".columnar_export:stream_parquet_summary", streaming=True
+    ),
+    "arrow-summary": ExportFormat(
+        "arrow-summary", "arrows", "application/vnd.apache.arrow.stream",
+        ".columnar_export:stream_arrow_summary", streaming=True
+    ),
+}
+
+
+def get_export_format(key: str) -> ExportFormat:
+    fmt = EXPORT_FORMATS.get(key)
+    if fmt is None:
+        raise ValueError(f"Unknown export format '{key}'. Allowed: {', '.join(EXPORT_FORMATS.keys())}")
+    return fmt
+
+
+def warm_up(keys: Optional[List[str]] = None) -> List[str]:
+    """Importa los generadores indicados (o todos). Bloqueante: llamar desde un hilo."""
+    loaded = []
+    for key in keys or list(EXPORT_FORMATS.keys()):
+        fmt = EXPORT_FORMATS.get(key)
+        if fmt is None:
+            log.warning(f"[EXPORT] Unknown export format in warm-up: '{key}'")
+            continue
+        fmt.load()
+        loaded.append(key)
+    return loaded
+
+
+def warm_up_keys_from_env(value: str = EXPORT_WARMUP) -> List[str]:
+    value = value.strip().lower()
+    if not value:
+        return []
+    if value == "all":
+        return list(EXPORT_FORMATS.keys())
+    return [k.strip() for k in value.split(",") if k.strip()]
@@ -0,0 +1,136 @@
+# app/reports/fx.py
+"""Consolidación multimoneda con el tipo de cambio (TC) de cada documento.
+
+El TC que devuelve `_get_sql_base` expresa cuántas unidades de moneda local
+vale una unidad de la moneda del documento, así que `saldo * TC` es el saldo en
+moneda local. Para consolidar en otra moneda de reporte se divide entre el TC de
+esa moneda: el indicado en la petición o, si no viene, el del documento más
+reciente en esa moneda.
+
+`FxConsolidator` se alimenta desde el mismo ciclo de `process_report_data`
+(una llamada a `add` por fila), por lo que los totales consolidados salen junto
+con los grupos por moneda sin recorrer las filas una segunda vez. Como la
+conversión es lineal, todo se acumula en moneda local y la división final se
+hace una sola vez al construir el resultado.
+"""
+
+import datetime
+from typing import Dict, List, Optional
+
+from .aging import LEGACY_BUCKET_FIELDS
+from .report_schemas import AgingSummary, ConsolidatedTotals
+
+
+class FxConsolidator:
+    __slots__ = (
+        "local_currency", "reporting_currency", "reporting_rate", "include_customers",
+        "_totals", "_customers", "_width", "_latest_rate", "_latest_date", "unconverted",
+    )
+
+    def __init__(
+        self,
+        local_currency: str,
+        reporting_currency: Optional[str] = None,
+        reporting_rate: Optional[float] = None,
+        include_customers: bool = True
+    ):
+        self.local_currency = local_currency
+        self.reporting_currency = reporting_currency or local_currency
+        self.reporting_rate = reporting_rate
+        self.include_customers = include_customers
+        self._totals: Optional[List[float]] = None
+        self._customers: Dict[str, List[float]] = {}
+        self._width = 0
+        self._latest_rate = 0.0
+        self._latest_date: Optional[datetime.date] = None
+        self.unconverted = 0
+
+    def start(self, n_slots: int) -> None:
+        """Prepara los acumuladores para un esquema con `n_slots` rangos (incluyendo Not Due)."""
+        # [total, paid, balance, po_balance, real_balance, overdue, rango_0..rango_n]
+        self._width = n_slots
+        self._totals = [0.0] * (6 + n_slots)
+        self._customers = {}
+
+    def add(self, currency: str, entry, slot: int) -> None:
+        rate = entry.fx_rate
+        if currency == self.reporting_currency and rate and (
+            self._latest_date is None or entry.invoice_date >= self._latest_date
+        ):
+            self._latest_date = entry.invoice_date
+            self._latest_rate = rate
+        if not rate:
+            if currency != self.local_currency:
+                self.unconverted += 1
+                return
+            rate = 1.0
+
+        saldo = entry.balance * rate
+        tot = self._totals
+        tot[0] += entry.total * rate
+        tot[1] += entry.paid * rate
+        tot[2] += saldo
+        tot[3] += entry.po_balance * rate
+        tot[4] += entry.real_balance * rate
+        tot[6 + slot] += saldo
+        if slot:
+            tot[5] += saldo
+
+        if self.include_customers:
+            acc = self._customers.get(entry.customer_name)
+            if acc is None:
+                acc = self._customers[entry.customer_name] = [0.0] * (2 + self._width)
+            acc[0] += saldo
+            acc[2 + slot] += saldo
+            if slot:
+                acc[1] += saldo
+
+    def _resolve_rate(self) -> tuple[float, str]:
+        if self.reporting_currency == self.local_currency:
+            return 1.0, "local"
+        if self.reporting_rate:
+            return float(self.reporting_rate), "request"
+        if self._latest_rate:
+            return self._latest_rate, "latest_document"
+        raise ValueError(
+            f"No exchange rate available for {self.reporting_currency}; "
+            f"pass reporting_fx_rate ({self.local_currency} per 1 {self.reporting_currency})."
+        )
+
+    def result(self, bucket_keys: List[str]) -> ConsolidatedTotals:
+        """Construye los totales consolidados en la moneda de reporte. Lanza ValueError si no hay TC."""
+        rate, source = self._resolve_rate()
+        k = 1.0 / rate
+        tot = self._totals or [0.0] * (6 + len(bucket_keys) + 1)
+        totals = {
+            "total": tot[0] * k,
+            "paid": tot[1] * k,
+            "balance": tot[2] * k,
+            "po_balance": tot[3] * k,
+            "real_balance": tot[4] * k,
+            "not_yet_due": tot[6] * k,
+            "overdue": tot[5] * k,
+        }
+        totals.update(zip(bucket_keys, (v * k for v in tot[7:])))
+
+        legacy_keys = [b for b in bucket_keys if b in LEGACY_BUCKET_FIELDS]
+        aging_summary = {}
+        for cust, acc in self._customers.items():
+            buckets = {b: v * k for b, v in zip(bucket_keys, acc[3:])}
+            aging_summary[cust] = AgingSummary(
+                total_balance=acc[0] * k,
+                not_yet_due=acc[2] * k,
+                overdue=acc[1] * k,
+                buckets=buckets,
+                **{b: buckets[b] for b in legacy_keys}
+            )
+
+        return ConsolidatedTotals(
+            currency=self.reporting_currency,
+            local_currency=self.local_currency,
+            fx_rate=rate,
+            fx_rate_source=source,
+            totals=totals,
+            aging_summary=aging_summary,
+            unconverted_documents=self.unconverted,
+        )
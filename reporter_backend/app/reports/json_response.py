@@ -0,0 +1,53 @@
+# app/reports/json_response.py
+"""Respuesta JSON rápida para los modelos grandes del reporte.
+
+Cuando un endpoint devuelve un modelo con `response_model`, FastAPI lo vuelve
+a validar contra el response_model, lo convierte a dict/list de Python
+(dump en modo json) y al final lo pasa por `json.dumps`. Con una vista previa
+de miles de documentos esa serialización se llevaba una parte importante de
+la petición, y los datos ya estaban validados (process_report_data arma los
+CurrencyGroup).
+
+`ModelJSONResponse` escribe el modelo directo a bytes con el serializador de
+pydantic-core (Rust) en un solo paso: fechas en ISO y floats nativos, sin
+validar otra vez y sin objetos intermedios. Para contenido que no es un
+modelo (dicts, listas) usa orjson si está instalado (opcional) y si no,
+`json.dumps`.
+
+Los endpoints siguen declarando `response_model` (documentación OpenAPI);
+como devuelven un Response, FastAPI no lo vuelve a procesar.
+
+FAST_JSON_RESPONSES=false regresa al camino normal de FastAPI (para comparar).
+"""
+
+import json
+import os
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+
+class ModelJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def model_response(model: BaseModel):
+    """El modelo ya serializado (ModelJSONResponse), o el modelo tal cual si FAST_JSON_RESPONSES está apagado."""
+    if not FAST_JSON_RESPONSES:
+        return model
+    return ModelJSONResponse(model)
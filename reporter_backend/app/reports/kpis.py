@@ -0,0 +1,66 @@
+# app/reports/kpis.py
+"""KPIs del dashboard de cobranza calculados en el servidor.
+
+Antes el frontend descargaba el preview completo (todas las filas) y recorría
+cada documento en el navegador para sacar estos números. Aquí se calculan a
+partir de los agregados que ya produce `process_report_data` (totales y
+resumen por cliente) y solo se recorren las fechas de vencimiento para las
+ventanas "esta semana" / "hoy".
+"""
+
+import datetime
+from typing import Dict, Optional
+
+from .aging import AgingScheme
+from .ranking import rank_customers
+from .report_schemas import CurrencyGroup, CurrencyKpis, ReceivablesKpis, AgingSchemeInfo, ConsolidatedTotals
+
+# Ventana de "Expected this week" (días a partir de as_of, inclusive)
+EXPECTED_WINDOW_DAYS = 7
+
+
+def compute_receivables_kpis(
+    data: Dict[str, CurrencyGroup],
+    as_of: datetime.date,
+    scheme: AgingScheme,
+    aging_scheme: AgingSchemeInfo,
+    top_n: int = 10,
+    consolidated: Optional[ConsolidatedTotals] = None
+) -> ReceivablesKpis:
+    week_end = as_of + datetime.timedelta(days=EXPECTED_WINDOW_DAYS)
+    bucket_keys = scheme.bucket_keys
+
+    currencies = []
+    for cur, group in data.items():
+        expected_this_week = 0.0
+        scheduled_today = 0.0
+        for entry in group.entries:
+            due = entry.due_date
+            if as_of <= due <= week_end:
+                expected_this_week += entry.balance
+                if due == as_of:
+                    scheduled_today += entry.balance
+
+        totals = group.totals
+        currencies.append(CurrencyKpis(
+            currency=cur,
+            documents=len(group.entries),
+            customers=len(group.aging_summary),
+            balance=totals.get("balance", 0.0),
+            not_yet_due=totals.get("not_yet_due", 0.0),
+            overdue=totals.get("overdue", 0.0),
+            buckets={k: totals.get(k, 0.0) for k in bucket_keys},
+            expected_this_week=expected_this_week,
+            scheduled_today=scheduled_today,
+        ))
+
+    # Top N por saldo, sin ordenar la lista completa de clientes
+    top_customers = rank_customers(data, scheme, metric="total_balance", top_n=top_n)
+
+    return ReceivablesKpis(
+        as_of=as_of,
+        aging_scheme=aging_scheme,
+        currencies=currencies,
+        top_customers=top_customers,
+        consolidated=consolidated,
+    )
@@ -0,0 +1,197 @@
+# app/reports/query_catalog.py
+"""Catálogo de variantes fijas de la consulta del reporte.
+
+Antes el texto SQL se armaba concatenando `AND ...` según los filtros, así que
+cada combinación de filter_mode / customer_id / start / end era un texto
+distinto para SQL Server: varios planes en caché para la misma consulta y
+"parameter sniffing" entre la corrida de un cliente y la de todos.
+
+Aquí cada forma posible de la consulta es una variante con nombre, totalmente
+parametrizada y con texto fijo:
+
+    forma de fechas   upto (ArrivalDate <= ?), between (>= ? y <= ?),
+                      from (>= ?), all (sin filtro de fecha)
+    x cliente         todos / uno (BusinessEntityID = ?)
+    x consulta        completa (CTE de términos) / delgada (term_lookups.py)
+
+Las variantes de un solo cliente se marcan como "sesgadas": unos pocos
+clientes tienen la mayoría de los documentos, así que el plan compilado para
+uno grande no sirve para uno chico y viceversa. Con
+REPORT_QUERY_RECOMPILE=true esas variantes llevan OPTION (RECOMPILE).
+
+Como el texto de cada variante no cambia, `fetch_all(..., prepared=True)`
+reutiliza el cursor ya preparado en las conexiones del pool (ver
+sql_server_conn.py). benchmarks/query_variants.py compara compilación y
+ejecución con y sin cursores preparados y con y sin la pista de recompilación.
+"""
+
+import datetime
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+REPORT_QUERY_RECOMPILE = os.getenv("REPORT_QUERY_RECOMPILE", "false").lower() in ("1", "true", "yes")
+
+# Nombre del filtro de fechas -> condición (los parámetros van en el mismo orden)
+_DATE_SHAPES = {
+    "upto": (" AND d.ArrivalDate <= ? ", ("end",)),
+    "between": (" AND d.ArrivalDate >= ? AND d.ArrivalDate <= ? ", ("start", "end")),
+    "from": (" AND d.ArrivalDate >= ? ", ("start",)),
+    "all": ("", ()),
+}
+_ORDER_BY = " ORDER BY Cliente, InvoiceDate, Folio"
+_RECOMPILE_HINT = " OPTION (RECOMPILE)"
+
+
+# --- Consultas base (Directa de tu script) ---
+def _get_sql_base() -> str:
+    """
+    Genera la consulta base de SQL Server que extrae los saldos vencidos y por vencer de los clientes.
+    Consta de dos CTE (Common Table Expressions) y una consulta principal:
+    
+    1. StudentCredit: Obtiene los días de crédito predeterminados del cliente buscando el plazo máximo 
+       asociado a sus términos de pago (desde engPaymentTerm y engPaymentTermDetail).
+    2. DocumentTerm: Obtiene los días de crédito específicos aplicados al documento particular (factura/nota).
+       Esto es útil por si a un documento se le dio un crédito distinto al predeterminado del cliente.
+    
+    Consulta principal:
+    Realiza la lectura de la vista zzReporteSaldoDocuments y cruza con las condiciones de crédito.
+    El campo vital 'Vencimiento' se calcula sumando la fecha de llegada (ArrivalDate) más los días de crédito.
+    Tiene mayor prioridad el crédito específico del documento (DocCreditDays) sobre el predeterminado (MaxCreditDays).
+    """
+    return """
+        WITH StudentCredit AS (
+            SELECT 
+                pt.PaymentTermID,
+                pt.PaymentTermName,
+                MAX(ptd.PaymentPeriod + ptd.PaymentUnit) as MaxCreditDays
+            FROM dbo.engPaymentTerm pt
+            JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
+            GROUP BY pt.PaymentTermID, pt.PaymentTermName
+        ),
+        DocumentTerm AS (
+             SELECT 
+                doc.BusinessEntityID,
+                doc.Folio,
+                MAX(ptd.PaymentUnit) as DocCreditDays,
+                MAX(pt.PaymentTermName) as DocTermName
+             FROM dbo.docDocument doc
+             JOIN dbo.engPaymentTerm pt ON doc.PaymentTermID = pt.PaymentTermID
+             JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
+             GROUP BY doc.BusinessEntityID, doc.Folio
+        )
+        SELECT 
+            d.Cliente, 
+            d.BusinessEntityID, 
+            d.Modulo, 
+            d.InvoiceDate, 
+            CAST(d.Folio AS varchar(50)) AS Folio, 
+            d.ArrivalDate, 
+            -- Nueva Lógica: Fecha de Llegada + Días de Crédito. 
+            -- Prioridad: Término específico del documento > Término por defecto del cliente
+            DATEADD(day, ISNULL(dt.DocCreditDays, ISNULL(sc.MaxCreditDays, 0)), ISNULL(d.ArrivalDate, d.InvoiceDate)) AS Vencimiento,
+            d.Referencia, 
+            CAST(d.PO AS varchar(50)) AS PO, 
+            d.Moneda, 
+            d.TC, 
+            d.SubTotal, 
+            d.Total, 
+            d.Pagado, 
+            d.Saldo,
+            ISNULL(dt.DocTermName, sc.PaymentTermName) AS CreditDaysLabel
+        FROM zzReporteSaldoDocuments d
+        LEFT JOIN dbo.orgCustomer c ON d.BusinessEntityID = c.BusinessEntityID AND ISNULL(c.DeletedBy, 0) = 0
+        LEFT JOIN StudentCredit sc ON c.PaymentTermID = sc.PaymentTermID
+        LEFT JOIN DocumentTerm dt ON d.BusinessEntityID = dt.BusinessEntityID AND d.Folio = dt.Folio
+    """
+
+
+def _get_sql_slim() -> str:
+    """
+    Misma forma de fila que _get_sql_base, pero solo lee zzReporteSaldoDocuments.
+    Vencimiento y CreditDaysLabel vienen en NULL y se completan con
+    `apply_term_lookups` (ver term_lookups.py).
+    """
+    return """
+        SELECT 
+            d.Cliente, 
+            d.BusinessEntityID, 
+            d.Modulo, 
+            d.InvoiceDate, 
+            CAST(d.Folio AS varchar(50)) AS Folio, 
+            d.ArrivalDate, 
+            CAST(NULL AS date) AS Vencimiento,
+            d.Referencia, 
+            CAST(d.PO AS varchar(50)) AS PO, 
+            d.Moneda, 
+            d.TC, 
+            d.SubTotal, 
+            d.Total, 
+            d.Pagado, 
+            d.Saldo,
+            CAST(NULL AS varchar(100)) AS CreditDaysLabel
+        FROM zzReporteSaldoDocuments d
+    """
+
+
+@dataclass(frozen=True)
+class QueryVariant:
+    name: str
+    sql: str
+    # Orden de los parámetros: "start", "end", "customer_id"
+    params: Tuple[str, ...]
+    skewed: bool = False
+    recompile: bool = False
+
+    def bind(self, values: Dict[str, object]) -> List[object]:
+        return [values[p] for p in self.params]
+
+
+def build_report_catalog(recompile: bool = REPORT_QUERY_RECOMPILE) -> Dict[str, QueryVariant]:
+    catalog = {}
+    for slim in (False, True):
+        base = _get_sql_slim() if slim else _get_sql_base()
+        for shape, (condition, date_params) in _DATE_SHAPES.items():
+            for single_customer in (False, True):
+                sql = base + " WHERE 1=1 " + condition
+                params = date_params
+                if single_customer:
+                    sql += " AND d.BusinessEntityID = ? "
+                    params += ("customer_id",)
+                hint = recompile and single_customer
+                sql += _ORDER_BY + (_RECOMPILE_HINT if hint else "") + ";"
+                name = "receivables_report." + shape + (".customer" if single_customer else "") + (".slim" if slim else "")
+                catalog[name] = QueryVariant(name, sql, params, skewed=single_customer, recompile=hint)
+    return catalog
+
+
+REPORT_QUERIES = build_report_catalog()
+
+
+def select_report_variant(
+    as_of: datetime.date,
+    customer_id: Optional[int],
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    filter_mode: str = "to_date",
+    slim: bool = False,
+    catalog: Optional[Dict[str, QueryVariant]] = None
+) -> Tuple[QueryVariant, List[object]]:
+    """Elige la variante del catálogo para los filtros y devuelve (variante, parámetros)."""
+    if filter_mode == "date_range" or filter_mode == "current_month":
+        if start_date and end_date:
+            shape = "between"
+        elif start_date:
+            shape = "from"
+        elif end_date:
+            shape = "upto"
+        else:
+            shape = "all"
+    else:
+        # "to_date" o por defecto: desde el inicio hasta end_date (o as_of)
+        shape = "upto"
+        end_date = end_date if end_date else as_of
+
+    name = "receivables_report." + shape + (".customer" if customer_id else "") + (".slim" if slim else "")
+    variant = (catalog or REPORT_QUERIES)[name]
+    return variant, variant.bind({"start": start_date, "end": end_date, "customer_id": customer_id})
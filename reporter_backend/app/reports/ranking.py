@@ -0,0 +1,96 @@
+# app/reports/ranking.py
+"""Ranking de clientes (Top N) sobre el resumen de antigüedad por cliente.
+
+Se selecciona con un heap (`heapq.nlargest`), que es O(n log N) en lugar de
+ordenar todos los clientes, y solo se devuelve el tramo solicitado.
+
+Sin normalización, cada par (cliente, moneda) compite por separado, igual que
+los `AgingSummary` de cada `CurrencyGroup`. Con los totales consolidados de
+fx.py los saldos de todas las monedas ya vienen convertidos a una sola moneda
+con el tipo de cambio (TC) de cada documento y el cliente aparece una sola vez.
+"""
+
+import heapq
+from typing import Dict, List, Optional
+
+from .aging import AgingScheme
+from .report_schemas import ConsolidatedTotals, CurrencyGroup, RankedCustomer
+
+# Alias aceptados para las métricas fijas
+_METRIC_ALIASES = {
+    "total": "total_balance",
+    "total_balance": "total_balance",
+    "balance": "total_balance",
+    "not_due": "not_yet_due",
+    "not_yet_due": "not_yet_due",
+    "overdue": "overdue",
+}
+
+
+def resolve_metric(metric: str, scheme: AgingScheme) -> str:
+    """
+    Traduce la métrica pedida a una clave: 'total_balance', 'not_yet_due',
+    'overdue' o la clave de un rango del esquema. Acepta también la etiqueta del
+    rango (ej. '45+' -> 'bucket_45_plus'). Lanza ValueError si no existe.
+    """
+    key = (metric or "total").strip()
+    if key.lower() in _METRIC_ALIASES:
+        return _METRIC_ALIASES[key.lower()]
+    if key in scheme.bucket_keys:
+        return key
+    labels = scheme.labels
+    if key in labels:
+        return scheme.bucket_keys[labels.index(key)]
+    allowed = ", ".join(["total", "not_yet_due", "overdue"] + labels)
+    raise ValueError(f"Unknown ranking metric '{metric}'. Allowed: {allowed}")
+
+
+def rank_customers(
+    data: Dict[str, CurrencyGroup],
+    scheme: AgingScheme,
+    metric: str = "total_balance",
+    top_n: int = 10,
+    currency: Optional[str] = None,
+    consolidated: Optional[ConsolidatedTotals] = None
+) -> List[RankedCustomer]:
+    """
+    Devuelve los `top_n` clientes con mayor valor en `metric`.
+    `currency` limita el ranking a una sola moneda. Si se pasa `consolidated`
+    (ver fx.py), se rankea sobre su resumen por cliente ya normalizado a la
+    moneda de reporte y se ignoran los grupos por moneda.
+    """
+    metric_key = resolve_metric(metric, scheme)
+
+    if consolidated is not None:
+        summaries = [(consolidated.currency, consolidated.aging_summary)]
+    else:
+        summaries = [
+            (cur, group.aging_summary)
+            for cur, group in data.items()
+            if currency is None or cur == currency
+        ]
+
+    if metric_key in _METRIC_ALIASES.values():
+        value_of = lambda agg: getattr(agg, metric_key)
+    else:
+        value_of = lambda agg: agg.buckets.get(metric_key, 0.0)
+
+    candidates = (
+        (value_of(agg), cur, cust, agg)
+        for cur, aging_summary in summaries
+        for cust, agg in aging_summary.items()
+    )
+    top = heapq.nlargest(top_n, candidates, key=lambda c: c[0])
+    return [
+        RankedCustomer(
+            rank=rank,
+            customer_name=cust,
+            currency=cur,
+            value=value,
+            total_balance=agg.total_balance,
+            not_yet_due=agg.not_yet_due,
+            overdue=agg.overdue,
+            buckets=agg.buckets,
+        )
+        for rank, (value, cur, cust, agg) in enumerate(top, start=1)
+    ]
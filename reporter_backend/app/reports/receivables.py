@@ -1,83 +1,58 @@
 # app/reports/receivables.py
 import pyodbc
 import datetime
+import os
+import time
 from typing import List, Dict, Any, Annotated
+from bisect import bisect_left
 from collections import defaultdict
 from fastapi import Depends, HTTPException, APIRouter
 
 # Importamos nuestros conectores y esquemas
-from ..sql_server_conn import get_sql_server_conn, fetch_all
-from .report_schemas import ReceivableEntry, AgingSummary, CurrencyGroup, ReportFilters, ReceivablesReportData, CustomerCreditInfo
+from ..sql_server_conn import get_sql_server_conn, get_company_key, fetch_all, fetch_batch
+from ..tenants import get_tenant_setting
+from .report_schemas import ReceivableEntry, AgingSummary, CurrencyGroup, ReportFilters, ReceivablesReportData, CustomerCreditInfo, AgingSchemeInfo, ReceivablesKpis, CustomerRanking, ConsolidatedTotals
+from .aging import AgingScheme, LEGACY_BUCKET_FIELDS, get_scheme, list_schemes
+from .fx import FxConsolidator
+from .query_catalog import QueryVariant, select_report_variant
+from .report_cache import report_rows_cache, report_kpis_cache, report_data_cache, customer_credit_cache, customer_list_cache
+from .customer_index import customer_index_cache, index_for
+from .term_lookups import (
+    apply_term_lookups, get_term_lookups, term_lookups_cache, TERM_LOOKUP_STATEMENTS, term_lookups_from_results
+)
+from .kpis import compute_receivables_kpis
+from .json_response import model_response
+from .ranking import rank_customers, resolve_metric
 from ..schemas import CustomerFilterItem
 from ..security import CurrentUser
+from ..cancellation import CancelToken, CancelTokenDep
 
 # --- ¡NUEVO! Creamos un Router ---
 router = APIRouter(tags=["Reports"])
 
 # Alias para la conexión a SQL Server
 SqlServerConnDep = Annotated[pyodbc.Connection, Depends(get_sql_server_conn)]
+# Alias para la clave de empresa (tenant) resuelta desde el header X-Company
+CompanyKeyDep = Annotated[str, Depends(get_company_key)]
 
-# --- Lógica de SQL (Directa de tu script) ---
-def _get_sql_base() -> str:
-    """
-    Genera la consulta base de SQL Server que extrae los saldos vencidos y por vencer de los clientes.
-    Consta de dos CTE (Common Table Expressions) y una consulta principal:
-    
-    1. StudentCredit: Obtiene los días de crédito predeterminados del cliente buscando el plazo máximo 
-       asociado a sus términos de pago (desde engPaymentTerm y engPaymentTermDetail).
-    2. DocumentTerm: Obtiene los días de crédito específicos aplicados al documento particular (factura/nota).
-       Esto es útil por si a un documento se le dio un crédito distinto al predeterminado del cliente.
-    
-    Consulta principal:
-    Realiza la lectura de la vista zzReporteSaldoDocuments y cruza con las condiciones de crédito.
-    El campo vital 'Vencimiento' se calcula sumando la fecha de llegada (ArrivalDate) más los días de crédito.
-    Tiene mayor prioridad el crédito específico del documento (DocCreditDays) sobre el predeterminado (MaxCreditDays).
-    """
-    return """
-        WITH StudentCredit AS (
-            SELECT 
-                pt.PaymentTermID,
-                pt.PaymentTermName,
-                MAX(ptd.PaymentPeriod + ptd.PaymentUnit) as MaxCreditDays
-            FROM dbo.engPaymentTerm pt
-            JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
-            GROUP BY pt.PaymentTermID, pt.PaymentTermName
-        ),
-        DocumentTerm AS (
-             SELECT 
-                doc.BusinessEntityID,
-                doc.Folio,
-                MAX(ptd.PaymentUnit) as DocCreditDays,
-                MAX(pt.PaymentTermName) as DocTermName
-             FROM dbo.docDocument doc
-             JOIN dbo.engPaymentTerm pt ON doc.PaymentTermID = pt.PaymentTermID
-             JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
-             GROUP BY doc.BusinessEntityID, doc.Folio
-        )
-        SELECT 
-            d.Cliente, 
-            d.BusinessEntityID, 
-            d.Modulo, 
-            d.InvoiceDate, 
-            CAST(d.Folio AS varchar(50)) AS Folio, 
-            d.ArrivalDate, 
-            -- Nueva Lógica: Fecha de Llegada + Días de Crédito. 
-            -- Prioridad: Término específico del documento > Término por defecto del cliente
-            DATEADD(day, ISNULL(dt.DocCreditDays, ISNULL(sc.MaxCreditDays, 0)), ISNULL(d.ArrivalDate, d.InvoiceDate)) AS Vencimiento,
-            d.Referencia, 
-            CAST(d.PO AS varchar(50)) AS PO, 
-            d.Moneda, 
-            d.TC, 
-            d.SubTotal, 
-            d.Total, 
-            d.Pagado, 
-            d.Saldo,
-            ISNULL(dt.DocTermName, sc.PaymentTermName) AS CreditDaysLabel
-        FROM zzReporteSaldoDocuments d
-        LEFT JOIN dbo.orgCustomer c ON d.BusinessEntityID = c.BusinessEntityID AND ISNULL(c.DeletedBy, 0) = 0
-        LEFT JOIN StudentCredit sc ON c.PaymentTermID = sc.PaymentTermID
-        LEFT JOIN DocumentTerm dt ON d.BusinessEntityID = dt.BusinessEntityID AND d.Folio = dt.Folio
-    """
+# Consulta "delgada": sin los CTE de términos de pago; Vencimiento y
+# CreditDaysLabel se resuelven en Python con las tablas de term_lookups.py.
+SLIM_REPORT_QUERY = os.getenv("SLIM_REPORT_QUERY", "true").lower() in ("1", "true", "yes")
+# Las consultas chicas que le faltan en caché a un reporte van en un solo lote (ver prefetch_report_inputs)
+BATCHED_QUERIES = os.getenv("BATCHED_QUERIES", "true").lower() in ("1", "true", "yes")
+
+# --- Lógica de SQL (las consultas y sus variantes están en query_catalog.py) ---
+def build_report_query(
+    as_of: datetime.date, 
+    customer_id: int | None,
+    start_date: datetime.date | None = None,
+    end_date: datetime.date | None = None,
+    filter_mode: str = "to_date",
+    slim: bool = False
+) -> tuple[str, list]:
+    """Texto SQL y parámetros de la consulta de saldos según los filtros (ver query_catalog.py)."""
+    variant, params = select_report_variant(as_of, customer_id, start_date, end_date, filter_mode, slim)
+    return variant.sql, params
 
 def fetch_report_data(
     conn: pyodbc.Connection, 
@@ -87,64 +62,171 @@ def fetch_report_data(
     end_date: datetime.date | None = None,
     filter_mode: str = "to_date"
 ) -> List[pyodbc.Row]:
+    variant, params = select_report_variant(as_of, customer_id, start_date, end_date, filter_mode)
+    return fetch_all(conn, variant.sql, params, name=variant.name, prepared=True)
+
+def report_variant_for(filters: ReportFilters) -> tuple[QueryVariant, list]:
+    return select_report_variant(
+        as_of=filters.as_of,
+        customer_id=filters.customer_id,
+        start_date=filters.start_date,
+        end_date=filters.end_date,
+        filter_mode=filters.filter_mode,
+        slim=SLIM_REPORT_QUERY
+    )
+
+def _report_query_for(filters: ReportFilters) -> tuple[str, list]:
+    variant, params = report_variant_for(filters)
+    return variant.sql, params
+
+def report_rows_key(company_key: str, filters: ReportFilters) -> tuple:
+    """Clave de caché de las filas crudas: empresa + texto SQL + parámetros."""
+    sql, params = _report_query_for(filters)
+    return (company_key, sql, tuple(params))
+
+def load_report_rows(
+    conn: pyodbc.Connection,
+    company_key: str,
+    filters: ReportFilters,
+    refresh: bool = False,
+    cancel: CancelToken | None = None,
+    ttl: float | None = None
+) -> List[pyodbc.Row]:
+    """
+    Igual que fetch_report_data pero pasando por la caché de resultados: si ya se
+    consultó la misma empresa con los mismos parámetros SQL (y no ha expirado),
+    se reutilizan esas filas. Cambiar solo el esquema de antigüedad o el formato
+    de salida NO vuelve a consultar SQL Server.
+
+    Con `refresh=True` siempre se consulta y se reemplaza la entrada (warm-up),
+    con vigencia `ttl` si se indica.
+    Con `cancel`, la consulta se cancela si el cliente se desconecta.
+
+    Si se pide un solo cliente y el resultado de todos los clientes con las
+    mismas fechas ya está en caché, se recorta de ahí sin consultar (ver
+    customer_index.py).
+    """
+    if filters.customer_id and not refresh:
+        all_key = report_rows_key(company_key, filters.model_copy(update={"customer_id": None}))
+        all_rows = report_rows_cache.get_entry(all_key)
+        if all_rows is not None:
+            return index_for(all_key, *all_rows).rows_for(filters.customer_id)
 
-    sql = _get_sql_base()
-    params = []
+    variant, params = report_variant_for(filters)
+    key = (company_key, variant.sql, tuple(params))
 
-    # "basado en la fecha de Arrival Date"
-    sql += " WHERE 1=1 "
+    def _load() -> List[pyodbc.Row]:
+        rows = fetch_all(
+            conn, variant.sql, params, name=variant.name, company=company_key, prepared=True, cancel=cancel
+        )
+        if SLIM_REPORT_QUERY:
+            apply_term_lookups(conn, company_key, rows)
+        return rows
+
+    if refresh:
+        rows = _load()
+        report_rows_cache.put(key, rows, ttl=ttl)
+        return rows
+    return report_rows_cache.get_or_load(key, _load)
 
-    if filter_mode == "date_range" or filter_mode == "current_month":
-        if start_date:
-            sql += " AND d.ArrivalDate >= ? "
-            params.append(start_date)
-        if end_date:
-            sql += " AND d.ArrivalDate <= ? "
-            params.append(end_date)
-    else:
-        # "to_date" or default (Desde el inicio hasta la fecha X)
-        # Use end_date if present, else as_of
-        cutoff = end_date if end_date else as_of
-        sql += " AND d.ArrivalDate <= ? "
-        params.append(cutoff)
+def resolve_aging_scheme(company_key: str, filters: ReportFilters) -> AgingScheme:
+    """
+    Determina el esquema de antigüedad para la petición: el indicado en los filtros
+    o, si no viene, el configurado para la empresa. `aging_basis` y
+    `aging_boundaries` permiten ajustar el esquema en la misma petición.
+    """
+    try:
+        scheme = get_scheme(filters.aging_scheme or get_tenant_setting(company_key, "aging_scheme"))
+        return scheme.with_overrides(basis=filters.aging_basis, boundaries=filters.aging_boundaries)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if customer_id:
-        sql += " AND d.BusinessEntityID = ? " 
-        params.append(customer_id)
+def fx_consolidator_for(
+    company_key: str,
+    filters: ReportFilters,
+    force: bool = False,
+    include_customers: bool = True
+) -> FxConsolidator | None:
+    """
+    Crea el consolidador multimoneda si la petición pide `reporting_currency`
+    (o si `force`, en cuyo caso se consolida a la moneda local de la empresa).
+    """
+    if not (filters.reporting_currency or force):
+        return None
+    return FxConsolidator(
+        local_currency=get_tenant_setting(company_key, "local_currency", "MXN"),
+        reporting_currency=filters.reporting_currency,
+        reporting_rate=filters.reporting_fx_rate,
+        include_customers=include_customers
+    )
 
-    sql += " ORDER BY Cliente, InvoiceDate, Folio;"
+def consolidated_totals(fx: FxConsolidator | None, scheme: AgingScheme) -> ConsolidatedTotals | None:
+    if fx is None:
+        return None
+    try:
+        return fx.result(scheme.bucket_keys)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return fetch_all(conn, sql, params)
+def aging_scheme_info(scheme: AgingScheme) -> AgingSchemeInfo:
+    return AgingSchemeInfo(
+        key=scheme.key,
+        name=scheme.name,
+        basis=scheme.basis,
+        boundaries=list(scheme.boundaries),
+        labels=scheme.labels,
+        bucket_keys=scheme.bucket_keys
+    )
 
-def fetch_customer_credit_info(conn: pyodbc.Connection, customer_id: int) -> CustomerCreditInfo | None:
+def fetch_customer_credit_info(
+    conn: pyodbc.Connection,
+    customer_id: int,
+    company_key: str | None = None
+) -> CustomerCreditInfo | None:
     """
     Obtiene el límite de crédito predeterminado y el término de pago (en días o nombre)
     específico para un cliente. Esta información aparecerá en el encabezado del reporte para referencia.
     Filtra los clientes eliminados usando ISNULL(c.DeletedBy, 0) = 0.
     """
-    sql = """
-        SELECT TOP 1 
-            c.CreditLimit, 
-            t.PaymentTermName,
-            ISNULL(cr.Currency, 'MXN') AS Currency
-        FROM dbo.orgCustomer c
-        LEFT OUTER JOIN dbo.engPaymentTerm t ON c.PaymentTermID = t.PaymentTermID
-        LEFT OUTER JOIN dbo.engRefCurrency cr ON c.CurrencyID = cr.CurrencyID
-        WHERE c.BusinessEntityID = ? AND ISNULL(c.DeletedBy, 0) = 0
-    """
     try:
-        rows = fetch_all(conn, sql, [customer_id])
-        if rows:
-            row = rows[0]
-            return CustomerCreditInfo(
-                credit_limit=float(row.CreditLimit or 0.0),
-                payment_terms=row.PaymentTermName or "N/A",
-                currency=row.Currency
-            )
+        rows = fetch_all(conn, _CUSTOMER_CREDIT_SQL, [customer_id], name="customer_credit_info", company=company_key)
+        return credit_info_from_rows(rows)
     except Exception as e:
         print(f"Error fetching credit info: {e}")
     return None
 
+_CUSTOMER_CREDIT_SQL = """
+    SELECT TOP 1 
+        c.CreditLimit, 
+        t.PaymentTermName,
+        ISNULL(cr.Currency, 'MXN') AS Currency
+    FROM dbo.orgCustomer c
+    LEFT OUTER JOIN dbo.engPaymentTerm t ON c.PaymentTermID = t.PaymentTermID
+    LEFT OUTER JOIN dbo.engRefCurrency cr ON c.CurrencyID = cr.CurrencyID
+    WHERE c.BusinessEntityID = ? AND ISNULL(c.DeletedBy, 0) = 0
+"""
+
+def credit_info_from_rows(rows: List[pyodbc.Row]) -> CustomerCreditInfo | None:
+    if not rows:
+        return None
+    row = rows[0]
+    return CustomerCreditInfo(
+        credit_limit=float(row.CreditLimit or 0.0),
+        payment_terms=row.PaymentTermName or "N/A",
+        currency=row.Currency
+    )
+
+def get_customer_credit_info(
+    conn: pyodbc.Connection,
+    customer_id: int,
+    company_key: str
+) -> CustomerCreditInfo | None:
+    """fetch_customer_credit_info pasando por `customer_credit_cache` (los errores no se guardan)."""
+    return customer_credit_cache.get_or_load(
+        (company_key, customer_id),
+        lambda: fetch_customer_credit_info(conn, customer_id, company_key)
+    )
+
 # --- Lógica de Procesamiento (Directa de tu script) ---
 def _calculate_days_since(as_of: datetime.date, arrival: datetime.date) -> int:
     if not isinstance(as_of, datetime.date) or not isinstance(arrival, datetime.date):
@@ -157,19 +239,39 @@ def _calculate_days_since(as_of: datetime.date, arrival: datetime.date) -> int:
 
 def process_report_data(
     raw_data: List[pyodbc.Row], 
-    as_of: datetime.date
+    as_of: datetime.date,
+    scheme: AgingScheme | None = None,
+    fx: FxConsolidator | None = None,
+    cancel: CancelToken | None = None
 ) -> Dict[str, CurrencyGroup]:
     """
     Procesa las filas crudas (raw data) extraídas de SQL.
-    Realiza lo siguiente:
+    Realiza lo siguiente en una sola pasada sobre las filas:
     1.  Mapea cada fila a un objeto ReceivableEntry.
     2.  Calcula los días transcurridos (`days_since`) que el saldo lleva como abierto basado en la fecha `as_of` objetivo.
-    3.  Aplica el bucket de envejecimiento (Aging Bucket) según los días transcurridos: Not Due, 0-21, 22-30, 31-45, 45+.
+    3.  Aplica el bucket de envejecimiento (Aging Bucket) según el esquema indicado (por defecto: Not Due, 0-21, 22-30, 31-45, 45+).
+        Los días se miden desde la fecha base del esquema (llegada, vencimiento o factura).
     4.  Separa el saldo de Facturas (Real Balance) del saldo exclusivo de Pedidos (P.O. Balance).
-    5.  Agrupa todo este resultado separando por tipo de 'Moneda'.
+    5.  Agrupa todo este resultado separando por tipo de 'Moneda', acumulando totales y resumen por cliente.
+    6.  Si se pasa `fx`, alimenta en el mismo ciclo la consolidación a una moneda de reporte (ver fx.py).
+    Si se pasa `cancel`, se detiene (499) cuando el cliente se desconecta.
     """
-    processed_entries: List[ReceivableEntry] = []
-    for row in raw_data:
+    bucketer = (scheme or get_scheme(None)).compile()
+    bounds = bucketer.bounds
+    labels = bucketer.labels
+    bucket_keys = bucketer.keys[1:]
+    n_slots = len(bucketer.keys)
+    legacy_keys = [k for k in bucket_keys if k in LEGACY_BUCKET_FIELDS]
+
+    entries_by_cur: Dict[str, List[ReceivableEntry]] = defaultdict(list)
+    # Por moneda: [total, paid, balance, po_balance, real_balance, overdue, rango_0..rango_n]
+    totals_by_cur: Dict[str, List[float]] = {}
+    # Por moneda y cliente: [total_balance, overdue, rango_0..rango_n] (rango_0 = Not Due)
+    aging_by_cur: Dict[str, Dict[str, List[float]]] = defaultdict(dict)
+    if fx is not None:
+        fx.start(n_slots)
+
+    for row in (cancel.iter_rows(raw_data) if cancel is not None else raw_data):
         entry = ReceivableEntry(
             customer_name=row.Cliente,
             module=row.Modulo or "",
@@ -203,214 +305,508 @@ def process_report_data(
             entry.po_balance = 0.0
             entry.real_balance = entry.balance
 
-        d = entry.days_since
-        if d <= 0: entry.aging_bucket = "Not Due"
-        elif 0 <= d <= 21: entry.aging_bucket = "0-21"
-        elif 22 <= d <= 30: entry.aging_bucket = "22-30"
-        elif 31 <= d <= 45: entry.aging_bucket = "31-45"
-        else: entry.aging_bucket = "45+"
-        processed_entries.append(entry)
-    
+        # Días de antigüedad según la fecha base del esquema
+        if bucketer.scheme.basis == "arrival":
+            d = entry.days_since
+        elif bucketer.scheme.basis == "due":
+            d = entry.days_overdue
+        else:
+            d = _calculate_days_since(as_of, entry.invoice_date)
+        slot = bisect_left(bounds, d)
+        entry.aging_bucket = labels[slot]
+
+        cur = entry.currency
+        if not cur:
+            continue
+        entries_by_cur[cur].append(entry)
+        if fx is not None:
+            fx.add(cur, entry, slot)
+
+        saldo = entry.balance
+        tot = totals_by_cur.get(cur)
+        if tot is None:
+            tot = totals_by_cur[cur] = [0.0] * (6 + n_slots)
+        tot[0] += entry.total
+        tot[1] += entry.paid
+        tot[2] += saldo
+        tot[3] += entry.po_balance
+        tot[4] += entry.real_balance
+        tot[6 + slot] += saldo
+
+        agg = aging_by_cur[cur].get(entry.customer_name)
+        if agg is None:
+            agg = aging_by_cur[cur][entry.customer_name] = [0.0] * (2 + n_slots)
+        agg[0] += saldo
+        agg[2 + slot] += saldo
+        if slot:
+            tot[5] += saldo
+            agg[1] += saldo
+
     final_data: Dict[str, CurrencyGroup] = {}
-    currencies = sorted({e.currency for e in processed_entries if e.currency})
-    for cur in currencies:
-        cur_entries = [e for e in processed_entries if e.currency == cur]
+    for cur in sorted(entries_by_cur):
+        tot = totals_by_cur[cur]
         cur_totals = {
-            "total": sum(e.total for e in cur_entries),
-            "paid": sum(e.paid for e in cur_entries),
-            "balance": sum(e.balance for e in cur_entries),
-            "po_balance": sum(e.po_balance for e in cur_entries),
-            "real_balance": sum(e.real_balance for e in cur_entries),
+            "total": tot[0],
+            "paid": tot[1],
+            "balance": tot[2],
+            "po_balance": tot[3],
+            "real_balance": tot[4],
+            "not_yet_due": tot[6],
+            "overdue": tot[5],
         }
-        aging_by_customer = defaultdict(AgingSummary)
-        for e in cur_entries:
-            agg = aging_by_customer[e.customer_name]
-            saldo = e.balance
-            d = e.days_since
-            agg.total_balance += saldo
-            if d <= 0: agg.not_yet_due += saldo
-            else: agg.overdue += saldo
-            if 0 <= d <= 21: agg.bucket_0_21 += saldo
-            elif 22 <= d <= 30: agg.bucket_22_30 += saldo
-            elif 31 <= d <= 45: agg.bucket_31_45 += saldo
-            elif d > 45: agg.bucket_45_plus += saldo
+        cur_totals.update(zip(bucket_keys, tot[7:]))
+
+        aging_summary = {}
+        for cust, agg in aging_by_cur[cur].items():
+            buckets = dict(zip(bucket_keys, agg[3:]))
+            aging_summary[cust] = AgingSummary(
+                total_balance=agg[0],
+                not_yet_due=agg[2],
+                overdue=agg[1],
+                buckets=buckets,
+                **{k: buckets[k] for k in legacy_keys}
+            )
         final_data[cur] = CurrencyGroup(
             currency=cur,
-            entries=cur_entries,
+            entries=entries_by_cur[cur],
             totals=cur_totals,
-            aging_summary=dict(aging_by_customer)
+            aging_summary=aging_summary
         )
     return final_data
 
+def report_data_key(company_key: str, filters: ReportFilters, scheme: AgingScheme) -> tuple:
+    return (report_rows_key(company_key, filters), filters.as_of, scheme)
+
+def load_report_data(
+    conn: pyodbc.Connection,
+    company_key: str,
+    filters: ReportFilters,
+    scheme: AgingScheme,
+    fx: FxConsolidator | None = None,
+    cancel: CancelToken | None = None,
+    not_found: str = "No data found for the selected filters."
+) -> Dict[str, CurrencyGroup]:
+    """
+    Filas del reporte (load_report_rows) ya procesadas; 404 si no hay datos.
+    Sin consolidación (fx=None) el resultado se guarda en report_data_cache:
+    con la caché compartida, otro worker que pida la misma vista no vuelve a
+    leer ni a procesar las filas.
+    """
+    key = report_data_key(company_key, filters, scheme) if fx is None else None
+    if key is not None:
+        processed_data = report_data_cache.get(key)
+        if processed_data:
+            return processed_data
+    raw_data = load_report_rows(conn, company_key, filters, cancel=cancel)
+    if not raw_data:
+        raise HTTPException(status_code=404, detail=not_found)
+    processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of, scheme=scheme, fx=fx, cancel=cancel)
+    if key is not None:
+        report_data_cache.put(key, processed_data)
+    return processed_data
+
+_CUSTOMER_LIST_SQL = "SELECT BusinessEntityID AS id, BusinessEntity AS name FROM dbo.vwLBSCustomerList WHERE ISNULL([Deleted],0)=0 ORDER BY BusinessEntity;"
+
+def customer_list_from_rows(rows: List[pyodbc.Row]) -> List[dict]:
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+def prefetch_report_inputs(
+    conn: pyodbc.Connection,
+    company_key: str,
+    filters: ReportFilters,
+    scheme: AgingScheme | None = None,
+    cancel: CancelToken | None = None
+) -> int:
+    """
+    Trae en un solo lote (un viaje a SQL Server, ver fetch_batch) las consultas
+    chicas que le faltan en caché a un reporte: las tablas de términos, el
+    crédito del cliente y la lista de clientes del filtro. Cada resultado queda
+    en su caché, así que después load_report_rows, get_customer_credit_info y
+    /filters/customers no las consultan.
+
+    La consulta del reporte no va en el lote: sigue en load_report_rows con su
+    cursor preparado (fetch_all con prepared=True) y su plan reutilizado. Las
+    partes van siempre en el mismo orden, así que solo hay cuatro formas de lote,
+    cada una con su texto fijo y su cursor preparado: términos + crédito,
+    términos + lista, crédito + lista y las tres. Si falta una sola parte no hay
+    lote: el camino normal hace ese viaje.
+
+    Las tablas de términos solo se piden si las filas se van a consultar; con
+    `scheme`, tampoco si el resultado ya procesado está en report_data_cache
+    (load_report_data no va a leer las filas).
+
+    Devuelve cuántas consultas fueron en el lote (0 si no hubo lote). Si el lote
+    falla por algo que no es timeout ni cancelación, cada parte se vuelve a
+    intentar por separado en el camino normal.
+    """
+    if not BATCHED_QUERIES:
+        return 0
+    # (consultas, función que guarda sus resultados), en el orden fijo del lote
+    parts = []
+    batch_ms = 0.0
+
+    if SLIM_REPORT_QUERY and term_lookups_cache.get(company_key) is None:
+        all_rows_cached = bool(filters.customer_id) and report_rows_cache.get(
+            report_rows_key(company_key, filters.model_copy(update={"customer_id": None}))
+        ) is not None
+        data_cached = scheme is not None and report_data_cache.get(report_data_key(company_key, filters, scheme)) is not None
+        if not all_rows_cached and not data_cached and report_rows_cache.get(report_rows_key(company_key, filters)) is None:
+            parts.append((TERM_LOOKUP_STATEMENTS, lambda results: term_lookups_cache.put(
+                company_key, term_lookups_from_results(results, batch_ms)
+            )))
+
+    if filters.customer_id and customer_credit_cache.get((company_key, filters.customer_id)) is None:
+        parts.append(([("customer_credit_info", _CUSTOMER_CREDIT_SQL, [filters.customer_id])], lambda results: customer_credit_cache.put(
+            (company_key, filters.customer_id), credit_info_from_rows(results[0])
+        )))
+
+    if customer_list_cache.get(company_key) is None:
+        parts.append(([("customer_list", _CUSTOMER_LIST_SQL, [])], lambda results: customer_list_cache.put(
+            company_key, customer_list_from_rows(results[0])
+        )))
+
+    if len(parts) < 2:
+        return 0
+    statements = [statement for part, _ in parts for statement in part]
+    t0 = time.perf_counter()
+    try:
+        results = fetch_batch(conn, statements, company=company_key, prepared=True, cancel=cancel)
+    except HTTPException as e:
+        if e.status_code in (499, 504):
+            raise
+        print(f"Batched report queries failed, falling back to one query each: {e.detail}")
+        return 0
+    batch_ms = (time.perf_counter() - t0) * 1000
+    for part, consume in parts:
+        consume(results[:len(part)])
+        results = results[len(part):]
+    return len(statements)
+
 # --- Endpoints ---
 
 @router.get("/filters/customers", response_model=List[CustomerFilterItem])
 def get_customer_list(
     current_user: CurrentUser,
-    sql_conn: SqlServerConnDep
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep
 ) -> List[CustomerFilterItem]:
-    query = "SELECT BusinessEntityID AS id, BusinessEntity AS name FROM dbo.vwLBSCustomerList WHERE ISNULL([Deleted],0)=0 ORDER BY BusinessEntity;"
+    def _load():
+        return customer_list_from_rows(fetch_all(sql_conn, _CUSTOMER_LIST_SQL, name="customer_list", company=company_key))
+
     try:
-        rows = fetch_all(sql_conn, query)
-        customers = [{"id": row.id, "name": row.name} for row in rows]
-        return customers
+        return customer_list_cache.get_or_load(company_key, _load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/aging-schemes")
+def get_aging_schemes(
+    current_user: CurrentUser,
+    company_key: CompanyKeyDep
+):
+    """Catálogo de esquemas de antigüedad disponibles y el predeterminado de la empresa."""
+    return {
+        "default": get_tenant_setting(company_key, "aging_scheme") or get_scheme(None).key,
+        "schemes": list_schemes()
+    }
+
+@router.get("/term-lookups")
+def get_term_lookups_status(current_user: CurrentUser, company_key: CompanyKeyDep):
+    """Estado de las tablas de términos de pago en caché de la empresa (solo admins)."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    lookups = term_lookups_cache.get(company_key)
+    return {"company": company_key, "slim_query": SLIM_REPORT_QUERY, "lookups": lookups.stats() if lookups else None}
+
+@router.post("/term-lookups/refresh")
+def refresh_term_lookups(current_user: CurrentUser, sql_conn: SqlServerConnDep, company_key: CompanyKeyDep):
+    """
+    Recarga los términos de pago de la empresa (ej. después de cambiar un término)
+    y descarta los resultados en caché que se calcularon con los anteriores.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    lookups = get_term_lookups(sql_conn, company_key, refresh=True)
+    report_rows_cache.invalidate(lambda key: key[0] == company_key)
+    report_data_cache.invalidate(lambda key: key[0][0] == company_key)
+    customer_index_cache.invalidate(lambda key: key[0] == company_key)
+    customer_credit_cache.invalidate(lambda key: key[0] == company_key)
+    report_kpis_cache.invalidate(lambda key: key[0][0] == company_key)
+    return {"company": company_key, "lookups": lookups.stats()}
+
 @router.post("/receivables-preview", response_model=ReceivablesReportData)
 def run_receivables_report(
     filters: ReportFilters,
     # current_user: CurrentUser,
-    sql_conn: SqlServerConnDep
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
 ) -> ReceivablesReportData:
     try:
-        raw_data = fetch_report_data(
-            conn=sql_conn, 
-            as_of=filters.as_of, 
-            customer_id=filters.customer_id,
-            start_date=filters.start_date,
-            end_date=filters.end_date,
-            filter_mode=filters.filter_mode
-        )
-        if not raw_data:
-            raise HTTPException(status_code=404, detail="No data found for the selected filters.")
-        
-        processed_data = process_report_data(
-            raw_data=raw_data, as_of=filters.as_of
-        )
+        scheme = resolve_aging_scheme(company_key, filters)
+        fx = fx_consolidator_for(company_key, filters)
+        prefetch_report_inputs(sql_conn, company_key, filters, scheme=None if fx else scheme, cancel=cancel)
+        processed_data = load_report_data(sql_conn, company_key, filters, scheme, fx=fx, cancel=cancel)
         
         credit_info = None
         if filters.customer_id:
-            credit_info = fetch_customer_credit_info(sql_conn, filters.customer_id)
-            
-        return ReceivablesReportData(
+            credit_info = get_customer_credit_info(sql_conn, filters.customer_id, company_key)
+
+        # Las partes ya son modelos validados: se arma sin validar y se serializa una sola vez
+        return model_response(ReceivablesReportData.model_construct(
             data_by_currency=processed_data,
-            customer_credit_info=credit_info
-        )
+            customer_credit_info=credit_info,
+            aging_scheme=aging_scheme_info(scheme),
+            consolidated=consolidated_totals(fx, scheme)
+        ))
     except Exception as e:
         raise e
 
+def kpis_cache_key(company_key: str, filters: ReportFilters, scheme: AgingScheme, top_n: int) -> tuple:
+    return (
+        report_rows_key(company_key, filters), filters.as_of, scheme, top_n,
+        filters.reporting_currency, filters.reporting_fx_rate
+    )
+
+def build_receivables_kpis(
+    conn: pyodbc.Connection,
+    company_key: str,
+    filters: ReportFilters,
+    scheme: AgingScheme,
+    top_n: int = 10,
+    refresh: bool = False,
+    cancel: CancelToken | None = None
+) -> ReceivablesKpis:
+    """Calcula los KPIs del dashboard a partir de las filas (en caché) del reporte."""
+    raw_data = load_report_rows(conn, company_key, filters, refresh=refresh, cancel=cancel)
+    if not raw_data:
+        raise HTTPException(status_code=404, detail="No data found for the selected filters.")
+    fx = fx_consolidator_for(company_key, filters, include_customers=False)
+    processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of, scheme=scheme, fx=fx, cancel=cancel)
+    return compute_receivables_kpis(
+        processed_data, as_of=filters.as_of, scheme=scheme,
+        aging_scheme=aging_scheme_info(scheme), top_n=top_n,
+        consolidated=consolidated_totals(fx, scheme)
+    )
+
+@router.post("/receivables-kpis", response_model=ReceivablesKpis)
+def get_receivables_kpis(
+    filters: ReportFilters,
+    current_user: CurrentUser,
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep,
+    top_n: int = 10
+) -> ReceivablesKpis:
+    """
+    KPIs del dashboard (ventanas de vencimiento, top N clientes por saldo, totales
+    por moneda y por rango de antigüedad) sin enviar las filas de detalle.
+    Se calculan sobre las filas en caché y el resultado también queda en caché.
+    """
+    scheme = resolve_aging_scheme(company_key, filters)
+    top_n = max(1, min(top_n, 100))
+    return report_kpis_cache.get_or_load(
+        kpis_cache_key(company_key, filters, scheme, top_n),
+        lambda: build_receivables_kpis(sql_conn, company_key, filters, scheme, top_n, cancel=cancel)
+    )
+
+@router.post("/receivables-top-customers", response_model=CustomerRanking)
+def get_top_customers(
+    filters: ReportFilters,
+    current_user: CurrentUser,
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep,
+    metric: str = "total",
+    top_n: int = 10,
+    currency: str | None = None,
+    fx_normalize: bool = False
+) -> CustomerRanking:
+    """
+    Top N clientes por cualquier métrica del resumen: total, not_yet_due, overdue
+    o un rango del esquema (ej. '45+'). Con `fx_normalize` se suman todas las
+    monedas convertidas con el TC de cada documento a `reporting_currency`
+    (o a la moneda local de la empresa si no se indica).
+    """
+    scheme = resolve_aging_scheme(company_key, filters)
+    top_n = max(1, min(top_n, 500))
+    if currency and fx_normalize:
+        raise HTTPException(status_code=400, detail="Use either 'currency' or 'fx_normalize', not both.")
+    try:
+        metric_key = resolve_metric(metric, scheme)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    raw_data = load_report_rows(sql_conn, company_key, filters, cancel=cancel)
+    if not raw_data:
+        raise HTTPException(status_code=404, detail="No data found for the selected filters.")
+    fx = fx_consolidator_for(company_key, filters, force=fx_normalize) if fx_normalize else None
+    processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of, scheme=scheme, fx=fx, cancel=cancel)
+    consolidated = consolidated_totals(fx, scheme)
+
+    items = rank_customers(
+        processed_data, scheme,
+        metric=metric_key,
+        top_n=top_n,
+        currency=currency,
+        consolidated=consolidated
+    )
+    return CustomerRanking(
+        metric=metric_key,
+        currency=consolidated.currency if consolidated else currency,
+        fx_normalized=fx_normalize,
+        unconverted_documents=consolidated.unconverted_documents if consolidated else 0,
+        aging_scheme=aging_scheme_info(scheme),
+        items=items
+    )
+
 # --- Importaciones para descarga ---
-from starlette.responses import StreamingResponse
+from starlette.responses import StreamingResponse, FileResponse, Response
+from fastapi import Header
 import io
-from . import report_builder
+import re
+# Los generadores (openpyxl/reportlab) se importan hasta la primera descarga
+from .exports import get_export_format, EXPORT_FORMATS
+from .artifact_cache import artifact_cache, artifact_fingerprint
 
-@router.post("/receivables-download-excel")
-def download_receivables_report_excel(
+_ARTIFACT_NAME = re.compile(r"^([0-9a-f]{32})\.([a-z]+)$")
+# Formatos de documento por extensión (los de streaming no se guardan)
+_DOCUMENT_FORMATS = {f.extension: f for f in EXPORT_FORMATS.values() if not f.streaming}
+
+def _artifact_response(path: str, stat_result: os.stat_result, name: str, media_type: str, filename: str) -> FileResponse:
+    digest = name.split(".", 1)[0]
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        stat_result=stat_result,
+        headers={
+            # El contenido de un nombre nunca cambia
+            "ETag": f'"{digest}"',
+            "Cache-Control": "private, max-age=86400, immutable",
+            "Content-Location": f"/api/reports/artifacts/{name}",
+        }
+    )
+
+@router.post("/receivables-download/{export_format}")
+def download_receivables_report(
+    export_format: str,
     filters: ReportFilters,
     current_user: CurrentUser,
-    sql_conn: SqlServerConnDep
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
 ):
+    """
+    Descarga el reporte en cualquier formato registrado en exports.py
+    (excel, pdf, html, csv, tsv, parquet, arrow...). Los formatos de streaming
+    (CSV/TSV, Parquet/Arrow) se escriben directo desde las filas. Los
+    documentos (Excel, PDF, HTML) se guardan en disco por huella de sus datos
+    (artifact_cache.py) y una descarga repetida se sirve desde el archivo.
+
+    Si el cliente se desconecta se cancela la consulta y el armado se detiene
+    entre lotes de filas (ver cancellation.py).
+    """
     try:
-        raw_data = fetch_report_data(
-            conn=sql_conn, 
-            as_of=filters.as_of, 
-            customer_id=filters.customer_id,
-            start_date=filters.start_date,
-            end_date=filters.end_date,
-            filter_mode=filters.filter_mode
-        )
-        if not raw_data:
-            raise HTTPException(status_code=404, detail="No data found for selected filters.")
-        processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of)
-        
-        credit_info = None
-        if filters.customer_id:
-            credit_info = fetch_customer_credit_info(sql_conn, filters.customer_id)
-            
-        excel_file_stream = report_builder.create_excel_report(
-            data=processed_data, 
-            logo_path="", 
-            filters=filters.model_dump(),
-            credit_info=credit_info
-        )
+        fmt = get_export_format(export_format)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        scheme = resolve_aging_scheme(company_key, filters)
+        prefetch_report_inputs(sql_conn, company_key, filters, scheme=None if fmt.streaming else scheme, cancel=cancel)
+        if fmt.streaming:
+            raw_data = load_report_rows(sql_conn, company_key, filters, cancel=cancel)
+            if not raw_data:
+                raise HTTPException(status_code=404, detail="No data found for selected filters.")
+            content = fmt.load()(cancel.stream_rows(raw_data), filters.as_of, scheme)
+        else:
+            processed_data = load_report_data(
+                sql_conn, company_key, filters, scheme, cancel=cancel,
+                not_found="No data found for selected filters."
+            )
+
+            credit_info = None
+            if filters.customer_id:
+                credit_info = get_customer_credit_info(sql_conn, filters.customer_id, company_key)
+
+            cancel.check()
+            def render():
+                return fmt.load()(
+                    data=processed_data,
+                    logo_path="",
+                    filters=filters.model_dump(),
+                    credit_info=credit_info,
+                    aging_scheme=scheme
+                )
+
+            if artifact_cache is not None:
+                # Mismos datos, filtros y formato = mismo archivo; se sirve desde disco
+                name = f"{artifact_fingerprint(fmt, processed_data, filters, credit_info, scheme)}.{fmt.extension}"
+                path, stat_result = artifact_cache.get_or_render(company_key, name, render)
+                filename = f"Accounts_Receivable_Aging_{filters.as_of.strftime('%Y%m%d')}.{fmt.extension}"
+                return _artifact_response(path, stat_result, name, fmt.media_type, filename)
+            content = render()
         date_str = filters.as_of.strftime('%Y%m%d')
-        filename = f"Accounts_Receivable_Aging_{date_str}.xlsx"
+        filename = f"Accounts_Receivable_Aging_{date_str}.{fmt.extension}"
         return StreamingResponse(
-            content=excel_file_stream,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            content=content,
+            media_type=fmt.media_type,
             headers={"Content-Disposition": f"attachment; filename=\"{filename}\""}
         )
     except Exception as e:
-        print(f"Error building Excel: {e}")
+        print(f"Error building {fmt.key}: {e}")
         raise e
 
+@router.get("/artifacts/{name}")
+def get_report_artifact(
+    name: str,
+    current_user: CurrentUser,
+    company_key: CompanyKeyDep,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    """
+    Vuelve a servir un documento ya generado (Content-Location de la descarga).
+    Acepta Range / If-Range para reanudar descargas y If-None-Match (304).
+    """
+    match = _ARTIFACT_NAME.match(name)
+    fmt = _DOCUMENT_FORMATS.get(match.group(2)) if match else None
+    if artifact_cache is None or fmt is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    found = artifact_cache.get(company_key, name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    etag = f'"{match.group(1)}"'
+    if if_none_match and etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return _artifact_response(found[0], found[1], name, fmt.media_type, name)
+
+# Rutas anteriores (las usa el frontend); delegan en la ruta genérica
+@router.post("/receivables-download-excel")
+def download_receivables_report_excel(
+    filters: ReportFilters,
+    current_user: CurrentUser,
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
+):
+    return download_receivables_report("excel", filters, current_user, sql_conn, company_key, cancel)
+
 @router.post("/receivables-download-pdf")
 def download_receivables_report_pdf(
     filters: ReportFilters,
     current_user: CurrentUser,
-    sql_conn: SqlServerConnDep
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
 ):
-    try:
-        raw_data = fetch_report_data(
-            conn=sql_conn, 
-            as_of=filters.as_of, 
-            customer_id=filters.customer_id,
-            start_date=filters.start_date,
-            end_date=filters.end_date,
-            filter_mode=filters.filter_mode
-        )
-        if not raw_data:
-            raise HTTPException(status_code=404, detail="No data found for selected filters.")
-        processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of)
-        
-        credit_info = None
-        if filters.customer_id:
-            credit_info = fetch_customer_credit_info(sql_conn, filters.customer_id)
-
-        pdf_file_stream = report_builder.create_pdf_report(
-            data=processed_data, 
-            logo_path="", 
-            filters=filters.model_dump(),
-            credit_info=credit_info
-        )
-        date_str = filters.as_of.strftime('%Y%m%d')
-        filename = f"Accounts_Receivable_Aging_{date_str}.pdf"
-        return StreamingResponse(
-            content=pdf_file_stream,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=\"{filename}\""}
-        )
-    except Exception as e:
-        print(f"Error building PDF: {e}")
-        raise e
+    return download_receivables_report("pdf", filters, current_user, sql_conn, company_key, cancel)
 
 @router.post("/receivables-download-html")
 def download_receivables_report_html(
     filters: ReportFilters,
     current_user: CurrentUser,
-    sql_conn: SqlServerConnDep
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
 ):
-    try:
-        raw_data = fetch_report_data(
-            conn=sql_conn, 
-            as_of=filters.as_of, 
-            customer_id=filters.customer_id,
-            start_date=filters.start_date,
-            end_date=filters.end_date,
-            filter_mode=filters.filter_mode
-        )
-        if not raw_data:
-            raise HTTPException(status_code=404, detail="No data found for selected filters.")
-        processed_data = process_report_data(raw_data=raw_data, as_of=filters.as_of)
-        
-        credit_info = None
-        if filters.customer_id:
-            credit_info = fetch_customer_credit_info(sql_conn, filters.customer_id)
-
-        html_file_stream = report_builder.create_html_report(
-            data=processed_data, 
-            logo_path="", 
-            filters=filters.model_dump(),
-            credit_info=credit_info
-        )
-        date_str = filters.as_of.strftime('%Y%m%d')
-        filename = f"Accounts_Receivable_Aging_{date_str}.html"
-        return StreamingResponse(
-            content=html_file_stream,
-            media_type="text/html",
-            headers={"Content-Disposition": f"attachment; filename=\"{filename}\""}
-        )
-    except Exception as e:
-        print(f"Error building HTML: {e}")
-        raise e
\ No newline at end of file
+    return download_receivables_report("html", filters, current_user, sql_conn, company_key, cancel)
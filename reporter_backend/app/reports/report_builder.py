@@ -5,8 +5,9 @@ import decimal
 from typing import Dict, Any, List
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image as XLImage
-from openpyxl.formatting.rule import CellIsRule
+from openpyxl.formatting.rule import CellIsRule, FormulaRule
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak, Spacer, Image as RLImage
 from reportlab.lib import colors
@@ -16,6 +17,7 @@ from reportlab.pdfgen import canvas as rl_canvas
 
 # Importamos los esquemas que definimos
 from .report_schemas import CurrencyGroup, AgingSummary, CustomerCreditInfo
+from .aging import AgingScheme, get_scheme
 
 # --- Tus Helpers de Estilo Originales ---
 THEME = {
@@ -37,7 +39,7 @@ def border_all():
 
 def set_col_widths(ws, widths):
     for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[chr(64 + i)].width = w
+        ws.column_dimensions[get_column_letter(i)].width = w
 
 def insert_logo(ws, tl_cell, logo_path, max_w=170, max_h=42):
     pass
@@ -68,6 +70,18 @@ def fmt_date_ordinal(d: datetime.date) -> str:
 def _rl_logo(logo_path, max_w=30 * mm, max_h=12 * mm):
     return None
 
+def _summary_bucket_headers(scheme: AgingScheme, last_suffix: str = "") -> List[str]:
+    """Encabezados de los rangos de antigüedad del esquema, ej. ['0-21', '22-30', '31-45', '45+ DAYS']."""
+    labels = list(scheme.labels)
+    labels[-1] += last_suffix
+    return labels
+
+def _summary_values(agg: AgingSummary, scheme: AgingScheme) -> List[float]:
+    """Valores de una fila del resumen: total, no vencido, vencido y cada rango del esquema."""
+    return [agg.total_balance, agg.not_yet_due, agg.overdue] + [
+        agg.buckets.get(k, getattr(agg, k, 0.0)) for k in scheme.bucket_keys
+    ]
+
 def _pdf_header_footer(canv: rl_canvas.Canvas, doc):
     canv.saveState()
     canv.setFont("Helvetica", 7)
@@ -82,7 +96,8 @@ def create_excel_report(
     data: Dict[str, CurrencyGroup], 
     logo_path: str, 
     filters: dict,
-    credit_info: CustomerCreditInfo | None = None
+    credit_info: CustomerCreditInfo | None = None,
+    aging_scheme: AgingScheme | None = None
 ) -> io.BytesIO:
     """
     Toma los datos procesados y construye un archivo Excel EN MEMORIA.
@@ -92,6 +107,11 @@ def create_excel_report(
     as_of = filters['as_of']
     customer_name = filters['customer_name']
     is_single_customer = filters.get('customer_id') is not None
+    scheme = aging_scheme or get_scheme(None)
+    # Se resaltan los días que pasan del último límite del esquema (45 en el estándar),
+    # medidos desde la misma fecha base que sus rangos
+    highlight_days = scheme.boundaries[-1]
+    highlight_basis = scheme.basis
     
     all_entries = [entry for group in data.values() for entry in group.entries]
 
@@ -175,7 +195,10 @@ def create_excel_report(
         if cur_rows:
             last2 = r0 + len(cur_rows) - 1
             # PASS header_row=start_row HERE
-            _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_customer, header_row=start_row)
+            _apply_currency_sheet_formats_excel_custom(
+                ws2, r0, last2, is_single_customer, header_row=start_row,
+                highlight_days=highlight_days, highlight_basis=highlight_basis, as_of=as_of
+            )
             
             if is_single_customer:
                 # Adjusted widths for new PO column (index 1)
@@ -189,20 +212,21 @@ def create_excel_report(
     for cur, cur_group in data.items():
         ws3 = wb.create_sheet(_safe_excel_title(f"SUMMARY {cur}"))
         insert_logo(ws3, "A1", logo_path)
-        ws3.merge_cells("C1:H1")
+        hdr = [
+            "CUSTOMER", "TOTAL BALANCE", "NOT YET DUE", "OVERDUE",
+        ] + _summary_bucket_headers(scheme, " DAYS")
+        last_col_char = get_column_letter(len(hdr))
+
+        ws3.merge_cells(f"C1:{last_col_char}1")
         s1 = ws3["C1"]
         s1.value = f"ACCOUNTS RECEIVABLE — SUMMARY ({cur})"
         s1.font = Font(bold=True, size=14, color=THEME["primary"])
         s1.alignment = Alignment(horizontal="center")
-        ws3.merge_cells("C2:H2")
+        ws3.merge_cells(f"C2:{last_col_char}2")
         s2 = ws3["C2"]
         s2.value = f"As Of: {as_of:%m/%d/%Y} • Customer: {customer_name}"
         s2.alignment = Alignment(horizontal="center")
 
-        hdr = [
-            "CUSTOMER", "TOTAL BALANCE", "NOT YET DUE", "OVERDUE",
-            "0-21", "22-30", "31-45", "45+ DAYS",
-        ]
         for i, h in enumerate(hdr, start=1):
             c = ws3.cell(3, i, h)
             c.font = Font(bold=True, color="FFFFFF")
@@ -213,18 +237,15 @@ def create_excel_report(
         r = 4
         for cust, agg in sorted(cur_group.aging_summary.items()):
             ws3.cell(r, 1).value = cust
-            vals = [
-                agg.total_balance, agg.not_yet_due, agg.overdue,
-                agg.bucket_0_21, agg.bucket_22_30, agg.bucket_31_45, agg.bucket_45_plus
-            ]
+            vals = _summary_values(agg, scheme)
             for i, v in enumerate(vals, start=2):
                 ws3.cell(r, i).value = v
             r += 1
 
         if r > 4:
             last3 = r - 1
-            _apply_summary_formats_excel(ws3, 4, last3)
-            set_col_widths(ws3, [30, 18, 18, 18, 12, 12, 12, 12])
+            _apply_summary_formats_excel(ws3, 4, last3, ncols=len(hdr))
+            set_col_widths(ws3, [30, 18, 18, 18] + [12] * (len(hdr) - 4))
 
     # ===== 3. Main Report - AL FINAL =====
     ws = wb.create_sheet("Main Report")
@@ -277,7 +298,9 @@ def create_excel_report(
 
     last = start + len(all_entries) - 1 if all_entries else start
     if all_entries:
-        _apply_main_report_formats_excel(ws, start, last)
+        _apply_main_report_formats_excel(
+            ws, start, last, highlight_days=highlight_days, highlight_basis=highlight_basis, as_of=as_of
+        )
 
     set_col_widths(ws, [28, 30, 14, 12, 8, 14, 14, 10, 10, 16, 16, 16, 14, 14])
 
@@ -291,7 +314,25 @@ def create_excel_report(
 
 # --- Helpers de formato de Excel ---
 
-def _apply_main_report_formats_excel(ws, start, last):
+def _add_overdue_highlight(ws, first, last, highlight_days, highlight_basis, as_of, elapsed_col, overdue_col, invoice_col):
+    """
+    Resalta las filas que pasan de `highlight_days` en la columna de la que salen
+    los rangos del esquema: DAYS ELAPSED (llegada), DAYS OVERDUE (vencimiento) o,
+    como no hay columna de días desde factura, INVOICE DATE comparada con `as_of`.
+    """
+    overdue_fill = PatternFill("solid", fgColor="FDE68A")
+    if highlight_basis == "invoice" and as_of is not None:
+        col_char = get_column_letter(invoice_col)
+        rule = FormulaRule(
+            formula=[f"AND(ISNUMBER({col_char}{first}),DATE({as_of.year},{as_of.month},{as_of.day})-{col_char}{first}>{highlight_days})"],
+            stopIfTrue=True, fill=overdue_fill
+        )
+    else:
+        col_char = get_column_letter(overdue_col if highlight_basis == "due" else elapsed_col)
+        rule = CellIsRule(operator='greaterThan', formula=[str(highlight_days)], stopIfTrue=True, fill=overdue_fill)
+    ws.conditional_formatting.add(f"{col_char}{first}:{col_char}{last}", rule)
+
+def _apply_main_report_formats_excel(ws, start, last, highlight_days=45, highlight_basis="arrival", as_of=None):
     if start > last: return
     for row in range(start, last + 1):
         ws.cell(row, 4).number_format = "mm/dd/yyyy"
@@ -313,7 +354,7 @@ def _apply_main_report_formats_excel(ws, start, last):
     ws.cell(tr, 1).value = "TOTALS:"
     ws.cell(tr, 1).alignment = Alignment(horizontal="right")
     for col in (10, 11, 12):
-        ws.cell(tr, col).value = f"=SUM({chr(64 + col)}{start}:{chr(64 + col)}{last})"
+        ws.cell(tr, col).value = f"=SUM({get_column_letter(col)}{start}:{get_column_letter(col)}{last})"
         ws.cell(tr, col).number_format = "$#,##0.00"
         ws.cell(tr, col).font = Font(bold=True)
         ws.cell(tr, col).fill = fill(THEME["total"])
@@ -321,13 +362,12 @@ def _apply_main_report_formats_excel(ws, start, last):
         ws.cell(tr, col).border = border_all()
     ws.freeze_panes = "A7"
     ws.auto_filter.ref = f"A6:N{last}"
-    overdue_fill = PatternFill("solid", fgColor="FDE68A")
-    ws.conditional_formatting.add(
-        f"M{start}:M{last}",
-        CellIsRule(operator='greaterThan', formula=['45'], stopIfTrue=True, fill=overdue_fill)
+    # M = DAYS ELAPSED, N = DAYS OVERDUE, D = INVOICE DATE
+    _add_overdue_highlight(
+        ws, start, last, highlight_days, highlight_basis, as_of, elapsed_col=13, overdue_col=14, invoice_col=4
     )
 
-def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_customer, header_row=4):
+def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_customer, header_row=4, highlight_days=45, highlight_basis="arrival", as_of=None):
     if r0 > last2: return
     
     if is_single_customer:
@@ -337,6 +377,7 @@ def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_custome
         int_cols = (12, 13)
         total_cols = (6, 8, 9, 10)
         days_col = 12 # This is Days Elapsed, we can keep coloring it or not on Overdue. Overdue is 13.
+        invoice_col = 5
         last_col = 13
         merge_range_end = 5
     else:
@@ -346,6 +387,7 @@ def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_custome
         int_cols = (13, 14)
         total_cols = (7, 9, 10, 11)
         days_col = 13
+        invoice_col = 6
         last_col = 14
         merge_range_end = 6
 
@@ -367,13 +409,13 @@ def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_custome
             ws2.cell(row, col).border = border_all()
 
     tr2 = last2 + 1
-    merge_char = chr(64 + merge_range_end)
+    merge_char = get_column_letter(merge_range_end)
     ws2.merge_cells(f"A{tr2}:{merge_char}{tr2}")
     ws2.cell(tr2, 1).value = f"TOTALS ({ws2.title.split(' ', 1)[-1]}):"
     ws2.cell(tr2, 1).alignment = Alignment(horizontal="right")
     
     for col in total_cols:
-        ws2.cell(tr2, col).value = f"=SUM({chr(64 + col)}{r0}:{chr(64 + col)}{last2})"
+        ws2.cell(tr2, col).value = f"=SUM({get_column_letter(col)}{r0}:{get_column_letter(col)}{last2})"
         ws2.cell(tr2, col).number_format = "$#,##0.00"
         ws2.cell(tr2, col).font = Font(bold=True)
         ws2.cell(tr2, col).fill = fill(THEME["total"])
@@ -381,28 +423,27 @@ def _apply_currency_sheet_formats_excel_custom(ws2, r0, last2, is_single_custome
         ws2.cell(tr2, col).border = border_all()
         
     ws2.freeze_panes = f"A{header_row + 1}"
-    last_col_char = chr(64 + last_col)
+    last_col_char = get_column_letter(last_col)
     ws2.auto_filter.ref = f"A{header_row}:{last_col_char}{last2}"
     
-    overdue_fill = PatternFill("solid", fgColor="FDE68A")
-    days_col_char = chr(64 + days_col)
-    ws2.conditional_formatting.add(
-        f"{days_col_char}{r0}:{days_col_char}{last2}",
-        CellIsRule(operator='greaterThan', formula=['45'], stopIfTrue=True, fill=overdue_fill)
+    # Days Overdue es la última columna
+    _add_overdue_highlight(
+        ws2, r0, last2, highlight_days, highlight_basis, as_of,
+        elapsed_col=days_col, overdue_col=last_col, invoice_col=invoice_col
     )
 
-def _apply_summary_formats_excel(ws3, start, last):
+def _apply_summary_formats_excel(ws3, start, last, ncols=8):
     for row in range(start, last + 1):
         ws3.cell(row, 1).alignment = Alignment(horizontal="left")
-        for col in range(2, 9):
+        for col in range(2, ncols + 1):
             ws3.cell(row, col).number_format = "$#,##0.00"
             ws3.cell(row, col).alignment = Alignment(horizontal="center")
-        for col in range(1, 9):
+        for col in range(1, ncols + 1):
             ws3.cell(row, col).border = border_all()
     ws3[f"A{last + 1}"].value = "TOTALS:"
     ws3[f"A{last + 1}"].font = Font(bold=True)
-    for col in range(2, 9):
-        L = chr(64 + col)
+    for col in range(2, ncols + 1):
+        L = get_column_letter(col)
         cell = ws3[f"{L}{last + 1}"]
         cell.value = f"=SUM({L}{start}:{L}{last})"
         cell.number_format = "$#,##0.00"
@@ -417,7 +458,8 @@ def create_pdf_report(
     data: Dict[str, CurrencyGroup], 
     logo_path: str, 
     filters: dict,
-    credit_info: CustomerCreditInfo | None = None
+    credit_info: CustomerCreditInfo | None = None,
+    aging_scheme: AgingScheme | None = None
 ) -> io.BytesIO:
     """
     Toma los datos procesados y construye un archivo PDF EN MEMORIA.
@@ -426,6 +468,7 @@ def create_pdf_report(
 
     as_of = filters['as_of']
     customer_name = filters['customer_name']
+    scheme = aging_scheme or get_scheme(None)
 
     # --- ¡CAMBIO CLAVE! Guardar en memoria ---
     buffer = io.BytesIO()
@@ -553,30 +596,23 @@ def create_pdf_report(
         story.append(Spacer(0, 6 * mm))
 
         story.append(Paragraph(f"SUMMARY — {cur}", title_style))
-        hdr_summary = ["CUSTOMER", "TOTAL", "NOT DUE", "OVERDUE", "0-21", "22-30", "31-45", "45+"]
-        widths_summary = [65, 30, 30, 30, 30, 30, 30, 30]
+        hdr_summary = ["CUSTOMER", "TOTAL", "NOT DUE", "OVERDUE"] + _summary_bucket_headers(scheme)
+        # 65mm para el cliente; el resto del ancho útil (A4 horizontal) se reparte entre las columnas
+        num_w = min(30, 216 / (len(hdr_summary) - 1))
+        widths_summary = [65] + [num_w] * (len(hdr_summary) - 1)
 
         tbl_summary = [hdr_summary]
 
-        grand_agg = AgingSummary(total_balance=0.0) # Iniciamos con nuestro esquema
+        total_vals = [0.0] * (len(hdr_summary) - 1)
 
         for cust, agg in sorted(cur_group.aging_summary.items()):
             cust_display = cust or ""
             if len(cust_display) > 30:
                 cust_display = cust_display[:30] + "\n" + cust_display[30:50]
-            vals = [
-                agg.total_balance, agg.not_yet_due, agg.overdue,
-                agg.bucket_0_21, agg.bucket_22_30, agg.bucket_31_45, agg.bucket_45_plus
-            ]
+            vals = _summary_values(agg, scheme)
             tbl_summary.append([cust_display] + [f"{v:,.2f}" for v in vals])
 
-            grand_agg.total_balance += agg.total_balance
-            grand_agg.not_yet_due += agg.not_yet_due
-            grand_agg.overdue += agg.overdue
-            grand_agg.bucket_0_21 += agg.bucket_0_21
-            grand_agg.bucket_22_30 += agg.bucket_22_30
-            grand_agg.bucket_31_45 += agg.bucket_31_45
-            grand_agg.bucket_45_plus += agg.bucket_45_plus
+            total_vals = [t + v for t, v in zip(total_vals, vals)]
 
         t_summary = Table(tbl_summary, colWidths=[w * mm for w in widths_summary], repeatRows=1, splitByRow=True)
         t_summary.setStyle(TableStyle([
@@ -592,10 +628,6 @@ def create_pdf_report(
         ]))
         story.append(t_summary)
 
-        total_vals = [
-            grand_agg.total_balance, grand_agg.not_yet_due, grand_agg.overdue,
-            grand_agg.bucket_0_21, grand_agg.bucket_22_30, grand_agg.bucket_31_45, grand_agg.bucket_45_plus
-        ]
         total_summary_row = [["TOTALS:"] + [f"{v:,.2f}" for v in total_vals]]
         tsr = Table(total_summary_row, colWidths=[w * mm for w in widths_summary])
         tsr.setStyle(TableStyle([
@@ -618,7 +650,8 @@ def create_html_report(
     data: Dict[str, CurrencyGroup], 
     logo_path: str, 
     filters: dict,
-    credit_info: CustomerCreditInfo | None = None
+    credit_info: CustomerCreditInfo | None = None,
+    aging_scheme: AgingScheme | None = None
 ) -> io.BytesIO:
     """
     Toma los datos procesados y construye un archivo HTML EN MEMORIA.
@@ -626,6 +659,7 @@ def create_html_report(
     """
     as_of = filters['as_of']
     customer_name = filters['customer_name']
+    scheme = aging_scheme or get_scheme(None)
     all_entries = [entry for group in data.values() for entry in group.entries]
 
     # Esta es tu lógica de CSS original
@@ -713,33 +747,21 @@ def create_html_report(
         parts.append("</tbody></table>")
 
         parts.append(f"<h2>Summary — {cur}</h2>")
+        bucket_headers = "".join(f"<th>{h}</th>" for h in _summary_bucket_headers(scheme, " DAYS"))
         parts.append(
             "<table><thead><tr><th>CUSTOMER</th><th>TOTAL BALANCE</th><th>NOT YET DUE</th><th>OVERDUE</th>"
-            "<th>0-21</th><th>22-30</th><th>31-45</th><th>45+ DAYS</th></tr></thead><tbody>"
+            + bucket_headers + "</tr></thead><tbody>"
         )
 
-        # (Usamos un dict simple para los totales, ya que no necesitamos el objeto Pydantic)
-        grand_agg = {"total_balance": 0.0, "not_yet_due": 0.0, "overdue": 0.0, "bucket_0_21": 0.0, "bucket_22_30": 0.0, "bucket_31_45": 0.0, "bucket_45_plus": 0.0}
+        # (Usamos una lista simple para los totales, ya que no necesitamos el objeto Pydantic)
+        tot = [0.0] * (3 + len(scheme.bucket_keys))
 
         for k, agg in sorted(cur_group.aging_summary.items()):
-            vals = [
-                agg.total_balance, agg.not_yet_due, agg.overdue,
-                agg.bucket_0_21, agg.bucket_22_30, agg.bucket_31_45, agg.bucket_45_plus
-            ]
+            vals = _summary_values(agg, scheme)
             parts.append("<tr><td>" + (k or "") + "</td>" + "".join(f"<td class='num'>{v:,.2f}</td>" for v in vals) + "</tr>")
 
-            grand_agg["total_balance"] += agg.total_balance
-            grand_agg["not_yet_due"] += agg.not_yet_due
-            grand_agg["overdue"] += agg.overdue
-            grand_agg["bucket_0_21"] += agg.bucket_0_21
-            grand_agg["bucket_22_30"] += agg.bucket_22_30
-            grand_agg["bucket_31_45"] += agg.bucket_31_45
-            grand_agg["bucket_45_plus"] += agg.bucket_45_plus
-
-        tot = [
-            grand_agg["total_balance"], grand_agg["not_yet_due"], grand_agg["overdue"],
-            grand_agg["bucket_0_21"], grand_agg["bucket_22_30"], grand_agg["bucket_31_45"], grand_agg["bucket_45_plus"]
-        ]
+            tot = [t + v for t, v in zip(tot, vals)]
+
         parts.append(
             "<tr class='tot'><td>TOTALS:</td>"
             + "".join(f"<td class='num'>{v:,.2f}</td>" for v in tot)
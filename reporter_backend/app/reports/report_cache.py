@@ -0,0 +1,256 @@
+# app/reports/report_cache.py
+"""Caché en memoria de resultados del reporte.
+
+Guarda las filas crudas que devuelve SQL Server para una combinación de
+empresa + consulta + parámetros. Así, cambiar de vista (otro esquema de
+antigüedad, otro formato de descarga) reutiliza los datos ya leídos en lugar
+de volver a consultar la base de datos.
+
+Las entradas expiran después de REPORT_CACHE_TTL segundos (o del `ttl` que se
+pase a `put`, como hace el warm-up) y se descartan las menos usadas cuando se
+supera REPORT_CACHE_MAX_ENTRIES.
+
+Con varios workers y SHARED_CACHE_PATH configurado, las cachés de aquí abajo
+son `SharedResultCache`: el valor vive codificado en el almacén compartido
+(app/shared_cache.py) y la consulta que hace un worker le sirve a todos.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from ..shared_cache import SharedCache, get_shared_cache, key_hash
+from .cache_codecs import ROWS_CODEC, CURRENCY_GROUPS_CODEC, PLAIN_CODEC, ModelCodec, dumps, loads
+from .report_schemas import CustomerCreditInfo, ReceivablesKpis
+
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "32"))
+# Copia decodificada en memoria de cada worker. Corta, porque las invalidaciones
+# de otro worker solo borran el almacén compartido.
+SHARED_CACHE_LOCAL_TTL = float(os.getenv("SHARED_CACHE_LOCAL_TTL", "15"))
+CUSTOMER_LIST_TTL = float(os.getenv("CUSTOMER_LIST_TTL", "600"))
+
+
+class ResultCache:
+    """
+    Caché LRU con expiración por tiempo, segura entre hilos (los endpoints
+    síncronos de FastAPI corren en un threadpool).
+
+    `get_or_load` evita el "thundering herd": si dos peticiones piden la misma
+    clave a la vez, solo una ejecuta la consulta y la otra espera el resultado.
+    """
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[Hashable, threading.Lock] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        (valor, versión) o None. La versión cambia cada vez que la entrada se
+        reemplaza (es su hora de expiración), para lo que se deriva de ella (ver
+        customer_index.py).
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value, expires
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda `value`; `ttl` reemplaza el de la caché solo para esta entrada."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Otro hilo pudo haber cargado la clave mientras esperábamos
+            value = self.get(key)
+            if value is not None:
+                return value
+            try:
+                value = loader()
+                self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Elimina todas las entradas (o solo las cuya clave cumpla `predicate`)."""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._data)
+                self._data.clear()
+                return removed
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SharedResultCache(ResultCache):
+    """
+    ResultCache con un segundo nivel en el almacén compartido entre workers.
+
+    `get` busca primero en memoria y después en el almacén (y decodifica). La
+    copia en memoria guarda también la expiración de la entrada en el almacén,
+    que es su versión (`get_entry`): igual en todos los workers y distinta cada
+    vez que alguno la reemplaza.
+    `get_or_load` hace single-flight en dos niveles: entre hilos del worker con
+    los candados de ResultCache y entre workers con el candado del almacén; el
+    que no obtiene el candado espera a que el valor aparezca. Si el que carga
+    falla, el candado se libera y el siguiente lo intenta.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        codec,
+        store: SharedCache,
+        ttl: float = REPORT_CACHE_TTL,
+        max_entries: int = REPORT_CACHE_MAX_ENTRIES,
+        local_ttl: float = SHARED_CACHE_LOCAL_TTL
+    ):
+        super().__init__(ttl=min(ttl, local_ttl), max_entries=max_entries)
+        self.namespace = namespace
+        self.codec = codec
+        self.store = store
+        self.shared_ttl = ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        local = super().get_entry(key)
+        if local is not None:
+            return local[0]
+        found = self.store.get(self.namespace, key_hash(key))
+        if found is None:
+            return None
+        entry = (self.codec.decode(found[0]), found[1])
+        super().put(key, entry)
+        return entry
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if value is None or self.shared_ttl <= 0:
+            return
+        # La copia local conserva su TTL corto; `ttl` aplica al almacén compartido
+        expires = self.store.put(
+            self.namespace, key_hash(key), self.codec.encode(value),
+            self.shared_ttl if ttl is None else ttl, dumps(key)
+        )
+        super().put(key, (value, expires))
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                value = self.get(key)
+                if value is not None:
+                    return value
+                return self._load_once(key, loader)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def _load_once(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        digest = key_hash(key)
+        deadline = time.monotonic() + self.store.lock_seconds
+        delay = 0.02
+        while True:
+            if self.store.try_lock(self.namespace, digest):
+                try:
+                    # Pudo haberse guardado entre el último get y el candado
+                    value = self.get(key)
+                    if value is None:
+                        value = loader()
+                        self.put(key, value)
+                    return value
+                finally:
+                    self.store.unlock(self.namespace, digest)
+            # Otro worker la está cargando
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() > deadline:
+                value = loader()
+                self.put(key, value)
+                return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        removed = super().invalidate(predicate)
+        digests = [
+            digest for digest, key_blob in self.store.keys(self.namespace)
+            if predicate is None or (key_blob is not None and predicate(loads(key_blob)))
+        ]
+        return max(removed, self.store.delete(self.namespace, digests))
+
+
+def shared_result_cache(
+    namespace: str,
+    codec,
+    ttl: float = REPORT_CACHE_TTL,
+    max_entries: int = REPORT_CACHE_MAX_ENTRIES
+) -> ResultCache:
+    """SharedResultCache si hay almacén compartido configurado; si no, ResultCache en memoria."""
+    store = get_shared_cache()
+    if store is None:
+        return ResultCache(ttl=ttl, max_entries=max_entries)
+    return SharedResultCache(namespace, codec, store, ttl=ttl, max_entries=max_entries)
+
+
+# Filas crudas de la consulta de saldos, por (empresa, sql, parámetros)
+report_rows_cache = shared_result_cache("report_rows", ROWS_CODEC)
+
+# Resultado ya procesado (Dict[str, CurrencyGroup]) por (clave de filas, as_of, esquema)
+report_data_cache = shared_result_cache("report_data", CURRENCY_GROUPS_CODEC)
+
+# KPIs ya calculados del dashboard, por (clave de filas, as_of, esquema, top_n).
+# Son pequeños, así que se guardan más entradas que de filas crudas.
+report_kpis_cache = shared_result_cache(
+    "report_kpis", ModelCodec(ReceivablesKpis), max_entries=REPORT_CACHE_MAX_ENTRIES * 4
+)
+
+# Límite de crédito y término del encabezado, por (empresa, cliente). Una fila cada uno.
+customer_credit_cache = shared_result_cache(
+    "customer_credit", ModelCodec(CustomerCreditInfo), max_entries=REPORT_CACHE_MAX_ENTRIES * 32
+)
+
+# Lista de clientes del filtro, por empresa
+customer_list_cache = shared_result_cache("customer_list", PLAIN_CODEC, ttl=CUSTOMER_LIST_TTL)
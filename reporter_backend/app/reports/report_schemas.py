@@ -1,8 +1,10 @@
 # app/reports/report_schemas.py
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Optional, Any
 import datetime
 
+from .aging import MAX_AGING_BOUNDARIES
+
 # Es la versión Pydantic de tu dataclass 'ReceivableEntry'
 class ReceivableEntry(BaseModel):
     customer_name: str
@@ -37,6 +39,9 @@ class AgingSummary(BaseModel):
     bucket_22_30: float = 0.0
     bucket_31_45: float = 0.0
     bucket_45_plus: float = 0.0
+    # Rangos del esquema de antigüedad aplicado (ver aging.py), por clave.
+    # Con el esquema "standard" coinciden con los campos bucket_* de arriba.
+    buckets: Dict[str, float] = {}
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -63,7 +68,70 @@ class ReportFilters(BaseModel):
     filter_mode: str = "to_date" # "current_month", "to_date", "date_range"
     start_date: Optional[datetime.date] = None
     end_date: Optional[datetime.date] = None
+    # Esquema de antigüedad (None = el configurado para la empresa)
+    aging_scheme: Optional[str] = None
+    aging_basis: Optional[str] = None # "arrival", "due", "invoice"
+    aging_boundaries: Optional[List[int]] = Field(default=None, max_length=MAX_AGING_BOUNDARIES) # ej. [30, 60, 90]
+    # Consolidación multimoneda (None = sin consolidar)
+    reporting_currency: Optional[str] = None
+    reporting_fx_rate: Optional[float] = None # moneda local por 1 unidad de reporting_currency
+
+class AgingSchemeInfo(BaseModel):
+    key: str
+    name: str
+    basis: str
+    boundaries: List[int]
+    labels: List[str]
+    bucket_keys: List[str]
+
+class ConsolidatedTotals(BaseModel):
+    currency: str        # moneda de reporte
+    local_currency: str  # moneda en la que está expresado el TC de los documentos
+    fx_rate: float       # moneda local por 1 unidad de la moneda de reporte
+    fx_rate_source: str  # "local", "request" o "latest_document"
+    totals: Dict[str, float] = {}
+    aging_summary: Dict[str, AgingSummary] = {}
+    unconverted_documents: int = 0  # documentos en moneda extranjera sin TC
 
 class ReceivablesReportData(BaseModel):
     data_by_currency: Dict[str, CurrencyGroup]
-    customer_credit_info: Optional[CustomerCreditInfo] = None
\ No newline at end of file
+    customer_credit_info: Optional[CustomerCreditInfo] = None
+    aging_scheme: Optional[AgingSchemeInfo] = None
+    consolidated: Optional[ConsolidatedTotals] = None
+
+# --- KPIs del Dashboard (payload pequeño, sin filas de detalle) ---
+class CurrencyKpis(BaseModel):
+    currency: str
+    documents: int = 0
+    customers: int = 0
+    balance: float = 0.0
+    not_yet_due: float = 0.0
+    overdue: float = 0.0
+    buckets: Dict[str, float] = {}
+    expected_this_week: float = 0.0  # saldo que vence entre as_of y as_of + 7 días
+    scheduled_today: float = 0.0     # saldo que vence exactamente en as_of
+
+class RankedCustomer(BaseModel):
+    rank: int
+    customer_name: str
+    currency: str
+    value: float  # valor de la métrica por la que se ordenó
+    total_balance: float
+    not_yet_due: float = 0.0
+    overdue: float = 0.0
+    buckets: Dict[str, float] = {}
+
+class ReceivablesKpis(BaseModel):
+    as_of: datetime.date
+    aging_scheme: AgingSchemeInfo
+    currencies: List[CurrencyKpis] = []
+    top_customers: List[RankedCustomer] = []
+    consolidated: Optional[ConsolidatedTotals] = None
+
+class CustomerRanking(BaseModel):
+    metric: str
+    currency: Optional[str] = None  # None = todas las monedas
+    fx_normalized: bool = False
+    unconverted_documents: int = 0  # documentos sin TC, excluidos al normalizar
+    aging_scheme: AgingSchemeInfo
+    items: List[RankedCustomer] = []
@@ -0,0 +1,37 @@
+# app/reports/statement_worker.py
+"""Lo que corre dentro de los procesos del pool de estados de cuenta (statements.py).
+
+Está aparte para que cada proceso del pool importe solo lo necesario para
+generar un PDF (report_builder + esquemas), no la API completa.
+"""
+
+from typing import Optional, Tuple
+
+from .aging import AgingScheme
+from .cache_codecs import CURRENCY_GROUPS_CODEC
+from .report_schemas import CustomerCreditInfo
+
+
+def preload() -> None:
+    """Inicializador del pool: importa reportlab una vez por proceso, antes del primer estado."""
+    from . import report_builder  # noqa: F401
+
+
+def render_statement(
+    customer_id: int,
+    groups_blob: bytes,
+    filters: dict,
+    credit_info: Optional[dict],
+    scheme: AgingScheme
+) -> Tuple[int, bytes]:
+    """PDF de un cliente (mismo diseño que /receivables-download-pdf). Los datos llegan codificados."""
+    from .report_builder import create_pdf_report
+
+    buffer = create_pdf_report(
+        data=CURRENCY_GROUPS_CODEC.decode(groups_blob),
+        logo_path="",
+        filters=filters,
+        credit_info=CustomerCreditInfo.model_validate(credit_info) if credit_info else None,
+        aging_scheme=scheme
+    )
+    return customer_id, buffer.getvalue()
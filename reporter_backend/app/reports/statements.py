@@ -0,0 +1,301 @@
+# app/reports/statements.py
+"""Estados de cuenta por cliente en lote (cierre de mes), entregados en un ZIP.
+
+Antes había que llamar /receivables-download-pdf una vez por cliente: una
+consulta completa y una conexión por cada uno. Aquí:
+
+1. Una sola consulta de todos los clientes (load_report_rows, pasa por la
+   caché) y el crédito de todos los clientes en una consulta más
+   (fetch_customers_credit_info, en bloques de STATEMENT_CREDIT_CHUNK ids).
+2. Las filas se parten por BusinessEntityID con el mismo índice que usa el
+   reporte de un cliente (customer_index.py) y se procesan aquí.
+3. Cada PDF se genera en un pool de procesos (STATEMENT_WORKERS) con el mismo
+   create_pdf_report de la descarga individual; los datos viajan codificados
+   con CURRENCY_GROUPS_CODEC.
+4. Cada PDF se escribe al ZIP de la respuesta en cuanto termina (el orden del
+   ZIP es el de terminación). Solo hay STATEMENT_WORKERS * 2 PDF en vuelo a
+   la vez: los PDF no se acumulan en memoria, solo los datos de cada cliente
+   (comprimidos).
+
+Si un estado falla, los demás siguen y el ZIP incluye _errors.txt. Si el
+cliente se desconecta, se cancelan los estados pendientes.
+
+STATEMENT_WORKERS=0 genera los PDF en el mismo hilo de la petición (sin pool).
+"""
+
+import datetime
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Annotated, Dict, Iterator, List, Optional
+
+import pyodbc
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.responses import StreamingResponse
+
+from ..cancellation import CancelToken, CancelTokenDep
+from ..security import CurrentUser
+from ..sql_server_conn import get_sql_server_conn, get_company_key, fetch_all
+from .aging import AgingScheme
+from .cache_codecs import CURRENCY_GROUPS_CODEC
+from .customer_index import CustomerIndex, index_for
+from .report_cache import customer_credit_cache, report_rows_cache
+from .report_schemas import CustomerCreditInfo, ReportFilters
+from .receivables import load_report_rows, process_report_data, report_rows_key, resolve_aging_scheme
+from .statement_worker import preload, render_statement
+
+log = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Statements"])
+
+SqlServerConnDep = Annotated[pyodbc.Connection, Depends(get_sql_server_conn)]
+CompanyKeyDep = Annotated[str, Depends(get_company_key)]
+
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Ids por consulta de crédito (SQL Server acepta hasta 2100 parámetros)
+STATEMENT_CREDIT_CHUNK = 1000
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def fetch_customers_credit_info(
+    conn: pyodbc.Connection,
+    customer_ids: List[int],
+    company_key: str
+) -> Dict[int, CustomerCreditInfo]:
+    """
+    Igual que fetch_customer_credit_info pero para muchos clientes a la vez.
+    Lo que encuentra también queda en `customer_credit_cache`.
+    """
+    credit: Dict[int, CustomerCreditInfo] = {}
+    for i in range(0, len(customer_ids), STATEMENT_CREDIT_CHUNK):
+        chunk = customer_ids[i:i + STATEMENT_CREDIT_CHUNK]
+        sql = f"""
+            SELECT
+                c.BusinessEntityID,
+                c.CreditLimit,
+                t.PaymentTermName,
+                ISNULL(cr.Currency, 'MXN') AS Currency
+            FROM dbo.orgCustomer c
+            LEFT OUTER JOIN dbo.engPaymentTerm t ON c.PaymentTermID = t.PaymentTermID
+            LEFT OUTER JOIN dbo.engRefCurrency cr ON c.CurrencyID = cr.CurrencyID
+            WHERE c.BusinessEntityID IN ({", ".join("?" * len(chunk))}) AND ISNULL(c.DeletedBy, 0) = 0
+        """
+        for row in fetch_all(conn, sql, chunk, name="customers_credit_info", company=company_key):
+            # Como el TOP 1 de la consulta individual: la primera fila de cada cliente
+            if row.BusinessEntityID in credit:
+                continue
+            credit[row.BusinessEntityID] = CustomerCreditInfo(
+                credit_limit=float(row.CreditLimit or 0.0),
+                payment_terms=row.PaymentTermName or "N/A",
+                currency=row.Currency
+            )
+    for customer_id, info in credit.items():
+        customer_credit_cache.put((company_key, customer_id), info)
+    return credit
+
+
+# --- Pool de procesos (uno por worker de uvicorn, se crea con el primer lote) ---
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: hacer fork de un proceso con hilos (uvicorn, pyodbc) no es seguro
+            _pool = ProcessPoolExecutor(
+                max_workers=STATEMENT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=preload
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Descarta un pool roto (un proceso murió) para que el siguiente lote cree otro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ZipStream:
+    """Destino de escritura de zipfile que acumula bytes para entregarlos por partes."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def statement_filename(customer_id: int, customer_name: str, as_of: datetime.date) -> str:
+    name = _SAFE_NAME.sub("_", customer_name or "").strip("_")[:60] or "Customer"
+    return f"Statement_{name}_{customer_id}_{as_of:%Y%m%d}.pdf"
+
+
+def iter_statements_zip(
+    jobs: List[dict],
+    scheme: AgingScheme,
+    cancel: CancelToken | None = None,
+    workers: int = STATEMENT_WORKERS
+) -> Iterator[bytes]:
+    """
+    Genera el ZIP por partes. Cada job: customer_id, filename, groups_blob,
+    filters, credit_info. Los PDF entran al ZIP según van terminando.
+    """
+    stream = _ZipStream()
+    errors: List[str] = []
+    t0 = time.perf_counter()
+    written = 0
+    filenames = {job["customer_id"]: job["filename"] for job in jobs}
+    # Los PDF ya vienen comprimidos; deflate rápido para lo poco que queda (texto, fuentes)
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        def add(customer_id: int, pdf: bytes) -> None:
+            zf.writestr(filenames[customer_id], pdf)
+
+        if workers <= 0:
+            for job in jobs:
+                if cancel is not None and cancel.cancelled:
+                    return
+                try:
+                    add(*render_statement(
+                        job["customer_id"], job["groups_blob"], job["filters"], job["credit_info"], scheme
+                    ))
+                    written += 1
+                except Exception as e:
+                    errors.append(f"{job['filename']}: {e}")
+                yield stream.drain()
+        else:
+            pool = _get_pool()
+            pending: Dict[Future, dict] = {}
+            queue = iter(jobs)
+            try:
+                while True:
+                    if cancel is not None and cancel.cancelled:
+                        return
+                    # Mantener el pool ocupado sin cargar todos los estados en memoria
+                    for job in queue:
+                        future = pool.submit(
+                            render_statement,
+                            job["customer_id"], job["groups_blob"], job["filters"], job["credit_info"], scheme
+                        )
+                        pending[future] = job
+                        if len(pending) >= workers * 2:
+                            break
+                    if not pending:
+                        break
+                    done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = pending.pop(future)
+                        try:
+                            add(*future.result())
+                            written += 1
+                        except BrokenProcessPool:
+                            _discard_pool(pool)
+                            raise
+                        except Exception as e:
+                            errors.append(f"{job['filename']}: {e}")
+                    if done:
+                        yield stream.drain()
+            finally:
+                # Cliente desconectado o error: no seguir generando para nadie
+                for future in pending:
+                    future.cancel()
+
+        if errors:
+            zf.writestr("_errors.txt", "\n".join(errors) + "\n")
+    yield stream.drain()
+    log.info(f"[STATEMENTS] {written} statements ({len(errors)} failed) in {time.perf_counter() - t0:.1f} s")
+
+
+def build_statement_jobs(
+    conn: pyodbc.Connection,
+    company_key: str,
+    filters: ReportFilters,
+    scheme: AgingScheme,
+    cancel: CancelToken | None = None
+) -> List[dict]:
+    """Una consulta de todos los clientes, partida por cliente y ya procesada para el PDF."""
+    all_filters = filters.model_copy(update={"customer_id": None, "customer_name": "All Customers"})
+    rows = load_report_rows(conn, company_key, all_filters, cancel=cancel)
+    if not rows:
+        return []
+    rows_key = report_rows_key(company_key, all_filters)
+    entry = report_rows_cache.get_entry(rows_key)
+    # Sin caché de resultados (REPORT_CACHE_TTL=0) el índice se arma solo para este lote
+    index = index_for(rows_key, *entry) if entry is not None else CustomerIndex(rows)
+    customer_ids = list(index.customers)
+    credit = fetch_customers_credit_info(conn, customer_ids, company_key)
+
+    jobs = []
+    base_filters = all_filters.model_dump()
+    for customer_id in customer_ids:
+        if cancel is not None:
+            cancel.check()
+        entry = index.aggregates(customer_id)
+        groups = process_report_data(
+            raw_data=index.rows_for(customer_id), as_of=filters.as_of, scheme=scheme
+        )
+        info = credit.get(customer_id)
+        jobs.append({
+            "customer_id": customer_id,
+            "filename": statement_filename(customer_id, entry.name, filters.as_of),
+            "groups_blob": CURRENCY_GROUPS_CODEC.encode(groups),
+            # Filtros de un solo cliente: encabezado con su nombre y su crédito
+            "filters": {**base_filters, "customer_id": customer_id, "customer_name": entry.name},
+            "credit_info": info.model_dump() if info is not None else None,
+        })
+    return jobs
+
+
+@router.post("/receivables-statements")
+def download_customer_statements(
+    filters: ReportFilters,
+    current_user: CurrentUser,
+    sql_conn: SqlServerConnDep,
+    company_key: CompanyKeyDep,
+    cancel: CancelTokenDep
+):
+    """
+    Un PDF de estado de cuenta por cliente con saldo en el reporte (`customer_id`
+    se ignora), en un ZIP que se va enviando conforme terminan los PDF.
+    """
+    scheme = resolve_aging_scheme(company_key, filters)
+    jobs = build_statement_jobs(sql_conn, company_key, filters, scheme, cancel=cancel)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No data found for selected filters.")
+    log.info(f"[STATEMENTS] {company_key}: {len(jobs)} customers, {STATEMENT_WORKERS} workers")
+
+    filename = f"Customer_Statements_{filters.as_of:%Y%m%d}.zip"
+    return StreamingResponse(
+        content=iter_statements_zip(jobs, scheme, cancel=cancel),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=\"{filename}\""}
+    )
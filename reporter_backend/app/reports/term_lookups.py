@@ -0,0 +1,217 @@
+# app/reports/term_lookups.py
+"""Tablas de búsqueda de términos de pago, en caché por empresa.
+
+La consulta original del reporte calculaba en cada llamada dos CTE:
+`StudentCredit` (días máximos de cada término de pago) y `DocumentTerm`
+(días de crédito de cada documento, agregando TODO docDocument). Los términos
+de pago casi nunca cambian, así que aquí se consultan una vez por empresa y se
+guardan como diccionarios:
+
+- payment_terms:  PaymentTermID -> (PaymentTermName, MaxCreditDays)
+- customer_terms: BusinessEntityID -> PaymentTermID (clientes no eliminados)
+- doc_terms:      (BusinessEntityID, Folio) -> (DocCreditDays, DocTermName)
+
+El reporte usa entonces una consulta "delgada" (solo columnas de saldo) y
+`Vencimiento` / `CreditDaysLabel` se resuelven en Python con las mismas reglas
+del SQL original:
+
+    Vencimiento     = ISNULL(ArrivalDate, InvoiceDate) + ISNULL(DocCreditDays, ISNULL(MaxCreditDays, 0))
+    CreditDaysLabel = ISNULL(DocTermName, PaymentTermName)
+
+Los documentos nuevos (posteriores a la última carga) se buscan al vuelo con
+una consulta acotada a sus clientes y se agregan a la caché. Las tablas expiran
+después de TERM_LOOKUP_TTL segundos; el warm-up programado (app/scheduler.py)
+las recarga y un admin puede forzar la recarga desde la API.
+"""
+
+import datetime
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyodbc
+
+from ..sql_server_conn import fetch_all, fetch_batch
+from .report_cache import ResultCache
+
+TERM_LOOKUP_TTL = float(os.getenv("TERM_LOOKUP_TTL", "21600"))
+# Máximo de parámetros por consulta al buscar documentos nuevos (SQL Server admite ~2100)
+_IN_CHUNK = 500
+
+_PAYMENT_TERMS_SQL = """
+    SELECT
+        pt.PaymentTermID,
+        pt.PaymentTermName,
+        MAX(ptd.PaymentPeriod + ptd.PaymentUnit) AS MaxCreditDays
+    FROM dbo.engPaymentTerm pt
+    JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
+    GROUP BY pt.PaymentTermID, pt.PaymentTermName
+"""
+
+_CUSTOMER_TERMS_SQL = """
+    SELECT c.BusinessEntityID, c.PaymentTermID
+    FROM dbo.orgCustomer c
+    WHERE ISNULL(c.DeletedBy, 0) = 0
+"""
+
+# Todos los documentos de la vista de saldos (es lo que usa el reporte), también
+# los que no tienen término propio: esos vienen con NULL y quedan registrados
+# como "sin término", así el primer reporte no los vuelve a buscar uno por uno.
+# El CASE deja fuera los términos sin detalle, igual que el JOIN del SQL original.
+_DOC_TERMS_SQL = """
+    SELECT
+        d.BusinessEntityID,
+        CAST(d.Folio AS varchar(50)) AS Folio,
+        MAX(ptd.PaymentUnit) AS DocCreditDays,
+        MAX(CASE WHEN ptd.PaymentTermID IS NOT NULL THEN pt.PaymentTermName END) AS DocTermName
+    FROM (SELECT DISTINCT BusinessEntityID, Folio FROM zzReporteSaldoDocuments) d
+    LEFT JOIN dbo.docDocument doc ON doc.BusinessEntityID = d.BusinessEntityID AND doc.Folio = d.Folio
+    LEFT JOIN dbo.engPaymentTerm pt ON doc.PaymentTermID = pt.PaymentTermID
+    LEFT JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
+    GROUP BY d.BusinessEntityID, d.Folio
+"""
+
+_DOC_TERMS_BY_ENTITY_SQL = """
+    SELECT
+        doc.BusinessEntityID,
+        CAST(doc.Folio AS varchar(50)) AS Folio,
+        MAX(ptd.PaymentUnit) AS DocCreditDays,
+        MAX(pt.PaymentTermName) AS DocTermName
+    FROM dbo.docDocument doc
+    JOIN dbo.engPaymentTerm pt ON doc.PaymentTermID = pt.PaymentTermID
+    JOIN dbo.engPaymentTermDetail ptd ON pt.PaymentTermID = ptd.PaymentTermID
+    WHERE doc.BusinessEntityID IN ({placeholders})
+    GROUP BY doc.BusinessEntityID, doc.Folio
+"""
+
+DocKey = Tuple[int, str]
+_NO_DOC_TERM = (None, None)
+
+
+class TermLookups:
+    def __init__(
+        self,
+        payment_terms: Dict[int, Tuple[Optional[str], Optional[int]]],
+        customer_terms: Dict[int, int],
+        doc_terms: Dict[DocKey, Tuple[Optional[int], Optional[str]]],
+        elapsed_ms: float = 0.0
+    ):
+        self.payment_terms = payment_terms
+        self.customer_terms = customer_terms
+        self.doc_terms = doc_terms
+        self.loaded_at = datetime.datetime.now()
+        self.elapsed_ms = elapsed_ms
+        self._lock = threading.Lock()
+        # Una búsqueda de documentos nuevos a la vez: dos reportes simultáneos no
+        # consultan las mismas claves
+        self._fill_lock = threading.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "payment_terms": len(self.payment_terms),
+            "customers": len(self.customer_terms),
+            "documents": len(self.doc_terms),
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "load_ms": round(self.elapsed_ms, 1),
+        }
+
+    def fill_missing(self, conn: pyodbc.Connection, keys: Iterable[DocKey], company_key: str | None = None) -> int:
+        """
+        Busca los términos de documentos que no estaban en la última carga.
+        Las claves consultadas quedan registradas (las que no tienen término,
+        como _NO_DOC_TERM) para no volver a buscarlas hasta la siguiente recarga:
+        cada clave se consulta a lo más una vez por carga.
+        """
+        keys = set(keys)
+        if all(k in self.doc_terms for k in keys):
+            return 0
+        with self._fill_lock:
+            # Otro reporte pudo haber buscado estas claves mientras esperábamos
+            missing = {k for k in keys if k not in self.doc_terms}
+            if not missing:
+                return 0
+            return self._fill(conn, missing, company_key)
+
+    def _fill(self, conn: pyodbc.Connection, missing: set, company_key: str | None) -> int:
+        entities = sorted({entity for entity, _ in missing})
+        found: Dict[DocKey, Tuple[Optional[int], Optional[str]]] = {}
+        for i in range(0, len(entities), _IN_CHUNK):
+            chunk = entities[i:i + _IN_CHUNK]
+            sql = _DOC_TERMS_BY_ENTITY_SQL.format(placeholders=", ".join("?" * len(chunk)))
+            for row in fetch_all(conn, sql, chunk, name="term_lookups.new_documents", company=company_key):
+                found[(row.BusinessEntityID, row.Folio)] = (row.DocCreditDays, row.DocTermName)
+        with self._lock:
+            for key in missing:
+                self.doc_terms.setdefault(key, found.get(key, _NO_DOC_TERM))
+            for key, value in found.items():
+                self.doc_terms.setdefault(key, value)
+        return len(missing)
+
+    def resolve(self, entity_id, folio, arrival, invoice):
+        """Devuelve (Vencimiento, CreditDaysLabel) para una fila de saldo."""
+        doc_days, doc_name = self.doc_terms.get((entity_id, folio), _NO_DOC_TERM)
+        term_id = self.customer_terms.get(entity_id)
+        term_name, max_days = self.payment_terms.get(term_id, _NO_DOC_TERM) if term_id is not None else _NO_DOC_TERM
+        days = doc_days if doc_days is not None else (max_days if max_days is not None else 0)
+        base = arrival if arrival is not None else invoice
+        due = base + datetime.timedelta(days=int(days)) if base is not None else None
+        return due, (doc_name if doc_name is not None else term_name)
+
+
+# Las tres tablas, para fetch_batch (en este orden las recibe term_lookups_from_results)
+TERM_LOOKUP_STATEMENTS = [
+    ("term_lookups.payment_terms", _PAYMENT_TERMS_SQL, []),
+    ("term_lookups.customer_terms", _CUSTOMER_TERMS_SQL, []),
+    ("term_lookups.document_terms", _DOC_TERMS_SQL, []),
+]
+
+
+def term_lookups_from_results(results: List[list], load_ms: float) -> TermLookups:
+    payment_rows, customer_rows, doc_rows = results
+    payment_terms = {row.PaymentTermID: (row.PaymentTermName, row.MaxCreditDays) for row in payment_rows}
+    customer_terms = {
+        row.BusinessEntityID: row.PaymentTermID for row in customer_rows if row.PaymentTermID is not None
+    }
+    doc_terms = {(row.BusinessEntityID, row.Folio): (row.DocCreditDays, row.DocTermName) for row in doc_rows}
+    return TermLookups(payment_terms, customer_terms, doc_terms, load_ms)
+
+
+def fetch_term_lookups(conn: pyodbc.Connection, company_key: str | None = None) -> TermLookups:
+    """Las tres tablas en un solo lote (un viaje a SQL Server)."""
+    t0 = time.perf_counter()
+    results = fetch_batch(conn, TERM_LOOKUP_STATEMENTS, company=company_key, prepared=True)
+    return term_lookups_from_results(results, (time.perf_counter() - t0) * 1000)
+
+
+# Una entrada por empresa
+term_lookups_cache = ResultCache(ttl=TERM_LOOKUP_TTL, max_entries=64)
+
+
+def get_term_lookups(conn: pyodbc.Connection, company_key: str, refresh: bool = False) -> TermLookups:
+    if refresh:
+        lookups = fetch_term_lookups(conn, company_key)
+        term_lookups_cache.put(company_key, lookups)
+        return lookups
+    return term_lookups_cache.get_or_load(company_key, lambda: fetch_term_lookups(conn, company_key))
+
+
+def refresh_term_lookups_if_stale(conn: pyodbc.Connection, company_key: str) -> bool:
+    """Para el warm-up: recarga si no hay tablas o ya pasó la mitad del TTL."""
+    lookups = term_lookups_cache.get(company_key)
+    if lookups is not None and (datetime.datetime.now() - lookups.loaded_at).total_seconds() < TERM_LOOKUP_TTL / 2:
+        return False
+    get_term_lookups(conn, company_key, refresh=True)
+    return True
+
+
+def apply_term_lookups(conn: pyodbc.Connection, company_key: str, rows: List[pyodbc.Row]) -> List[pyodbc.Row]:
+    """Completa `Vencimiento` y `CreditDaysLabel` de las filas de la consulta delgada."""
+    lookups = get_term_lookups(conn, company_key)
+    lookups.fill_missing(conn, ((row.BusinessEntityID, row.Folio) for row in rows), company_key)
+    resolve = lookups.resolve
+    for row in rows:
+        row.Vencimiento, row.CreditDaysLabel = resolve(
+            row.BusinessEntityID, row.Folio, row.ArrivalDate, row.InvoiceDate
+        )
+    return rows
@@ -0,0 +1,343 @@
+# app/scheduler.py
+"""Programador de warm-up (precálculo) de las vistas más comunes del reporte.
+
+La primera persona que abre el dashboard en la mañana esperaba la consulta
+completa "to_date, todos los clientes" de cada empresa. Este módulo corre un
+ciclo asyncio dentro del mismo proceso de la API que, según entradas tipo cron,
+ejecuta esa consulta por empresa y deja las filas, el resultado procesado y los
+KPIs en la caché de resultados (app/reports/report_cache.py). Así la carga
+interactiva sale "tibia".
+
+Configuración (variables de entorno):
+  WARMUP_ENABLED=false                                (apagado por defecto)
+  WARMUP_SCHEDULE="45 6 * * 1-5;*/20 7-19 * * 1-5"   (minuto hora día mes día_semana)
+  WARMUP_TENANTS=growers_union,sofresco               (vacío = todas)
+  WARMUP_TTL=1500                                     (vigencia de lo precalculado, en segundos)
+  WARMUP_LOCK_FILE=warmup.lock
+  WARMUP_HISTORY=200                                  (corridas guardadas)
+
+Lo precalculado se guarda con WARMUP_TTL y no con REPORT_CACHE_TTL: tiene que
+durar más que el intervalo entre corridas (20 min en el horario por defecto),
+si no la caché queda vacía la mayor parte del tiempo.
+
+Con `uvicorn --workers N` solo un worker ejecuta el horario: el que obtiene el
+candado exclusivo de WARMUP_LOCK_FILE (el sistema operativo lo libera si el
+proceso muere). Con la caché compartida (SHARED_CACHE_PATH) lo que calienta ese
+worker les sirve a todos. POST /scheduler/run funciona en cualquier worker.
+
+El trabajo pesado (SQL + procesamiento) corre en un hilo con `asyncio.to_thread`
+para no bloquear el event loop. Las empresas se calientan una tras otra y si una
+corrida sigue en curso cuando toca la siguiente, esta se marca como "skipped".
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import time
+from collections import deque
+from typing import IO, Deque, Dict, List, Optional, Set
+
+from fastapi import APIRouter, HTTPException
+
+from .security import CurrentUser
+from .sql_server_conn import open_sql_server_conn
+from .tenants import TENANTS
+from .reports.report_schemas import ReportFilters
+from .reports.report_cache import report_data_cache, report_kpis_cache
+from .reports.receivables import (
+    resolve_aging_scheme, load_report_rows, process_report_data, report_data_key, aging_scheme_info,
+    kpis_cache_key, SLIM_REPORT_QUERY
+)
+from .reports.kpis import compute_receivables_kpis
+from .reports.term_lookups import refresh_term_lookups_if_stale
+
+log = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "false").lower() in ("1", "true", "yes")
+WARMUP_SCHEDULE = os.getenv("WARMUP_SCHEDULE", "45 6 * * 1-5;*/20 7-19 * * 1-5")
+WARMUP_TENANTS = [t.strip() for t in os.getenv("WARMUP_TENANTS", "").split(",") if t.strip()]
+# Más que el intervalo del horario por defecto (20 min) para que no haya huecos entre corridas
+WARMUP_TTL = float(os.getenv("WARMUP_TTL", "1500"))
+WARMUP_LOCK_FILE = os.getenv("WARMUP_LOCK_FILE", "warmup.lock")
+WARMUP_HISTORY = int(os.getenv("WARMUP_HISTORY", "200"))
+# KPIs que se precalculan: (esquema de antigüedad, top_n). None = el esquema de
+# la empresa con el top_n por defecto de /receivables-kpis; "monthly" con 30 es
+# lo que piden los widgets del resumen en ReportsPage.js
+WARMUP_KPI_VIEWS = ((None, 10), ("monthly", 30))
+
+router = APIRouter(tags=["Scheduler"])
+
+
+# --- Entradas tipo cron ---
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekdays": "0 0 * * 1-5",
+}
+# (mínimo, máximo) de cada campo: minuto, hora, día del mes, mes, día de la semana (0 = domingo)
+_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(text: str, low: int, high: int) -> frozenset:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid step in '{text}'")
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end:
+            raise ValueError(f"Value out of range in '{text}' (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronEntry:
+    """Una entrada 'minuto hora día mes día_semana' con soporte de *, listas, rangos y pasos."""
+    __slots__ = ("expression", "minutes", "hours", "days", "months", "weekdays")
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = _ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron entry needs 5 fields: '{expression}'")
+        parsed = [_parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, _FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 7 también es domingo
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+
+    def matches(self, moment: datetime.datetime) -> bool:
+        return (
+            moment.minute in self.minutes
+            and moment.hour in self.hours
+            and moment.day in self.days
+            and moment.month in self.months
+            and (moment.weekday() + 1) % 7 in self.weekdays
+        )
+
+    def next_after(self, moment: datetime.datetime, horizon_days: int = 8) -> Optional[datetime.datetime]:
+        candidate = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = candidate + datetime.timedelta(days=horizon_days)
+        while candidate < limit:
+            if self.matches(candidate):
+                return candidate
+            candidate += datetime.timedelta(minutes=1)
+        return None
+
+
+def parse_schedule(text: str) -> List[CronEntry]:
+    return [CronEntry(part) for part in text.split(";") if part.strip()]
+
+
+# --- Tarea de warm-up ---
+def default_dashboard_filters(as_of: Optional[datetime.date] = None) -> ReportFilters:
+    """La vista que abre el frontend por defecto: to_date, todos los clientes, hoy."""
+    return ReportFilters(as_of=as_of or datetime.date.today(), filter_mode="to_date")
+
+
+def warm_company(company_key: str) -> Dict[str, object]:
+    """
+    Consulta la vista por defecto de una empresa (reemplazando lo que haya en
+    caché) y guarda las filas, el resultado procesado y los KPIs con vigencia
+    WARMUP_TTL. Bloqueante: se ejecuta en un hilo.
+    """
+    filters = default_dashboard_filters()
+    scheme = resolve_aging_scheme(company_key, filters)
+    conn = open_sql_server_conn(company_key)
+    try:
+        # Las tablas de términos se recargan aquí antes de que expiren (ver term_lookups.py)
+        if SLIM_REPORT_QUERY:
+            refresh_term_lookups_if_stale(conn, company_key)
+        rows = load_report_rows(conn, company_key, filters, refresh=True, ttl=WARMUP_TTL)
+    finally:
+        conn.close()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No data found for the selected filters.")
+    # La vista por defecto no consolida moneda (sin reporting_currency): el mismo
+    # resultado sirve a la vista previa / descargas y a los KPIs
+    processed_data = process_report_data(raw_data=rows, as_of=filters.as_of, scheme=scheme)
+    report_data_cache.put(report_data_key(company_key, filters, scheme), processed_data, ttl=WARMUP_TTL)
+    documents = sum(len(group.entries) for group in processed_data.values())
+    for scheme_key, top_n in WARMUP_KPI_VIEWS:
+        # Mismas filas (la clave de filas no depende del esquema); otro esquema se procesa aparte
+        view_filters = filters.model_copy(update={"aging_scheme": scheme_key})
+        view_scheme = resolve_aging_scheme(company_key, view_filters)
+        view_data = processed_data if view_scheme == scheme else process_report_data(
+            raw_data=rows, as_of=filters.as_of, scheme=view_scheme
+        )
+        kpis = compute_receivables_kpis(
+            view_data, as_of=filters.as_of, scheme=view_scheme,
+            aging_scheme=aging_scheme_info(view_scheme), top_n=top_n
+        )
+        report_kpis_cache.put(kpis_cache_key(company_key, view_filters, view_scheme, top_n), kpis, ttl=WARMUP_TTL)
+    return {"documents": documents}
+
+
+def _acquire_lock_file(path: str) -> Optional[IO]:
+    """Candado exclusivo sin esperar sobre `path`: el archivo abierto (mientras se tenga) o None."""
+    f = open(path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class WarmupScheduler:
+    def __init__(self, entries: List[CronEntry], companies: List[str], history: int = WARMUP_HISTORY):
+        self.entries = entries
+        self.companies = companies
+        self.runs: Deque[dict] = deque(maxlen=history)
+        self._task: Optional[asyncio.Task] = None
+        # Corridas lanzadas por el horario: se guarda la referencia para que no
+        # las recolecte el GC y para cancelarlas al apagar
+        self._runs_in_flight: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self._lock_file: Optional[IO] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, lock_path: Optional[str] = WARMUP_LOCK_FILE) -> None:
+        """Inicia el ciclo si este worker obtiene el candado de `lock_path` (None = sin candado)."""
+        if self.running:
+            return
+        if lock_path:
+            self._lock_file = _acquire_lock_file(lock_path)
+            if self._lock_file is None:
+                log.info(f"[WARMUP] Another worker holds {lock_path}; scheduler not started in pid {os.getpid()}")
+                return
+        self._task = asyncio.create_task(self._loop(), name="warmup-scheduler")
+        log.info(f"[WARMUP] Scheduler started: {[e.expression for e in self.entries]} -> {self.companies}")
+
+    async def stop(self) -> None:
+        tasks = list(self._runs_in_flight)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run_finished(self, task: asyncio.Task) -> None:
+        self._runs_in_flight.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f"[WARMUP] Scheduled run failed: {task.exception()!r}", exc_info=task.exception())
+
+    def next_run(self) -> Optional[datetime.datetime]:
+        now = datetime.datetime.now()
+        upcoming = [n for n in (e.next_after(now) for e in self.entries) if n is not None]
+        return min(upcoming) if upcoming else None
+
+    async def _loop(self) -> None:
+        while True:
+            # Despierta al inicio de cada minuto y revisa qué entradas coinciden
+            now = datetime.datetime.now()
+            await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000)
+            moment = datetime.datetime.now().replace(second=0, microsecond=0)
+            if any(e.matches(moment) for e in self.entries):
+                task = asyncio.create_task(self.run_once("schedule"), name=f"warmup-{moment:%H%M}")
+                self._runs_in_flight.add(task)
+                task.add_done_callback(self._run_finished)
+
+    async def run_once(self, trigger: str, companies: Optional[List[str]] = None) -> List[dict]:
+        """Calienta las empresas indicadas (o todas) y registra una corrida por empresa."""
+        companies = companies or self.companies
+        if self._lock.locked():
+            record = {
+                "company": ",".join(companies), "trigger": trigger, "status": "skipped",
+                "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "duration_ms": 0.0, "documents": 0, "error": "Previous warm-up still running",
+            }
+            self.runs.append(record)
+            return [record]
+
+        records = []
+        async with self._lock:
+            for company_key in companies:
+                record = {
+                    "company": company_key, "trigger": trigger, "status": "ok",
+                    "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "duration_ms": 0.0, "documents": 0, "error": None,
+                }
+                t0 = time.perf_counter()
+                try:
+                    result = await asyncio.to_thread(warm_company, company_key)
+                    record["documents"] = result["documents"]
+                except HTTPException as e:
+                    # 404 = la empresa no tiene saldos; no es un error del warm-up
+                    record["status"] = "empty" if e.status_code == 404 else "error"
+                    record["error"] = str(e.detail)
+                except Exception as e:
+                    record["status"] = "error"
+                    record["error"] = str(e)
+                record["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                if record["status"] == "error":
+                    log.warning(f"[WARMUP] {company_key} failed in {record['duration_ms']} ms: {record['error']}")
+                else:
+                    log.info(f"[WARMUP] {company_key} {record['status']} in {record['duration_ms']} ms ({record['documents']} docs)")
+                self.runs.append(record)
+                records.append(record)
+        return records
+
+
+scheduler = WarmupScheduler(
+    parse_schedule(WARMUP_SCHEDULE),
+    [c for c in (WARMUP_TENANTS or list(TENANTS.keys())) if c in TENANTS],
+)
+
+
+# --- Endpoints (solo administradores) ---
+@router.get("/scheduler/jobs")
+def get_scheduler_jobs(current_user: CurrentUser):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    next_run = scheduler.next_run()
+    return {
+        "enabled": WARMUP_ENABLED,
+        # False en los workers que no obtuvieron el candado de WARMUP_LOCK_FILE
+        "running": scheduler.running,
+        "pid": os.getpid(),
+        "ttl_seconds": WARMUP_TTL,
+        "schedule": [e.expression for e in scheduler.entries],
+        "companies": scheduler.companies,
+        "next_run": next_run.isoformat() if next_run else None,
+    }
+
+
+@router.get("/scheduler/runs")
+def get_scheduler_runs(current_user: CurrentUser, company: Optional[str] = None, limit: int = 50):
+    """Historial de corridas, la más reciente primero."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    runs = [r for r in reversed(scheduler.runs) if company is None or r["company"] == company]
+    return runs[:max(1, min(limit, WARMUP_HISTORY))]
+
+
+@router.post("/scheduler/run")
+async def trigger_warmup(current_user: CurrentUser, company: Optional[str] = None):
+    """Ejecuta el warm-up ahora (de una empresa o de todas) y devuelve el resultado."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if company is not None and company not in TENANTS:
+        raise HTTPException(status_code=400, detail=f"Invalid company. Allowed: {', '.join(TENANTS.keys())}")
+    return await scheduler.run_once("manual", [company] if company else None)
@@ -1,14 +1,20 @@
 # reporter_backend/app/security.py
 from datetime import datetime, timedelta
 from typing import Optional, List, Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 import os
+import secrets
 
 from . import crud, models, schemas, database
+from .principals import get_principal, put_principal
+from .passwords import (
+    pwd_context, get_password_hash, verify_password, verify_password_async,
+    get_password_hash_async, needs_rehash, login_limiter, current_rounds, set_rounds,
+    benchmark_rounds_async, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS
+)
 
 # Configuración
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey_change_me")
@@ -16,19 +22,16 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifica el token en la caché de principals (ver principals.py)
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(12)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -45,11 +48,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
+
+    # Tokens emitidos antes de agregar jti: se identifican por su expiración
+    token_id = str(payload.get("jti") or payload.get("exp"))
+    principal = get_principal(username, token_id)
+    if principal is not None:
+        return principal
+
     user = crud.get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
-    return user
+    return put_principal(username, token_id, user)
 
 def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
@@ -59,17 +68,29 @@ def get_current_active_user(current_user: models.User = Depends(get_current_user
 CurrentUser = Annotated[models.User, Depends(get_current_active_user)]
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    # Corta ráfagas de intentos fallidos antes de gastar bcrypt. Detrás de Caddy la IP
+    # es la del cliente: uvicorn toma X-Forwarded-For del proxy local (127.0.0.1)
+    client_ip = request.client.host if request.client else "unknown"
+    login_limiter.check(form_data.username, client_ip)
     user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # bcrypt corre en el executor acotado de passwords.py, no en el event loop
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
+        login_limiter.record_failure(form_data.username, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user.last_login = datetime.utcnow()
-    db.commit()
+    login_limiter.reset(form_data.username, client_ip)
+
+    # Hash con un costo distinto al configurado: se actualiza ahora que tenemos la contraseña
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(form_data.password)
+        db.commit()
+
+    # Write-behind: se escribe en lote junto con los demás logins (ver storage.py)
+    database.last_login_buffer.record(user.id, datetime.utcnow())
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -89,7 +110,8 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(database
     db_user = crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await get_password_hash_async(user.password)
+    return crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @router.get("/users/me", response_model=schemas.User)
 async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
@@ -99,6 +121,8 @@ async def read_users_me(current_user: models.User = Depends(get_current_active_u
 def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
+    # Que la lista muestre los últimos logins aunque sigan en el buffer
+    database.last_login_buffer.flush()
     users = db.query(models.User).offset(skip).limit(limit).all()
     return users
 
@@ -191,4 +215,42 @@ def update_user_password_endpoint(
     user = crud.update_user_password(db, user_id, new_password)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"status": "password_updated"}
\ No newline at end of file
+    return {"status": "password_updated"}
+
+# --- Costo de bcrypt (solo admins) ---
+@router.get("/security/bcrypt")
+async def get_bcrypt_settings(current_user: models.User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"rounds": current_rounds(), "min_rounds": BCRYPT_MIN_ROUNDS, "max_rounds": BCRYPT_MAX_ROUNDS}
+
+@router.get("/security/bcrypt/benchmark")
+async def benchmark_bcrypt(
+    min_rounds: int = BCRYPT_MIN_ROUNDS,
+    max_rounds: int = 13,
+    samples: int = 3,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Mide cuánto tarda bcrypt en este servidor para cada costo, para elegir uno."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    min_rounds = max(min_rounds, BCRYPT_MIN_ROUNDS)
+    max_rounds = min(max_rounds, BCRYPT_MAX_ROUNDS)
+    if min_rounds > max_rounds:
+        raise HTTPException(status_code=400, detail="min_rounds must be <= max_rounds")
+    results = await benchmark_rounds_async(list(range(min_rounds, max_rounds + 1)), max(1, min(samples, 10)))
+    return {"current_rounds": current_rounds(), "results": results}
+
+@router.put("/security/bcrypt")
+async def update_bcrypt_rounds(rounds: int, current_user: models.User = Depends(get_current_active_user)):
+    """
+    Cambia el costo para los hashes nuevos en este proceso. Para que persista
+    (y aplique a todos los workers) configure BCRYPT_ROUNDS en el entorno.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        set_rounds(rounds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "updated", "rounds": current_rounds()}
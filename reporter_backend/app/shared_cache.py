@@ -0,0 +1,224 @@
+# app/shared_cache.py
+"""Almacén de caché compartido entre los workers de uvicorn de un mismo equipo.
+
+Con `uvicorn --workers N` cada proceso tiene su propia memoria: las cachés de
+report_cache.py se llenan N veces y cada worker consulta SQL Server por su
+cuenta. Este almacén es un archivo SQLite local (WAL, varios lectores y un
+escritor a la vez) que todos los workers abren:
+
+- entries: valor ya codificado (bytes, ver reports/cache_codecs.py) por
+  (espacio, hash de la clave), con expiración y última lectura.
+- locks:   "single-flight" entre procesos. El primer worker que pide una clave
+  ausente toma el candado y consulta; los demás esperan a que aparezca el
+  valor. El candado tiene vencimiento por si el worker muere a medio camino.
+
+El tamaño total se limita a SHARED_CACHE_MAX_MB: al pasarse se borran primero
+las entradas vencidas y después las leídas hace más tiempo.
+
+Se activa con SHARED_CACHE_PATH=/ruta/cache.db (vacío = cada worker con su
+caché en memoria, como antes). Solo para workers del mismo equipo: SQLite
+sobre un disco de red no es confiable.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator, Optional, Tuple
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_MAX_MB = float(os.getenv("SHARED_CACHE_MAX_MB", "512"))
+# Lo que puede tardar la carga de una clave (más que el timeout de consulta más largo)
+SHARED_CACHE_LOCK_SECONDS = float(os.getenv("SHARED_CACHE_LOCK_SECONDS", "330"))
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        namespace TEXT NOT NULL, key_hash TEXT NOT NULL, key BLOB, value BLOB NOT NULL,
+        size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL,
+        PRIMARY KEY (namespace, key_hash)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed);
+    CREATE TABLE IF NOT EXISTS locks (
+        namespace TEXT NOT NULL, key_hash TEXT NOT NULL, owner TEXT NOT NULL, expires REAL NOT NULL,
+        PRIMARY KEY (namespace, key_hash)
+    ) WITHOUT ROWID;
+"""
+# No se actualiza "accessed" en cada lectura (sería una escritura por petición)
+_TOUCH_SECONDS = 5.0
+
+
+def key_hash(key) -> str:
+    """Hash estable entre procesos (hash() de Python cambia en cada proceso)."""
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SharedCache:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = int(SHARED_CACHE_MAX_MB * 1_048_576),
+        lock_seconds: float = SHARED_CACHE_LOCK_SECONDS
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock_seconds = lock_seconds
+        # Identifica al dueño de un candado (junto con el pid y el hilo)
+        self._instance = uuid.uuid4().hex[:8]
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo (los endpoints síncronos corren en un threadpool) y
+        # por proceso: una conexión SQLite no debe cruzar un fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _owner(self) -> str:
+        return f"{os.getpid()}-{self._instance}-{threading.get_ident()}"
+
+    # --- Valores ---
+    def get(self, namespace: str, digest: str) -> Optional[Tuple[bytes, float]]:
+        """(valor, expiración en epoch) o None si no está o ya venció."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires, accessed FROM entries WHERE namespace = ? AND key_hash = ?",
+            (namespace, digest)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[1] < now:
+            self.misses += 1
+            return None
+        if now - row[2] > _TOUCH_SECONDS:
+            conn.execute(
+                "UPDATE entries SET accessed = ? WHERE namespace = ? AND key_hash = ?", (now, namespace, digest)
+            )
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, namespace: str, digest: str, value: bytes, ttl: float, key_blob: Optional[bytes] = None) -> float:
+        """Guarda el valor y devuelve su expiración (epoch), la misma que devolverá `get`."""
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key_hash, key, value, size, expires, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (namespace, digest, key_blob, value, len(value), now + ttl, now)
+        )
+        self._evict()
+        return now + ttl
+
+    def delete(self, namespace: str, digests) -> int:
+        conn = self._conn()
+        removed = 0
+        for digest in digests:
+            removed += conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key_hash = ?", (namespace, digest)
+            ).rowcount
+        return removed
+
+    def keys(self, namespace: str) -> Iterator[Tuple[str, Optional[bytes]]]:
+        """(hash, clave codificada) de las entradas vigentes del espacio."""
+        rows = self._conn().execute(
+            "SELECT key_hash, key FROM entries WHERE namespace = ? AND expires >= ?", (namespace, time.time())
+        ).fetchall()
+        return iter(rows)
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        if namespace is None:
+            return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return self._conn().execute("SELECT COUNT(*) FROM entries WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def _evict(self) -> None:
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            conn = self._conn()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            removed = conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            # Las menos leídas primero, hasta quedar en 90% del límite (para no evictar en cada put)
+            target = self.max_bytes * 0.9
+            for namespace, digest, size in conn.execute(
+                "SELECT namespace, key_hash, size FROM entries ORDER BY accessed"
+            ).fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key_hash = ?", (namespace, digest))
+                total -= size
+                removed += 1
+            self.evictions += removed
+        finally:
+            self._evict_lock.release()
+
+    # --- Single-flight entre procesos ---
+    def try_lock(self, namespace: str, digest: str) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM locks WHERE namespace = ? AND key_hash = ? AND expires < ?", (namespace, digest, now)
+            )
+            acquired = conn.execute(
+                "INSERT OR IGNORE INTO locks (namespace, key_hash, owner, expires) VALUES (?, ?, ?, ?)",
+                (namespace, digest, self._owner(), now + self.lock_seconds)
+            ).rowcount == 1
+            conn.execute("COMMIT")
+            return acquired
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def is_locked(self, namespace: str, digest: str) -> bool:
+        row = self._conn().execute(
+            "SELECT expires FROM locks WHERE namespace = ? AND key_hash = ?", (namespace, digest)
+        ).fetchone()
+        return row is not None and row[0] >= time.time()
+
+    def unlock(self, namespace: str, digest: str) -> None:
+        self._conn().execute(
+            "DELETE FROM locks WHERE namespace = ? AND key_hash = ? AND owner = ?", (namespace, digest, self._owner())
+        )
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        by_namespace = {
+            namespace: {"entries": n, "mb": round(size / 1_048_576, 2)}
+            for namespace, n, size in conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+            )
+        }
+        return {
+            "path": self.path,
+            "max_mb": round(self.max_bytes / 1_048_576, 1),
+            "namespaces": by_namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_shared: Optional[SharedCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """El almacén del proceso, o None si SHARED_CACHE_PATH no está configurado."""
+    global _shared
+    if not SHARED_CACHE_PATH:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedCache(SHARED_CACHE_PATH)
+        return _shared
@@ -1,10 +1,15 @@
 # app/sql_server_conn.py
 import pyodbc
-from fastapi import HTTPException, status, Request
+from fastapi import Depends, HTTPException, status, Request
 import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
-from .tenants import TENANTS, get_company_or_default
+from .tenants import TENANTS, get_company_or_default, get_tenant_setting
+from .query_stats import query_stats
 
 # Carga variables de entorno (ej. host, user, password) desde el archivo .env
 load_dotenv()
@@ -15,6 +20,25 @@ DB_SERVER = os.environ.get("DB_SERVER", r"LOCALHOST\SQLEXPRESS")
 DB_USER = os.environ.get("DB_USER", "sa")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "tu_contraseña_secreta")
 
+# Conexiones reutilizables por empresa (0 = abrir y cerrar una por petición, como antes)
+SQL_POOL_SIZE = int(os.environ.get("SQL_POOL_SIZE", "4"))
+# Una conexión que lleva más de esto sin usarse se cierra en vez de reutilizarse
+SQL_POOL_IDLE_SECONDS = float(os.environ.get("SQL_POOL_IDLE_SECONDS", "300"))
+
+def _parse_route_timeouts(text: str) -> Dict[str, int]:
+    timeouts = {}
+    for part in text.split(";"):
+        if "=" in part:
+            route, seconds = part.rsplit("=", 1)
+            timeouts[route.strip()] = int(seconds)
+    return timeouts
+
+# Timeout de consulta por ruta; tiene prioridad sobre el de la empresa (tenants.py).
+# Vacío por defecto (sin timeout, salvo el de la empresa). La clave se busca
+# dentro del path de la ruta, ej.:
+#   QUERY_TIMEOUT_ROUTES="receivables-preview=60;receivables-download=300"
+QUERY_TIMEOUT_ROUTES = _parse_route_timeouts(os.environ.get("QUERY_TIMEOUT_ROUTES", ""))
+
 def _build_connection_string(database_name: str) -> str:
     return (
         f"DRIVER={{ODBC Driver 17 for SQL Server}};"
@@ -23,18 +47,14 @@ def _build_connection_string(database_name: str) -> str:
         "Encrypt=no;TrustServerCertificate=yes;"
     )
 
-def get_sql_server_conn(request: Request):
+def get_company_key(request: Request) -> str:
     """
-    Dependencia de FastAPI: Retorna una conexión a la base de datos de SQL Server
-    dependiendo de la empresa o tenant seleccionado en el Frontend.
-
-    El frontend debe enviar obligatoriamente el header HTTP: X-Company: <tenant_key>
-    (Por ejemplo: growers_union o sofresco) para identificar a qué BD conectarse.
-
-    Esto establece la base para nuestro modelo Multi-Tenant.
+    Dependencia de FastAPI: Resuelve la clave de empresa (tenant) a partir del
+    header HTTP X-Company. Si el header no viene, se usa la empresa por defecto.
+    Lanza 400 si la clave no está en la whitelist de TENANTS.
     """
     company_header = request.headers.get("X-Company")
-    
+
     # --- DEBUG LOGGING ---
     import logging
     logger = logging.getLogger("app.sql_server_conn")
@@ -42,7 +62,7 @@ def get_sql_server_conn(request: Request):
     # ---------------------
 
     try:
-        company_key = get_company_or_default(company_header)
+        return get_company_or_default(company_header)
     except KeyError:
         allowed = ", ".join(TENANTS.keys())
         raise HTTPException(
@@ -50,16 +70,188 @@ def get_sql_server_conn(request: Request):
             detail=f"Invalid company. Allowed: {allowed}"
         )
 
+def query_timeout_for(company_key: str, route_path: str | None = None) -> int:
+    """Segundos de timeout de consulta: el de la ruta si está configurado, si no el de la empresa."""
+    if route_path:
+        for route in sorted(QUERY_TIMEOUT_ROUTES, key=len, reverse=True):
+            if route in route_path:
+                return QUERY_TIMEOUT_ROUTES[route]
+    return int(get_tenant_setting(company_key, "query_timeout", 0) or 0)
+
+def open_sql_server_conn(company_key: str) -> pyodbc.Connection:
+    """
+    Abre una conexión a la base de datos de la empresa sin pasar por una petición
+    HTTP (ej. tareas programadas). Quien la abre es responsable de cerrarla.
+    """
+    standin_db = get_tenant_setting(company_key, "standin_db")
+    if standin_db:
+        # Datos sintéticos en SQLite para benchmarks (ver sql_standin.py)
+        from . import sql_standin
+        conn = sql_standin.connect(standin_db)
+    else:
+        conn = pyodbc.connect(_build_connection_string(TENANTS[company_key]["database"]), autocommit=False)
+        conn.autocommit = False
+    conn.timeout = query_timeout_for(company_key)
+    return conn
+
+class SqlServerPool:
+    """
+    Pool de conexiones por empresa. Además de ahorrar el login en cada petición,
+    cada conexión conserva un cursor por texto SQL para las consultas del
+    catálogo (ver reports/query_catalog.py): pyodbc reutiliza el statement ya
+    preparado cuando el mismo cursor ejecuta el mismo texto, así que SQL Server
+    no vuelve a preparar la consulta.
+
+    Al devolver una conexión se hace rollback (autocommit=False); si falla, la
+    conexión está rota y se cierra junto con sus cursores.
+    """
+
+    def __init__(self, size: int = SQL_POOL_SIZE, idle_seconds: float = SQL_POOL_IDLE_SECONDS):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._idle: Dict[str, Deque[Tuple[pyodbc.Connection, float]]] = {}
+        # id(conexión) -> {(texto SQL, timeout): cursor preparado}. El timeout se fija
+        # al crear el cursor, así que un cursor solo se reutiliza con el mismo timeout.
+        self._cursors: Dict[int, Dict[Tuple[str, int], pyodbc.Cursor]] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def acquire(self, company_key: str) -> pyodbc.Connection:
+        now = time.monotonic()
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.setdefault(company_key, deque())
+            while idle:
+                candidate, released_at = idle.pop()
+                if now - released_at <= self.idle_seconds:
+                    conn = candidate
+                    self.reused += 1
+                    break
+                stale.append(candidate)
+        for old in stale:
+            self._close(old)
+        if conn is None:
+            conn = open_sql_server_conn(company_key)
+            with self._lock:
+                self.opened += 1
+                self._cursors[id(conn)] = {}
+        return conn
+
+    def release(self, company_key: str, conn: pyodbc.Connection) -> None:
+        try:
+            conn.rollback()
+        except pyodbc.Error:
+            self._close(conn)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(company_key, deque())
+            if len(idle) < self.size:
+                idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def prepared_cursor(self, conn: pyodbc.Connection, sql: str) -> Optional[pyodbc.Cursor]:
+        """Cursor reutilizable de esta conexión para este texto; None si la conexión no es del pool."""
+        with self._lock:
+            cursors = self._cursors.get(id(conn))
+            if cursors is None:
+                return None
+            key = (sql, conn.timeout)
+            cursor = cursors.get(key)
+            if cursor is None:
+                cursor = cursors[key] = conn.cursor()
+            return cursor
+
+    def drop_cursor(self, conn: pyodbc.Connection, sql: str) -> None:
+        with self._lock:
+            cursor = self._cursors.get(id(conn), {}).pop((sql, conn.timeout), None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass
+
+    def _close(self, conn: pyodbc.Connection) -> None:
+        with self._lock:
+            cursors = self._cursors.pop(id(conn), {})
+        for cursor in cursors.values():
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def close_all(self) -> None:
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for conn, _ in idle]
+            self._idle.clear()
+        for conn in conns:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": {company: len(idle) for company, idle in self._idle.items()},
+                "opened": self.opened,
+                "reused": self.reused,
+                "prepared_cursors": sum(len(c) for c in self._cursors.values()),
+            }
+
+
+sql_pool = SqlServerPool()
+
+def get_sql_server_conn(request: Request, company_key: str = Depends(get_company_key)):
+    """
+    Dependencia de FastAPI: Retorna una conexión a la base de datos de SQL Server
+    dependiendo de la empresa o tenant seleccionado en el Frontend.
+
+    El frontend debe enviar obligatoriamente el header HTTP: X-Company: <tenant_key>
+    (Por ejemplo: growers_union o sofresco) para identificar a qué BD conectarse.
+
+    Esto establece la base para nuestro modelo Multi-Tenant.
+
+    El timeout de consulta de la conexión depende de la empresa y de la ruta
+    (ver query_timeout_for).
+    """
+    import logging
+    logger = logging.getLogger("app.sql_server_conn")
+
     database_name = TENANTS[company_key]["database"]
     logger.info(f"Resolved Company: '{company_key}' -> Database: '{database_name}'")
+    route = request.scope.get("route")
+    timeout = query_timeout_for(company_key, getattr(route, "path", None))
     
-    conn_str = _build_connection_string(database_name)
+    if sql_pool.enabled:
+        try:
+            conn = sql_pool.acquire(company_key)
+            conn.timeout = timeout
+        except pyodbc.Error as e:
+            logger.error(f"Connection Failed to {database_name}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database connection error ({company_key}/{database_name}): {e}"
+            )
+        try:
+            yield conn
+        finally:
+            sql_pool.release(company_key, conn)
+        return
 
     try:
-        conn = pyodbc.connect(conn_str, autocommit=False)
-        # Se establece autocommit = False para tener control sobre las transacciones manually.
+        # autocommit = False para tener control sobre las transacciones manualmente.
         # Yield suspende temporalmente la ejecución devolviendo la conexión para que el router la use.
-        conn.autocommit = False
+        conn = open_sql_server_conn(company_key)
+        conn.timeout = timeout
         yield conn
     except pyodbc.Error as e:
         logger.error(f"Connection Failed to {database_name}: {e}")
@@ -71,20 +263,151 @@ def get_sql_server_conn(request: Request):
         if 'conn' in locals():
             conn.close()
 
-def fetch_all(conn: pyodbc.Connection, sql: str, params: list = None) -> list[pyodbc.Row]:
+def fetch_all(
+    conn: pyodbc.Connection,
+    sql: str,
+    params: list = None,
+    name: str | None = None,
+    company: str | None = None,
+    prepared: bool = False,
+    cancel=None
+) -> list[pyodbc.Row]:
     """
     Función utilitaria para ejecutar un query de SQL de forma segura parametrizado.
     Recibe la conexión y la query, devuelve la lista de resultados usando .fetchall().
+
+    Cada ejecución queda registrada en `query_stats` (ver query_stats.py) con su
+    nombre lógico, la empresa, el tiempo de execute, el de fetchall y las filas.
+
+    Con `prepared=True` (textos fijos del catálogo) y una conexión del pool, se
+    reutiliza el cursor de ese texto para no volver a preparar la consulta.
+
+    Con `cancel` (un CancelToken, ver cancellation.py) la consulta se cancela si
+    el cliente se desconecta (499). Si se agota el timeout de la conexión, 504.
     """
+    name = name or "adhoc"
+    exec_ms = fetch_ms = 0.0
+    cursor = None
+    reused = False
+    t0 = 0.0
     try:
-        with conn.cursor() as cursor:
-            if params:
-                cursor.execute(sql, params)
-            else:
-                cursor.execute(sql)
-            return cursor.fetchall()
+        if prepared:
+            cursor = sql_pool.prepared_cursor(conn, sql)
+            reused = cursor is not None
+        if cursor is None:
+            cursor = conn.cursor()
+        if cancel is not None:
+            cancel.register(cursor)
+        t0 = time.perf_counter()
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        t1 = time.perf_counter()
+        rows = cursor.fetchall()
+        exec_ms, fetch_ms = (t1 - t0) * 1000, (time.perf_counter() - t1) * 1000
+        query_stats.record(name, company, exec_ms, fetch_ms, len(rows))
+        return rows
     except pyodbc.Error as e:
+        if reused:
+            sql_pool.drop_cursor(conn, sql)
+        elapsed_ms = (time.perf_counter() - t0) * 1000 if t0 else 0.0
+        _raise_query_error(e, conn, name, company, elapsed_ms, exec_ms, fetch_ms, cancel)
+    finally:
+        if cursor is not None:
+            if cancel is not None:
+                cancel.unregister(cursor)
+            if not reused:
+                cursor.close()
+
+def _raise_query_error(
+    e: pyodbc.Error,
+    conn: pyodbc.Connection,
+    name: str,
+    company: str | None,
+    elapsed_ms: float,
+    exec_ms: float,
+    fetch_ms: float,
+    cancel=None
+) -> None:
+    """Registra el error en `query_stats` y lo convierte en 499 (cancelada), 504 (timeout) o 500."""
+    if cancel is not None and cancel.cancelled:
+        query_stats.record(name, company, elapsed_ms, 0.0, 0, error="cancelled")
+        cancel.check()
+    if e.args and e.args[0] == "HYT00":
+        query_stats.record(name, company, elapsed_ms, 0.0, 0, error="timeout")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Database query error: {e}"
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Database query timed out after {conn.timeout} s"
         )
+    query_stats.record(name, company, exec_ms, fetch_ms, 0, error=str(e))
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Database query error: {e}"
+    )
+
+def fetch_batch(
+    conn: pyodbc.Connection,
+    statements: List[Tuple[str, str, list]],
+    company: str | None = None,
+    prepared: bool = False,
+    cancel=None
+) -> List[list]:
+    """
+    Ejecuta varias consultas en un solo lote (un viaje de red a SQL Server) y
+    devuelve las filas de cada una, en orden. `statements` son tuplas
+    (nombre lógico, sql, parámetros); los parámetros se concatenan en el orden
+    de las consultas (SQL Server admite ~2100 por lote).
+
+    Los resultados se leen con `cursor.nextset()`. SET NOCOUNT ON evita los
+    conteos de filas entre resultados. Cada consulta queda en `query_stats` con
+    su nombre: el tiempo de execute de la primera es el de enviar el lote y el
+    de las demás, lo que tardó su `nextset()`.
+
+    Con `prepared=True` se reutiliza el cursor del texto del lote, como en
+    fetch_all: solo para lotes de forma fija (siempre las mismas consultas en el
+    mismo orden), si no cada combinación sería un plan y un cursor más.
+    """
+    sql = "SET NOCOUNT ON;\n" + ";\n".join(text.strip().rstrip(";") for _, text, _ in statements) + ";"
+    params = [p for _, _, statement_params in statements for p in (statement_params or [])]
+    name = statements[0][0]
+    results: List[list] = []
+    exec_ms = fetch_ms = 0.0
+    cursor = None
+    reused = False
+    t0 = 0.0
+    try:
+        if prepared:
+            cursor = sql_pool.prepared_cursor(conn, sql)
+            reused = cursor is not None
+        if cursor is None:
+            cursor = conn.cursor()
+        if cancel is not None:
+            cancel.register(cursor)
+        t0 = time.perf_counter()
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        for i, (name, _, _) in enumerate(statements):
+            t1 = time.perf_counter()
+            if i and not cursor.nextset():
+                raise pyodbc.ProgrammingError("HY010", f"Batch returned {i} result sets, expected {len(statements)}")
+            t2 = time.perf_counter()
+            rows = cursor.fetchall()
+            exec_ms = ((t2 - t0) if not i else (t2 - t1)) * 1000
+            fetch_ms = (time.perf_counter() - t2) * 1000
+            query_stats.record(name, company, exec_ms, fetch_ms, len(rows))
+            results.append(rows)
+        return results
+    except pyodbc.Error as e:
+        if reused:
+            sql_pool.drop_cursor(conn, sql)
+        elapsed_ms = (time.perf_counter() - t0) * 1000 if t0 else 0.0
+        _raise_query_error(e, conn, name, company, elapsed_ms, exec_ms, fetch_ms, cancel)
+    finally:
+        if cursor is not None:
+            if cancel is not None:
+                cancel.unregister(cursor)
+            if not reused:
+                cursor.close()
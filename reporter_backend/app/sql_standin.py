@@ -0,0 +1,332 @@
+# app/sql_standin.py
+"""Sustituto local de SQL Server (SQLite) para benchmarks y pruebas de carga.
+
+Sin un SQL Server con datos reales no se puede medir el camino del reporte.
+Este módulo ofrece una conexión con el mismo contrato que usan
+`sql_server_conn.fetch_all` y el resto del código sobre pyodbc:
+
+- conn.cursor(), conn.timeout, conn.rollback(), conn.close()
+- cursor.execute(sql, params), fetchone/fetchall, messages, cancel()
+- lotes de varias consultas separadas por ';' y nextset() entre sus resultados
+- filas con acceso por atributo y por índice, modificables (row.Vencimiento = ...)
+- errores como pyodbc.Error con el mismo SQLSTATE: HYT00 (timeout), HY008 (cancelada)
+
+El SQL que escribe la app es T-SQL; antes de ejecutarlo se traduce lo poco que
+usa y SQLite no entiende (`dbo.`, ISNULL, DATEADD(day, ...), TOP n, OPTION (...)).
+Las sentencias SET (STATISTICS, SHOWPLAN_XML) no hacen nada.
+
+Se activa por empresa con STANDIN_DB_<EMPRESA>=/ruta/al/archivo.db (ver
+tenants.py). El archivo se genera con:
+
+    python -m benchmarks.synthetic_data --out growers.db --documents 1000000
+"""
+
+import datetime
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import pyodbc
+
+# Columnas calculadas que en SQL Server son date (las de tabla usan el tipo declarado)
+_COMPUTED_DATE_COLUMNS = {"Vencimiento"}
+# Cada cuántas instrucciones de SQLite se revisa el timeout / la cancelación
+_PROGRESS_STEPS = 20000
+
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_converter("DATE", lambda b: datetime.date.fromisoformat(b.decode()))
+
+
+# --- Traducción T-SQL -> SQLite ---
+def _split_args(text: str, start: int) -> Tuple[List[str], int]:
+    """Separa los argumentos de una llamada que abre en `start` (después del paréntesis)."""
+    args, depth, current = [], 0, start
+    for i in range(start, len(text)):
+        ch = text[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            if depth == 0:
+                args.append(text[current:i].strip())
+                return args, i + 1
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(text[current:i].strip())
+            current = i + 1
+    raise ValueError("Unbalanced parentheses in DATEADD")
+
+
+def _rewrite_dateadd(sql: str) -> str:
+    pattern = re.compile(r"\bDATEADD\s*\(", re.IGNORECASE)
+    while True:
+        m = pattern.search(sql)
+        if m is None:
+            return sql
+        (unit, amount, base), end = _split_args(sql, m.end())
+        if unit.lower() not in ("day", "dd", "d"):
+            raise ValueError(f"DATEADD unit not supported by the stand-in: {unit}")
+        sql = sql[:m.start()] + f"date({base}, ({amount}) || ' days')" + sql[end:]
+
+
+@lru_cache(maxsize=256)
+def translate_sql(sql: str) -> str:
+    text = re.sub(r"\bdbo\.", "", sql)
+    text = re.sub(r"\bISNULL\s*\(", "IFNULL(", text, flags=re.IGNORECASE)
+    text = _rewrite_dateadd(text)
+    text = re.sub(r"\bOPTION\s*\([^)]*\)", "", text, flags=re.IGNORECASE)
+    top = re.search(r"\bSELECT\s+TOP\s*\(?\s*(\d+)\s*\)?", text, flags=re.IGNORECASE)
+    if top:
+        text = text[:top.start()] + "SELECT " + text[top.end():]
+        text = text.rstrip().rstrip(";") + f" LIMIT {top.group(1)}"
+    return text
+
+
+# --- Filas tipo pyodbc.Row ---
+def _outside_quotes(sql: str) -> Iterator[Tuple[int, str]]:
+    """(posición, carácter) de lo que está fuera de literales '...'."""
+    quoted = False
+    for i, ch in enumerate(sql):
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted:
+            yield i, ch
+
+
+def split_batch(sql: str) -> List[str]:
+    """Separa un lote T-SQL en sentencias por ';' (fuera de literales)."""
+    statements = []
+    start = 0
+    for i, ch in _outside_quotes(sql):
+        if ch == ";":
+            statements.append(sql[start:i])
+            start = i + 1
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if s.strip()]
+
+
+def _count_placeholders(sql: str) -> int:
+    return sum(1 for _, ch in _outside_quotes(sql) if ch == "?")
+
+
+class _RowBase:
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(getattr(self, name) for name in self.__slots__[index])
+        return getattr(self, self.__slots__[index])
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return repr(tuple(self))
+
+
+def _to_date(value):
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+@lru_cache(maxsize=256)
+def _row_class(names: Tuple[str, ...]) -> type:
+    """Clase con __slots__ y un __init__ generado (como namedtuple), pero modificable."""
+    args = ", ".join(f"_{i}" for i in range(len(names)))
+    body = "".join(
+        f"    self.{name} = _to_date(_{i})\n" if name in _COMPUTED_DATE_COLUMNS else f"    self.{name} = _{i}\n"
+        for i, name in enumerate(names)
+    ) or "    pass\n"
+    namespace = {"_to_date": _to_date}
+    exec(f"def __init__(self, {args}):\n{body}", namespace)
+    return type("Row", (_RowBase,), {"__slots__": names, "__init__": namespace["__init__"]})
+
+
+# --- Cursor y conexión ---
+class StandinCursor:
+    def __init__(self, conn: "StandinConnection"):
+        self._conn = conn
+        self._cursor = conn._db.cursor()
+        self._row_class = None
+        self._pending: Optional[list] = None
+        # Resultados siguientes de un lote (ver nextset)
+        self._sets: List[tuple] = []
+        self.messages: List[Tuple[str, str]] = []
+        self.description = None
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self.messages = []
+        self._pending = None
+        self._sets = []
+        statements = split_batch(sql)
+        if len(statements) > 1:
+            return self._execute_batch(statements, list(params))
+        statement = sql.strip()
+        if statement.upper().startswith("SET "):
+            upper = statement.upper()
+            if "SHOWPLAN_XML" in upper:
+                self._conn._showplan = upper.rstrip(";").endswith("ON")
+            self.description = None
+            return self
+        if self._conn._showplan:
+            # No hay plan XML; se devuelve una fila vacía como lo haría SHOWPLAN_XML
+            self._row_class = _row_class(("Microsoft_SQLServer_XML_Showplan",))
+            self._pending = [self._row_class(None)]
+            self.description = (("Microsoft_SQLServer_XML_Showplan", str, None, None, None, None, True),)
+            return self
+
+        self._conn._begin()
+        try:
+            self._cursor.execute(translate_sql(sql), tuple(params))
+        except sqlite3.Error as e:
+            raise self._conn._error(e)
+        self.description = self._cursor.description
+        self.rowcount = self._cursor.rowcount
+        if self.description:
+            self._row_class = _row_class(tuple(d[0] for d in self.description))
+        return self
+
+    def _execute_batch(self, statements: List[str], params: list):
+        """Lote de varias consultas: se ejecutan todas y nextset() avanza entre sus resultados."""
+        self.description = None
+        sets = []
+        for statement in statements:
+            n = _count_placeholders(statement)
+            statement_params, params = params[:n], params[n:]
+            # SET (NOCOUNT, STATISTICS...) no produce resultados
+            if statement.upper().startswith("SET "):
+                continue
+            self._conn._begin()
+            try:
+                self._cursor.execute(translate_sql(statement), tuple(statement_params))
+                description = self._cursor.description
+                row_class = _row_class(tuple(d[0] for d in description)) if description else None
+                rows = [row_class(*row) for row in self._cursor.fetchall()] if description else []
+            except sqlite3.Error as e:
+                raise self._conn._error(e)
+            sets.append((description, row_class, rows))
+        self._sets = sets
+        self.nextset()
+        return self
+
+    def _wrap(self, rows: list) -> list:
+        cls = self._row_class
+        return [cls(*row) for row in rows]
+
+    def fetchall(self) -> list:
+        if self._pending is not None:
+            rows, self._pending = self._pending, []
+            return rows
+        if self.description is None:
+            return []
+        try:
+            return self._wrap(self._cursor.fetchall())
+        except sqlite3.Error as e:
+            raise self._conn._error(e)
+
+    def fetchmany(self, size: int = 1) -> list:
+        if self._pending is not None:
+            rows, self._pending = self._pending[:size], self._pending[size:]
+            return rows
+        if self.description is None:
+            return []
+        try:
+            return self._wrap(self._cursor.fetchmany(size))
+        except sqlite3.Error as e:
+            raise self._conn._error(e)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def nextset(self) -> bool:
+        if not self._sets:
+            return False
+        self.description, self._row_class, self._pending = self._sets.pop(0)
+        return True
+
+    def cancel(self) -> None:
+        self._conn._cancel()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class StandinConnection:
+    """Conexión de solo lectura a un archivo generado por benchmarks/synthetic_data.py."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(
+            Path(path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        self._db.execute("PRAGMA cache_size = -131072")
+        self._db.execute("PRAGMA mmap_size = 1073741824")
+        self._db.set_progress_handler(self._progress, _PROGRESS_STEPS)
+        self.autocommit = False
+        self.timeout = 0
+        self._deadline: Optional[float] = None
+        self._cancelled = False
+        self._timed_out = False
+        self._showplan = False
+        self._lock = threading.Lock()
+
+    def cursor(self) -> StandinCursor:
+        return StandinCursor(self)
+
+    def _begin(self) -> None:
+        with self._lock:
+            self._cancelled = False
+            self._timed_out = False
+            self._deadline = time.monotonic() + self.timeout if self.timeout else None
+
+    def _progress(self) -> int:
+        if self._cancelled:
+            return 1
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self._timed_out = True
+            return 1
+        return 0
+
+    def _cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+        self._db.interrupt()
+
+    def _error(self, e: sqlite3.Error) -> pyodbc.Error:
+        if self._timed_out:
+            return pyodbc.OperationalError("HYT00", "[HYT00] Query timeout expired (stand-in)")
+        if self._cancelled:
+            return pyodbc.OperationalError("HY008", "[HY008] Operation canceled (stand-in)")
+        return pyodbc.Error("42000", f"[42000] {e} (stand-in)")
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def connect(path: str) -> StandinConnection:
+    try:
+        return StandinConnection(path)
+    except sqlite3.Error as e:
+        raise pyodbc.Error("08001", f"[08001] Cannot open stand-in database '{path}': {e}")
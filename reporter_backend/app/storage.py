@@ -0,0 +1,161 @@
+# app/storage.py
+"""Ajustes de SQLite para la base de usuarios (reporter.db).
+
+Con la configuración por defecto (journal DELETE, sin busy timeout) cada login
+escribía `last_login` y bloqueaba la base completa: los logins concurrentes se
+serializaban y las lecturas esperaban a las escrituras. Aquí:
+
+- `create_sqlite_engine` aplica PRAGMAs en cada conexión nueva:
+  journal_mode=WAL (los lectores no esperan al escritor), synchronous=NORMAL
+  (seguro con WAL, sin fsync en cada commit), cache_size y busy_timeout.
+  Usa un QueuePool para reutilizar conexiones (y su caché de páginas).
+- `run_with_retry` reintenta con espera creciente si aun así la base está
+  bloqueada ("database is locked").
+- `LastLoginBuffer` acumula los `last_login` en memoria y los escribe en un solo
+  UPDATE por lote cada LAST_LOGIN_FLUSH_SECONDS (write-behind).
+
+Variables de entorno: SQLITE_TUNING (true), SQLITE_SYNCHRONOUS (NORMAL),
+SQLITE_CACHE_SIZE_KB (16384), SQLITE_BUSY_TIMEOUT_MS (5000), SQLITE_POOL_SIZE (5),
+SQLITE_MAX_OVERFLOW (10), LAST_LOGIN_FLUSH_SECONDS (5).
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+log = logging.getLogger(__name__)
+
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() in ("1", "true", "yes")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "10"))
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+T = TypeVar("T")
+
+
+def create_sqlite_engine(url: str, tuned: bool = SQLITE_TUNING) -> Engine:
+    """Crea el engine de SQLite; con `tuned=False` se comporta como antes (sin PRAGMAs)."""
+    if not tuned:
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    if SQLITE_SYNCHRONOUS not in _SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS '{SQLITE_SYNCHRONOUS}'. Allowed: {', '.join(_SYNCHRONOUS_MODES)}")
+
+    engine = create_engine(
+        url,
+        # timeout = espera del driver sqlite3 ante un bloqueo (segundos)
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=QueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        # Valor negativo = tamaño en KiB en lugar de número de páginas
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine
+
+
+def _is_locked(exc: OperationalError) -> bool:
+    message = str(exc.orig).lower() if exc.orig is not None else str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def run_with_retry(operation: Callable[[], T], attempts: int = 5, base_delay: float = 0.05) -> T:
+    """Ejecuta `operation` reintentando si SQLite responde 'database is locked'."""
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except OperationalError as e:
+            if not _is_locked(e) or attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt))
+    raise RuntimeError("unreachable")
+
+
+class LastLoginBuffer:
+    """
+    Buffer write-behind de `users.last_login`. `record` solo guarda en memoria;
+    `flush` escribe todos los pendientes en una transacción. Si se registra dos
+    veces el mismo usuario antes del flush, gana el último valor.
+    """
+
+    def __init__(self, engine: Engine, interval: float = LAST_LOGIN_FLUSH_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self._pending: Dict[int, datetime.datetime] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, when: datetime.datetime) -> None:
+        with self._lock:
+            self._pending[user_id] = when
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        params = [{"id": user_id, "last_login": when} for user_id, when in batch.items()]
+
+        def _write():
+            with self.engine.begin() as conn:
+                conn.execute(text("UPDATE users SET last_login = :last_login WHERE id = :id"), params)
+
+        try:
+            run_with_retry(_write)
+        except Exception:
+            # Se devuelven al buffer (sin pisar valores más nuevos) para el siguiente intento
+            with self._lock:
+                for user_id, when in batch.items():
+                    self._pending.setdefault(user_id, when)
+            raise
+        return len(batch)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                log.warning(f"[STORAGE] last_login flush failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="last-login-flush")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Lo pendiente se escribe antes de apagar
+        await asyncio.to_thread(self.flush)
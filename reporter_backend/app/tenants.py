@@ -17,22 +17,59 @@ from typing import Dict, Any, List
 #   DB_GROWERS_UNION=GROWERS_UNION_2025
 #   DB_SOFRESCO=SOFRESCO_GMBH_25
 # Si no se define, Growers usa DB_DATABASE (compatibilidad con tu .env actual).
+#
+# "aging_scheme" es el esquema de antigüedad por defecto de la empresa
+# (ver app/reports/aging.py), sobreescribible con AGING_SCHEME_<EMPRESA>.
+#
+# "local_currency" es la moneda en la que está expresado el tipo de cambio (TC)
+# de cada documento: saldo * TC = saldo en moneda local. Sobreescribible con
+# LOCAL_CURRENCY_<EMPRESA>.
+#
+# "query_timeout" son los segundos que puede correr una consulta antes de que
+# SQL Server la corte (504). Por defecto 0 = sin límite, como antes: cada
+# instalación lo activa con DEFAULT_QUERY_TIMEOUT (todas las empresas) o
+# QUERY_TIMEOUT_<EMPRESA>, ej. DEFAULT_QUERY_TIMEOUT=120; por ruta, ver
+# QUERY_TIMEOUT_ROUTES en sql_server_conn.py.
+#
+# "standin_db" (STANDIN_DB_<EMPRESA>=/ruta/archivo.db) conecta la empresa a un
+# archivo SQLite con datos sintéticos en lugar de SQL Server (ver sql_standin.py).
+# Vacío = SQL Server.
+DEFAULT_AGING_SCHEME = os.getenv("DEFAULT_AGING_SCHEME", "standard")
+DEFAULT_LOCAL_CURRENCY = os.getenv("DEFAULT_LOCAL_CURRENCY", "MXN")
+DEFAULT_QUERY_TIMEOUT = os.getenv("DEFAULT_QUERY_TIMEOUT", "0")
+
 TENANTS: Dict[str, Dict[str, Any]] = {
     "growers_union": {
         "name": "Growers Union",
         "database": os.getenv("DB_GROWERS_UNION", os.getenv("DB_DATABASE", "GROWERS_UNION_2025")),
+        "aging_scheme": os.getenv("AGING_SCHEME_GROWERS_UNION", DEFAULT_AGING_SCHEME),
+        "local_currency": os.getenv("LOCAL_CURRENCY_GROWERS_UNION", DEFAULT_LOCAL_CURRENCY),
+        "query_timeout": int(os.getenv("QUERY_TIMEOUT_GROWERS_UNION", DEFAULT_QUERY_TIMEOUT)),
+        "standin_db": os.getenv("STANDIN_DB_GROWERS_UNION", ""),
     },
     "sofresco": {
         "name": "Sofresco GmbH",
         "database": os.getenv("DB_SOFRESCO", "SOFRESCO_GMBH_25"),
+        "aging_scheme": os.getenv("AGING_SCHEME_SOFRESCO", DEFAULT_AGING_SCHEME),
+        "local_currency": os.getenv("LOCAL_CURRENCY_SOFRESCO", DEFAULT_LOCAL_CURRENCY),
+        "query_timeout": int(os.getenv("QUERY_TIMEOUT_SOFRESCO", DEFAULT_QUERY_TIMEOUT)),
+        "standin_db": os.getenv("STANDIN_DB_SOFRESCO", ""),
     },
     "produce_lovers": {
         "name": "Produce Lovers",
         "database": os.getenv("DB_PRODUCE_LOVERS", "PRODUCE_LOVERS_2025"),
+        "aging_scheme": os.getenv("AGING_SCHEME_PRODUCE_LOVERS", DEFAULT_AGING_SCHEME),
+        "local_currency": os.getenv("LOCAL_CURRENCY_PRODUCE_LOVERS", DEFAULT_LOCAL_CURRENCY),
+        "query_timeout": int(os.getenv("QUERY_TIMEOUT_PRODUCE_LOVERS", DEFAULT_QUERY_TIMEOUT)),
+        "standin_db": os.getenv("STANDIN_DB_PRODUCE_LOVERS", ""),
     },
     "licencias": {
         "name": "Licencias y Servicios",
         "database": os.getenv("DB_LICENCIAS", "LICENCIAS_Y_SERVICIOS_PRODUCE"),
+        "aging_scheme": os.getenv("AGING_SCHEME_LICENCIAS", DEFAULT_AGING_SCHEME),
+        "local_currency": os.getenv("LOCAL_CURRENCY_LICENCIAS", DEFAULT_LOCAL_CURRENCY),
+        "query_timeout": int(os.getenv("QUERY_TIMEOUT_LICENCIAS", DEFAULT_QUERY_TIMEOUT)),
+        "standin_db": os.getenv("STANDIN_DB_LICENCIAS", ""),
     },
 }
 
@@ -46,3 +83,6 @@ def get_company_or_default(company_key: str | None) -> str:
 
 def list_companies() -> List[dict]:
     return [{"key": k, "name": v.get("name", k)} for k, v in TENANTS.items()]
+
+def get_tenant_setting(company_key: str, name: str, default: Any = None) -> Any:
+    return TENANTS.get(company_key, {}).get(name, default)
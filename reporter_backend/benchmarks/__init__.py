@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Scripts de medición. Se ejecutan desde reporter_backend/, ej.:
+#   python -m benchmarks.login_throughput
@@ -0,0 +1,199 @@
+# benchmarks/api_log.py
+"""Lectura de los logs de la API (api_debug.log y sus rotaciones diarias).
+
+El middleware `log_requests` (app/main.py) escribe una línea al entrar y otra
+al salir de cada petición, sin duración ni identificador:
+
+    2026-03-10 08:45:32,466 [INFO] app.main: [API] REQ: POST /api/reports/receivables-preview
+    2026-03-10 08:45:32,466 [INFO] app.sql_server_conn: Connection Request - X-Company Header: 'produce_lovers'
+    2026-03-10 08:45:33,326 [INFO] app.main: [API] RES: POST /api/reports/receivables-preview -> 200
+
+Aquí se leen los archivos en orden cronológico línea por línea (también
+.gz) y se emparejan REQ con RES/EXC por método + ruta, en orden de llegada
+(FIFO), aunque haya otras peticiones intercaladas. La empresa se toma de la
+línea "X-Company Header" que escribe get_company_key: se asigna a la petición
+pendiente más antigua, de las rutas que resuelven empresa, que todavía no la
+tiene.
+
+Todo es en streaming: la memoria depende de cuántas peticiones hay abiertas a
+la vez, no del tamaño de los logs. Las que nunca cierran (reinicio del
+servidor) se descartan después de `max_open_seconds`.
+"""
+
+import datetime
+import glob
+import gzip
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) \[\w+\] [\w.]+: (.*)$")
+_REQ = re.compile(r"^\[API\] REQ: (\w+) (\S+)")
+_RES = re.compile(r"^\[API\] RES: (\w+) (\S+) -> (\d{3})")
+_EXC = re.compile(r"^\[API\] EXC: (\w+) (\S+) ->")
+_COMPANY = re.compile(r"X-Company Header: '([^']*)'")
+_ROTATED = re.compile(r"\.(\d{4}-\d\d-\d\d)(?:_\d\d-\d\d(?:-\d\d)?)?(?:\.gz)?$")
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# Código que se registra para las peticiones que terminaron en EXC (el middleware responde 500)
+EXCEPTION_STATUS = 500
+
+
+@dataclass(slots=True)
+class LoggedRequest:
+    start: datetime.datetime
+    method: str
+    path: str
+    end: Optional[datetime.datetime] = None
+    status: Optional[int] = None
+    company: Optional[str] = None
+
+    @property
+    def route(self) -> str:
+        return route_of(self.method, self.path)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start).total_seconds() * 1000
+
+
+def resolves_company(path: str) -> bool:
+    """Rutas que pasan por get_company_key (y escriben la línea X-Company)."""
+    if path.startswith("/api/reports/diagnostics"):
+        return path == "/api/reports/diagnostics/receivables"
+    return path.startswith("/api/reports/")
+
+
+def route_of(method: str, path: str) -> str:
+    """Ruta para agrupar: los segmentos numéricos (ids de usuario) se vuelven {id}."""
+    return f"{method} {_NUMERIC_SEGMENT.sub('/{id}', path)}"
+
+
+def _rotation_key(path: str):
+    # api_debug.log (el archivo activo) es el más reciente; las rotaciones llevan la fecha
+    m = _ROTATED.search(os.path.basename(path))
+    return (0, m.group(0)) if m else (1, "")
+
+
+def log_files(paths: Iterable[str]) -> List[str]:
+    """Expande directorios y globs y ordena los archivos del más viejo al más nuevo."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "api_debug.log*")))
+        else:
+            files.extend(glob.glob(path) or [path])
+    return sorted(set(files), key=lambda f: (os.path.dirname(f), _rotation_key(f)))
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_lines(files: Iterable[str]) -> Iterator[tuple]:
+    """(timestamp, mensaje) de cada línea con formato de logging; el resto (tracebacks) se ignora."""
+    last_text, last_second = None, None
+    for path in files:
+        with _open(path) as f:
+            for line in f:
+                m = _LINE.match(line)
+                if m is None:
+                    continue
+                # Muchas líneas caen en el mismo segundo; strptime es lo más caro de la lectura
+                text = m.group(1)
+                if text != last_text:
+                    last_text, last_second = text, datetime.datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+                yield last_second.replace(microsecond=int(m.group(2)) * 1000), m.group(3).rstrip()
+
+
+class RequestPairer:
+    """Empareja líneas REQ/RES/EXC y asigna la empresa; entrega las peticiones al cerrarse."""
+
+    def __init__(self, max_open_seconds: float = 900):
+        self.max_open = datetime.timedelta(seconds=max_open_seconds)
+        self._open = {}               # (método, ruta) -> deque de peticiones abiertas
+        self._awaiting_company = deque()
+        self.open_requests = 0
+        self.unmatched_responses = 0
+        self.abandoned = 0
+
+    def feed(self, ts: datetime.datetime, message: str) -> Optional[LoggedRequest]:
+        if not message.startswith("[API]"):
+            m = _COMPANY.search(message)
+            if m is not None:
+                self._assign_company(m.group(1))
+            return None
+        m = _REQ.match(message)
+        if m is not None:
+            req = LoggedRequest(ts, m.group(1), m.group(2))
+            self._open.setdefault((req.method, req.path), deque()).append(req)
+            self.open_requests += 1
+            if resolves_company(req.path):
+                self._awaiting_company.append(req)
+            return None
+        m = _RES.match(message)
+        if m is not None:
+            return self._close(ts, m.group(1), m.group(2), int(m.group(3)))
+        m = _EXC.match(message)
+        if m is not None:
+            return self._close(ts, m.group(1), m.group(2), EXCEPTION_STATUS)
+        return None
+
+    def _assign_company(self, header: str) -> None:
+        while self._awaiting_company:
+            req = self._awaiting_company.popleft()
+            if req.end is None:
+                # 'None' = la petición no mandó el header (se usó la empresa por defecto)
+                req.company = header if header != "None" else "(default)"
+                return
+
+    def _close(self, ts, method: str, path: str, status: int) -> Optional[LoggedRequest]:
+        queue = self._open.get((method, path))
+        if not queue:
+            self.unmatched_responses += 1
+            return None
+        req = queue.popleft()
+        if not queue:
+            del self._open[(method, path)]
+        self.open_requests -= 1
+        req.end, req.status = ts, status
+        return req
+
+    def expire(self, now: datetime.datetime) -> int:
+        """Descarta las peticiones abiertas hace más de max_open_seconds."""
+        limit = now - self.max_open
+        dropped = 0
+        for key in list(self._open):
+            queue = self._open[key]
+            while queue and queue[0].start < limit:
+                queue.popleft().end = limit
+                dropped += 1
+            if not queue:
+                del self._open[key]
+        # Las cerradas o descartadas ya no esperan empresa
+        while self._awaiting_company and self._awaiting_company[0].end is not None:
+            self._awaiting_company.popleft()
+        if len(self._awaiting_company) > 10_000:
+            self._awaiting_company = deque(r for r in self._awaiting_company if r.end is None)
+        self.abandoned += dropped
+        self.open_requests -= dropped
+        return dropped
+
+
+def iter_requests(files: Iterable[str], max_open_seconds: float = 900) -> Iterator[LoggedRequest]:
+    """Peticiones completas (con status) en orden de cierre."""
+    pairer = RequestPairer(max_open_seconds)
+    last_expire = None
+    for ts, message in read_lines(files):
+        req = pairer.feed(ts, message)
+        if req is not None:
+            yield req
+        if last_expire is None or (ts - last_expire).total_seconds() > 60:
+            pairer.expire(ts)
+            last_expire = ts
@@ -0,0 +1,119 @@
+# benchmarks/import_time.py
+"""Tiempo de arranque de un worker (importación de app.main).
+
+Usa `python -X importtime` en un proceso nuevo y reporta el tiempo acumulado de
+app.main y de los módulos más pesados. Compara:
+
+  - "lazy":  import app.main (los generadores se cargan en la primera descarga)
+  - "eager": import app.main + app.reports.report_builder (equivale a como
+             arrancaba antes, con openpyxl y reportlab al cargar receivables)
+
+Con --baseline-ref se mide además el árbol de otra revisión de git (ej. la
+anterior a este cambio) usando un `git worktree` temporal.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.import_time --runs 5
+    python -m benchmarks.import_time --baseline-ref HEAD~1
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Paquetes que se reportan por separado
+WATCH = ("app.main", "fastapi", "sqlalchemy", "pydantic", "openpyxl", "reportlab", "pyodbc", "passlib", "jose")
+
+
+def measure(code: str, cwd: str) -> Tuple[float, Dict[str, float]]:
+    """Devuelve (ms totales, {paquete: ms}); app.main se reporta acumulado."""
+    env = dict(os.environ)
+    env.setdefault("LOG_FILE_PATH", os.path.join(tempfile.gettempdir(), "importtime_api.log"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    cumulative: Dict[str, float] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        self_us, cum_us, name = int(m.group(1)), int(m.group(2)), m.group(4)
+        # Solo el nivel superior de cada módulo cuenta en el total
+        if len(m.group(3)) <= 1:
+            total_us += cum_us
+        # Por paquete se suma el tiempo propio de todos sus submódulos
+        top = "app.main" if name == "app.main" else name.split(".")[0]
+        if top in WATCH:
+            cumulative[top] = cumulative.get(top, 0.0) + (cum_us if top == "app.main" else self_us) / 1000
+    return total_us / 1000, cumulative
+
+
+def run_case(label: str, code: str, cwd: str, runs: int) -> dict:
+    totals: List[float] = []
+    packages: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        total, cum = measure(code, cwd)
+        totals.append(total)
+        for k, v in cum.items():
+            packages.setdefault(k, []).append(v)
+    return {
+        "label": label,
+        "total_ms": statistics.median(totals),
+        "packages": {k: statistics.median(v) for k, v in packages.items()},
+    }
+
+
+def print_results(results: List[dict]) -> None:
+    names = [w for w in WATCH if any(w in r["packages"] for r in results)]
+    print(f"{'case':<22}{'total ms':>10}  " + "  ".join(f"{n:>10}" for n in names))
+    for r in results:
+        cols = "  ".join(
+            f"{r['packages'][n]:>10.1f}" if n in r["packages"] else f"{'-':>10}" for n in names
+        )
+        print(f"{r['label']:<22}{r['total_ms']:>10.1f}  {cols}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="repeticiones por caso (se usa la mediana)")
+    parser.add_argument("--baseline-ref", help="revisión de git a comparar (ej. HEAD~1)")
+    args = parser.parse_args()
+
+    results = [
+        run_case("lazy", "import app.main", BACKEND_DIR, args.runs),
+        run_case("eager", "import app.main, app.reports.report_builder", BACKEND_DIR, args.runs),
+    ]
+
+    if args.baseline_ref:
+        repo_root = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        worktree = tempfile.mkdtemp(prefix="importtime_")
+        try:
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline_ref],
+                           cwd=repo_root, check=True, capture_output=True)
+            baseline_dir = os.path.join(worktree, os.path.relpath(BACKEND_DIR, repo_root))
+            results.append(run_case(f"baseline {args.baseline_ref}", "import app.main", baseline_dir, args.runs))
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=repo_root, capture_output=True)
+            shutil.rmtree(worktree, ignore_errors=True)
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
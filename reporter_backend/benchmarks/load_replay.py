@@ -0,0 +1,266 @@
+# benchmarks/load_replay.py
+"""Prueba de carga que reproduce el tráfico real registrado en api_debug.log.
+
+Lee los logs (benchmarks/api_log.py) y arma la traza de peticiones: método,
+ruta, empresa (X-Company) y el momento en que llegó cada una. Después la
+reproduce contra la app corriendo, respetando los intervalos entre peticiones
+divididos entre --speed. Así los logins en ráfaga, el par preview +
+lista de clientes al cambiar de empresa y las descargas seguidas llegan con la
+misma forma que en producción.
+
+Los logs no guardan cuerpos, así que se arman así:
+
+  POST /api/token                 --username / --password (form)
+  POST /api/reports/receivables-* ReportFilters con --as-of (JSON)
+  GET ...                         sin cuerpo
+
+Las escrituras (usuarios, /register, scheduler/run, refresh, diagnostics) se
+omiten salvo --include-writes. Todas las peticiones llevan el token de un
+login inicial con las mismas credenciales.
+
+Pensado para la app sobre el sustituto local (app/sql_standin.py):
+
+    STANDIN_DB_GROWERS_UNION=/tmp/growers.db ... uvicorn app.main:app --workers 4
+
+Al final muestra por ruta: peticiones, throughput, p50/p95/p99 de latencia,
+errores (5xx o sin respuesta), 4xx y cuántas respuestas no coinciden con el
+status registrado. "max lag" es cuánto se atrasó el envío respecto a la
+traza: si crece, el cliente (--workers) es el cuello de botella, no la app.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.load_replay . --dry-run
+    python -m benchmarks.load_replay api_debug.log.2026-03-1* --speed 20 --max-gap 2 --username admin --password ...
+    python -m benchmarks.load_replay logs/ --since 2026-03-10T08:00 --until 2026-03-10T12:00 --json replay.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.api_log import log_files, iter_requests
+
+_REPORT_POSTS = (
+    "/api/reports/receivables-preview",
+    "/api/reports/receivables-kpis",
+    "/api/reports/receivables-top-customers",
+    "/api/reports/receivables-download",
+)
+_READ_ONLY_POSTS = ("/api/token",) + _REPORT_POSTS
+
+
+def is_write(method: str, path: str) -> bool:
+    if method == "GET":
+        return False
+    if method == "POST":
+        return not path.startswith(_READ_ONLY_POSTS)
+    return True
+
+
+def load_trace(paths, since=None, until=None, limit=None, include_writes=False) -> tuple:
+    """Peticiones de los logs en orden de llegada, y cuántas se omitieron por ser escrituras."""
+    trace, skipped = [], 0
+    for req in iter_requests(log_files(paths)):
+        if since and req.start < since or until and req.start >= until:
+            continue
+        if not include_writes and is_write(req.method, req.path):
+            skipped += 1
+            continue
+        trace.append(req)
+    trace.sort(key=lambda r: r.start)
+    return (trace[:limit] if limit else trace), skipped
+
+
+def schedule(trace, speed: float, max_gap: float) -> list:
+    """Segundos desde el inicio en que se envía cada petición (intervalos / speed, topados a max_gap)."""
+    offsets, at = [], 0.0
+    for prev, req in zip([None] + trace[:-1], trace):
+        if prev is not None:
+            gap = (req.start - prev.start).total_seconds() / speed
+            at += min(gap, max_gap) if max_gap else gap
+        offsets.append(at)
+    return offsets
+
+
+class Replayer:
+    def __init__(self, base_url: str, username: str, password: str, as_of: datetime.date, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.as_of = as_of
+        self.timeout = timeout
+        self.token = None
+
+    def login(self) -> None:
+        status, body = self._send("POST", "/api/token", None)
+        if status != 200:
+            raise SystemExit(f"login failed ({status}): {body[:200]!r}")
+        self.token = json.loads(body)["access_token"]
+
+    def _body(self, method: str, path: str):
+        if method != "POST":
+            return None, None
+        if path == "/api/token":
+            form = urllib.parse.urlencode({"username": self.username, "password": self.password})
+            return form.encode(), "application/x-www-form-urlencoded"
+        if path.startswith(_REPORT_POSTS):
+            filters = {"as_of": self.as_of.isoformat(), "filter_mode": "to_date"}
+            return json.dumps(filters).encode(), "application/json"
+        return b"{}", "application/json"
+
+    def _send(self, method: str, path: str, company) -> tuple:
+        data, content_type = self._body(method, path)
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        if self.token and path != "/api/token":
+            request.add_header("Authorization", f"Bearer {self.token}")
+        if company and company != "(default)":
+            request.add_header("X-Company", company)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def send(self, req) -> dict:
+        t0 = time.perf_counter()
+        try:
+            status, body = self._send(req.method, req.path, req.company)
+            size, error = len(body), None
+        except (urllib.error.URLError, OSError) as e:
+            status, size, error = 0, 0, str(getattr(e, "reason", e))
+        return {"status": status, "ms": (time.perf_counter() - t0) * 1000, "bytes": size, "error": error}
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[int(q) - 1]
+
+
+def replay(trace, offsets, replayer: Replayer, workers: int) -> tuple:
+    results = [None] * len(trace)
+    lags = [0.0] * len(trace)
+
+    def run(i):
+        # Atraso real: incluye la espera por un worker libre
+        lags[i] = max(0.0, time.perf_counter() - start - offsets[i])
+        results[i] = replayer.send(trace[i])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, offset in enumerate(offsets):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, i)
+    return results, time.perf_counter() - start, max(lags, default=0.0)
+
+
+def summarize(trace, results, elapsed: float) -> dict:
+    by_route = defaultdict(list)
+    for req, res in zip(trace, results):
+        by_route[req.route].append((req, res))
+
+    routes = {}
+    for route, pairs in sorted(by_route.items(), key=lambda kv: -len(kv[1])):
+        latencies = sorted(res["ms"] for _, res in pairs)
+        statuses = Counter(res["status"] for _, res in pairs)
+        routes[route] = {
+            "requests": len(pairs),
+            "rps": round(len(pairs) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p95_ms": round(_percentile(latencies, 95), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1),
+            "errors": sum(n for s, n in statuses.items() if s == 0 or s >= 500),
+            "client_errors": sum(n for s, n in statuses.items() if 400 <= s < 500),
+            "status_mismatch": sum(1 for req, res in pairs if res["status"] != req.status),
+            "statuses": {str(s): n for s, n in sorted(statuses.items())},
+        }
+    all_latencies = sorted(res["ms"] for res in results)
+    total_errors = sum(r["errors"] for r in routes.values())
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(all_latencies, 50), 1),
+        "p95_ms": round(_percentile(all_latencies, 95), 1),
+        "p99_ms": round(_percentile(all_latencies, 99), 1),
+        "error_rate": round(total_errors / len(results), 4) if results else 0.0,
+        "routes": routes,
+    }
+
+
+def _print_trace(trace, offsets, skipped: int) -> None:
+    span = (trace[-1].start - trace[0].start) if trace else datetime.timedelta(0)
+    print(f"trace: {len(trace)} requests over {span} (replay {offsets[-1] if offsets else 0:.1f} s), {skipped} writes skipped")
+    routes = Counter(r.route for r in trace)
+    companies = Counter(r.company for r in trace if r.company)
+    for route, n in routes.most_common():
+        print(f"  {n:>7}  {route}")
+    print("companies: " + ", ".join(f"{c}={n}" for c, n in companies.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="archivos, globs o directorios con api_debug.log*")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=10.0, help="factor de aceleración de la traza")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="tope en segundos entre peticiones (0 = sin tope)")
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--include-writes", action="store_true")
+    parser.add_argument("--username", default=os.getenv("REPLAY_USERNAME"))
+    parser.add_argument("--password", default=os.getenv("REPLAY_PASSWORD"))
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--workers", type=int, default=32, help="peticiones simultáneas máximas del cliente")
+    parser.add_argument("--timeout", type=float, default=330.0)
+    parser.add_argument("--dry-run", action="store_true", help="solo muestra la traza")
+    parser.add_argument("--json", help="guarda el resumen en este archivo")
+    args = parser.parse_args()
+
+    trace, skipped = load_trace(args.logs, args.since, args.until, args.limit, args.include_writes)
+    offsets = schedule(trace, args.speed, args.max_gap)
+    _print_trace(trace, offsets, skipped)
+    if args.dry_run or not trace:
+        return
+    if not args.username or not args.password:
+        parser.error("--username/--password (o REPLAY_USERNAME/REPLAY_PASSWORD) son necesarios")
+
+    replayer = Replayer(args.base_url, args.username, args.password, args.as_of, args.timeout)
+    replayer.login()
+    results, elapsed, max_lag = replay(trace, offsets, replayer, args.workers)
+    summary = summarize(trace, results, elapsed)
+    summary["max_lag_s"] = round(max_lag, 3)
+
+    print(f"\n{'route':<52} {'n':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'4xx':>5} {'diff':>5}")
+    for route, r in summary["routes"].items():
+        print(
+            f"{route:<52} {r['requests']:>6} {r['rps']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+            f"{r['errors']:>5} {r['client_errors']:>5} {r['status_mismatch']:>5}"
+        )
+    print(
+        f"\ntotal {summary['requests']} requests in {summary['elapsed_s']} s = {summary['rps']} req/s  "
+        f"p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  p99 {summary['p99_ms']} ms  "
+        f"error rate {summary['error_rate']:.2%}  max lag {summary['max_lag_s']} s"
+    )
+    if args.json:
+        summary["args"] = {k: str(v) for k, v in vars(args).items() if k != "password"}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/log_latency.py
+"""Latencias, concurrencia y mezcla de empresas a partir de los logs de la API.
+
+El middleware no escribe duraciones, pero cada petición deja una línea REQ y
+una RES con su hora (ver benchmarks/api_log.py). Este análisis recorre los
+logs rotados (30 días de TimedRotatingFileHandler, también .gz) una sola vez,
+en streaming, y obtiene:
+
+  - por ruta: peticiones, p50/p90/p95/p99/máx, status y % de errores
+  - por empresa (X-Company): peticiones, tiempo total y p50/p95 de las rutas de reportes
+  - por hora del día: peticiones, concurrencia media y máxima
+  - las horas (fecha + hora) con más concurrencia
+
+La memoria es constante respecto al tamaño de los logs: las latencias van a
+histogramas de cubetas logarítmicas (cada cubeta ~5% más ancha que la
+anterior, así que los percentiles tienen ese error como máximo) y solo se
+guardan las peticiones abiertas en un momento dado.
+
+La resolución es de milisegundos (la del formato de logging); la latencia es
+la del middleware, sin la red ni la cola de uvicorn.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.log_latency .
+    python -m benchmarks.log_latency /var/log/reporter/ --since 2026-03-01 --json latency.json
+    python -m benchmarks.log_latency "logs/api_debug.log.2026-03-*.gz" --top 20
+"""
+
+import argparse
+import datetime
+import json
+import math
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.api_log import RequestPairer, log_files, read_lines, resolves_company
+
+# Cubetas de 1.05x desde 1 ms hasta ~30 min
+_RATIO = 1.05
+_BUCKETS = int(math.log(30 * 60 * 1000) / math.log(_RATIO)) + 2
+
+
+class Histogram:
+    """Histograma de latencias en cubetas logarítmicas de tamaño fijo."""
+
+    __slots__ = ("counts", "total", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        index = 0 if ms < 1 else min(_BUCKETS - 1, int(math.log(ms) / math.log(_RATIO)) + 1)
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Límite superior de la cubeta que contiene el percentil q."""
+        if not self.total:
+            return 0.0
+        target = math.ceil(self.total * q / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.max_ms, _RATIO ** index)
+        return self.max_ms
+
+
+class RouteStats:
+    __slots__ = ("latency", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = Counter()
+
+    def summary(self) -> dict:
+        h = self.latency
+        errors = sum(n for s, n in self.statuses.items() if s >= 500)
+        return {
+            "requests": h.total,
+            "mean_ms": round(h.sum_ms / h.total, 1) if h.total else 0.0,
+            "p50_ms": round(h.percentile(50), 1),
+            "p90_ms": round(h.percentile(90), 1),
+            "p95_ms": round(h.percentile(95), 1),
+            "p99_ms": round(h.percentile(99), 1),
+            "max_ms": round(h.max_ms, 1),
+            "error_rate": round(errors / h.total, 4) if h.total else 0.0,
+            "statuses": {str(s): n for s, n in sorted(self.statuses.items())},
+        }
+
+
+class LatencyAnalyzer:
+    def __init__(self, max_open_seconds: float = 900):
+        self.pairer = RequestPairer(max_open_seconds)
+        self.routes = defaultdict(RouteStats)
+        self.companies = defaultdict(RouteStats)
+        self.lines = 0
+        self.first = self.last = None
+        # Concurrencia: área (peticiones abiertas x segundos) y máximo por hora del día
+        self.hour_requests = [0] * 24
+        self.hour_area = [0.0] * 24
+        self.hour_peak = [0] * 24
+        self.hours_seen = set()       # (fecha, hora) con actividad; cuántas horas reales cubre cada hora del día
+        self.peak_by_hour = {}        # (fecha, hora) -> concurrencia máxima
+        self._last_expire = None
+
+    def feed(self, ts: datetime.datetime, message: str) -> None:
+        self.lines += 1
+        if self.first is None:
+            self.first = ts
+        elif ts > self.last:
+            gap = (ts - self.last).total_seconds()
+            if gap > 60:
+                # Huecos largos (noche, reinicio): primero se descartan las peticiones perdidas
+                self.pairer.expire(ts)
+            # Lo abierto desde la línea anterior cuenta para la hora de esa línea
+            self.hour_area[self.last.hour] += self.pairer.open_requests * gap
+        self.last = ts if self.last is None or ts > self.last else self.last
+
+        req = self.pairer.feed(ts, message)
+        if req is not None:
+            self.add(req)
+
+        open_now = self.pairer.open_requests
+        hour_key = (ts.date(), ts.hour)
+        self.hours_seen.add(hour_key)
+        if open_now > self.peak_by_hour.get(hour_key, 0):
+            self.peak_by_hour[hour_key] = open_now
+            self.hour_peak[ts.hour] = max(self.hour_peak[ts.hour], open_now)
+
+        if self._last_expire is None or (ts - self._last_expire).total_seconds() > 60:
+            self.pairer.expire(ts)
+            self._last_expire = ts
+
+    def add(self, req) -> None:
+        ms = req.duration_ms
+        stats = self.routes[req.route]
+        stats.latency.add(ms)
+        stats.statuses[req.status] += 1
+        self.hour_requests[req.start.hour] += 1
+        if resolves_company(req.path):
+            company = self.companies[req.company or "(unknown)"]
+            company.latency.add(ms)
+            company.statuses[req.status] += 1
+
+    def report(self, top: int = 10) -> dict:
+        days = Counter(hour for _, hour in self.hours_seen)
+        hours = []
+        for hour in range(24):
+            covered = days.get(hour, 0) * 3600
+            hours.append({
+                "hour": hour,
+                "requests": self.hour_requests[hour],
+                "mean_concurrency": round(self.hour_area[hour] / covered, 3) if covered else 0.0,
+                "peak_concurrency": self.hour_peak[hour],
+            })
+        busiest = sorted(self.peak_by_hour.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+        companies = {}
+        total_company_ms = sum(s.latency.sum_ms for s in self.companies.values()) or 1.0
+        for name, stats in sorted(self.companies.items(), key=lambda kv: -kv[1].latency.total):
+            summary = stats.summary()
+            companies[name] = {
+                "requests": summary["requests"],
+                "total_s": round(stats.latency.sum_ms / 1000, 1),
+                "time_share": round(stats.latency.sum_ms / total_company_ms, 3),
+                "p50_ms": summary["p50_ms"],
+                "p95_ms": summary["p95_ms"],
+                "error_rate": summary["error_rate"],
+            }
+        return {
+            "from": self.first.isoformat() if self.first else None,
+            "to": self.last.isoformat() if self.last else None,
+            "lines": self.lines,
+            "requests": sum(s.latency.total for s in self.routes.values()),
+            "unmatched_responses": self.pairer.unmatched_responses,
+            "abandoned_requests": self.pairer.abandoned + self.pairer.open_requests,
+            "routes": {
+                route: stats.summary()
+                for route, stats in sorted(self.routes.items(), key=lambda kv: -kv[1].latency.sum_ms)
+            },
+            "companies": companies,
+            "hours": hours,
+            "busiest_hours": [
+                {"hour": f"{day.isoformat()} {hour:02d}:00", "peak_concurrency": peak} for (day, hour), peak in busiest
+            ],
+        }
+
+
+def analyze(paths, since=None, until=None, max_open_seconds: float = 900) -> LatencyAnalyzer:
+    analyzer = LatencyAnalyzer(max_open_seconds)
+    for ts, message in read_lines(log_files(paths)):
+        if since and ts < since:
+            continue
+        if until and ts >= until:
+            break
+        analyzer.feed(ts, message)
+    return analyzer
+
+
+def _print_report(report: dict, top: int) -> None:
+    print(f"{report['from']} .. {report['to']}  lines {report['lines']}  requests {report['requests']}  "
+          f"unmatched RES {report['unmatched_responses']}  never closed {report['abandoned_requests']}")
+
+    print(f"\n{'route (by total time)':<52} {'n':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>9} {'5xx':>6}")
+    for route, r in list(report["routes"].items())[:top]:
+        print(f"{route:<52} {r['requests']:>7} {r['p50_ms']:>8} {r['p90_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['max_ms']:>9} {r['error_rate']:>6.1%}")
+
+    print(f"\n{'company':<20} {'n':>7} {'total s':>9} {'share':>6} {'p50':>8} {'p95':>8}")
+    for name, c in report["companies"].items():
+        print(f"{name:<20} {c['requests']:>7} {c['total_s']:>9} {c['time_share']:>6.0%} {c['p50_ms']:>8} {c['p95_ms']:>8}")
+
+    print(f"\n{'hour':<6} {'requests':>9} {'mean conc':>10} {'peak':>5}")
+    for h in report["hours"]:
+        if h["requests"]:
+            print(f"{h['hour']:02d}:00  {h['requests']:>9} {h['mean_concurrency']:>10} {h['peak_concurrency']:>5}")
+
+    print("\nbusiest hours: " + ", ".join(f"{b['hour']} ({b['peak_concurrency']})" for b in report["busiest_hours"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="archivos, globs o directorios con api_debug.log*")
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--max-open", type=float, default=900, help="segundos antes de dar por perdida una petición sin RES")
+    parser.add_argument("--top", type=int, default=15, help="rutas y horas a mostrar")
+    parser.add_argument("--json", help="guarda el reporte completo en este archivo")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    analyzer = analyze(args.logs, args.since, args.until, args.max_open)
+    report = analyzer.report(args.top)
+    _print_report(report, args.top)
+    elapsed = time.perf_counter() - t0
+    print(f"\n{report['lines']} lines in {elapsed:.1f} s ({report['lines'] / elapsed if elapsed else 0:,.0f} lines/s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
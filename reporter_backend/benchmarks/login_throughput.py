@@ -0,0 +1,130 @@
+# benchmarks/login_throughput.py
+"""Throughput de logins concurrentes contra la base de usuarios (SQLite).
+
+Compara la configuración anterior (journal por defecto, commit de last_login
+en cada login) con la de app/storage.py (WAL + PRAGMAs + pool + buffer
+write-behind de last_login). Cada hilo "login" hace lo mismo que
+/api/token del lado de la base: busca al usuario y registra last_login.
+En paralelo, hilos "lector" listan usuarios como la pantalla de admin.
+
+bcrypt no se incluye: se mide solo la contención en SQLite.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.login_throughput --threads 8 --seconds 5
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.storage import create_sqlite_engine, LastLoginBuffer
+
+
+def _seed(engine, users: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([
+            models.User(username=f"user{i}", hashed_password="x", is_active=True)
+            for i in range(users)
+        ])
+        db.commit()
+
+
+def run(tuned: bool, threads: int, readers: int, seconds: float, users: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine("sqlite:///" + os.path.join(tmp, "bench.db"), tuned=tuned)
+        _seed(engine, users)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        buffer = LastLoginBuffer(engine) if tuned else None
+
+        latencies, errors, reads = [], [0], [0]
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + seconds
+
+        def login_worker(n: int):
+            i = n
+            local, failed = [], 0
+            while time.perf_counter() < stop_at:
+                t0 = time.perf_counter()
+                try:
+                    with Session() as db:
+                        user = db.query(models.User).filter(models.User.username == f"user{i % users}").first()
+                        if buffer is not None:
+                            buffer.record(user.id, datetime.datetime.utcnow())
+                        else:
+                            user.last_login = datetime.datetime.utcnow()
+                            db.commit()
+                    local.append(time.perf_counter() - t0)
+                except Exception:
+                    failed += 1
+                i += threads
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        def reader_worker():
+            count = 0
+            while time.perf_counter() < stop_at:
+                with Session() as db:
+                    db.query(models.User).limit(100).all()
+                count += 1
+            with lock:
+                reads[0] += count
+
+        def flusher():
+            while time.perf_counter() < stop_at:
+                time.sleep(0.5)
+                buffer.flush()
+
+        workers = [threading.Thread(target=login_worker, args=(n,)) for n in range(threads)]
+        workers += [threading.Thread(target=reader_worker) for _ in range(readers)]
+        if buffer is not None:
+            workers.append(threading.Thread(target=flusher))
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        if buffer is not None:
+            buffer.flush()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "mode": "tuned" if tuned else "legacy",
+        "logins": len(latencies),
+        "logins_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+        "errors": errors[0],
+        "reads_per_second": round(reads[0] / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="hilos haciendo login")
+    parser.add_argument("--readers", type=int, default=2, help="hilos leyendo la lista de usuarios")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        result = run(tuned, args.threads, args.readers, args.seconds, args.users)
+        print(
+            f"{result['mode']:>6}: {result['logins_per_second']:>8} logins/s  "
+            f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+            f"errors {result['errors']}  reads/s {result['reads_per_second']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
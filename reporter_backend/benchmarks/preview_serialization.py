@@ -0,0 +1,122 @@
+# benchmarks/preview_serialization.py
+"""Tiempo de serialización de la vista previa (/receivables-preview) por tamaño.
+
+Sobre los mismos datos sintéticos que benchmarks/receivables_pipeline.py,
+procesa el reporte una vez por escenario y mide solo el paso de
+ReceivablesReportData a los bytes de la respuesta:
+
+  fastapi   el camino de FastAPI con response_model: validación contra el
+            response_model, dump en modo json y JSONResponse (json.dumps)
+  fast      ModelJSONResponse (app/reports/json_response.py): serializador de
+            pydantic-core directo a bytes, sin volver a validar
+  orjson    model_dump() + orjson.dumps, como referencia (solo si orjson está instalado)
+
+Antes de medir comprueba que los tres producen el mismo JSON (comparando el
+contenido ya decodificado; el orden de las claves y los espacios pueden variar).
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.preview_serialization
+    python -m benchmarks.preview_serialization --sizes 1000,10000,100000 --json serialization.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.responses import JSONResponse
+
+from app.tenants import TENANTS
+from app.sql_server_conn import open_sql_server_conn
+from app.reports.report_schemas import ReceivablesReportData
+from app.reports.receivables import aging_scheme_info
+from app.reports.json_response import ModelJSONResponse, orjson
+from benchmarks.receivables_pipeline import Scenario, _dataset, _measure, _int_list
+
+_response_field = create_model_field(
+    name="Response_run_receivables_report", type_=ReceivablesReportData, mode="serialization"
+)
+
+
+def fastapi_body(report: ReceivablesReportData) -> bytes:
+    content = asyncio.run(serialize_response(field=_response_field, response_content=report))
+    return JSONResponse(content).body
+
+
+def fast_body(report: ReceivablesReportData) -> bytes:
+    return ModelJSONResponse(report).body
+
+
+def orjson_body(report: ReceivablesReportData) -> bytes:
+    return orjson.dumps(report.model_dump(mode="python"), option=orjson.OPT_NON_STR_KEYS)
+
+
+def build_report(scenario: Scenario) -> ReceivablesReportData:
+    conn = open_sql_server_conn(scenario.company)
+    try:
+        rows = scenario.term_lookups(conn, scenario.fetch(conn))
+    finally:
+        conn.close()
+    return ReceivablesReportData.model_construct(
+        data_by_currency=scenario.process(rows),
+        customer_credit_info=None,
+        aging_scheme=aging_scheme_info(scenario.scheme),
+        consolidated=None
+    )
+
+
+def run_size(scenario: Scenario, repeat: int, trace: bool) -> list:
+    report = build_report(scenario)
+    paths = {"fastapi": fastapi_body, "fast": fast_body}
+    if orjson is not None:
+        paths["orjson"] = orjson_body
+
+    expected = json.loads(fastapi_body(report))
+    for name, func in paths.items():
+        if json.loads(func(report)) != expected:
+            raise SystemExit(f"{name}: output differs from the FastAPI response")
+
+    results = []
+    for name, func in paths.items():
+        body, metrics = _measure(lambda: func(report), repeat, trace)
+        results.append({"scenario": scenario.key, "path": name, "bytes": len(body), **metrics})
+    base = results[0]["median_ms"]
+    for r in results:
+        r["speedup"] = round(base / r["median_ms"], 2) if r["median_ms"] else None
+        alloc = f"  alloc {r['alloc_peak_mb']:>7} MB" if "alloc_peak_mb" in r else ""
+        print(f"  {r['path']:<8} {r['median_ms']:>10.1f} ms  x{r['speedup']:<6} {r['bytes'] / 1_048_576:>6.1f} MB{alloc}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=_int_list, default=[1_000, 10_000, 50_000], help="documentos, separados por coma")
+    parser.add_argument("--currencies", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-trace", action="store_true", help="omite la corrida con tracemalloc")
+    parser.add_argument("--company", default=next(iter(TENANTS)), choices=list(TENANTS))
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date(2025, 12, 31))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "reporter_bench_data"))
+    parser.add_argument("--json", help="guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    for documents in args.sizes:
+        scenario = Scenario(args.company, documents, None, args.currencies, args.as_of)
+        print(f"\n[{scenario.key}]", flush=True)
+        TENANTS[args.company]["standin_db"] = _dataset(args.data_dir, scenario, args.seed)
+        results.extend(run_size(scenario, args.repeat, not args.no_trace))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
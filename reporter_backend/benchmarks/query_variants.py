@@ -0,0 +1,165 @@
+# benchmarks/query_variants.py
+"""Compilación vs ejecución de la variante de un cliente del catálogo de consultas.
+
+Para una empresa real alterna clientes grandes y chicos (los que más y menos
+documentos tienen) sobre la variante "upto.customer" y mide tres modos:
+
+  - fresh:      un cursor nuevo por ejecución (como fetch_all antes del pool)
+  - prepared:   el mismo cursor para el mismo texto (fetch_all con prepared=True)
+  - recompile:  cursor reutilizado + OPTION (RECOMPILE) (REPORT_QUERY_RECOMPILE=true)
+
+Con SET STATISTICS TIME separa el tiempo de "parse and compile" del de
+ejecución, y al final muestra cuántos planes hay en caché para la consulta
+(requiere VIEW SERVER STATE; si no hay permiso se omite).
+
+Uso (desde reporter_backend/, con el .env de conexión):
+    python -m benchmarks.query_variants --company growers_union --runs 5 --customers 6
+    python -m benchmarks.query_variants --full --json resultados.json
+"""
+
+import argparse
+import datetime
+import json
+import re
+import statistics
+import time
+
+from app.sql_server_conn import open_sql_server_conn
+from app.tenants import TENANTS
+from app.reports.query_catalog import build_report_catalog, select_report_variant
+
+_COMPILE = re.compile(r"parse and compile time:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+_EXECUTION = re.compile(r"Execution Times:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+
+_CUSTOMERS_SQL = """
+    SELECT BusinessEntityID, COUNT(*) AS Documents
+    FROM zzReporteSaldoDocuments
+    WHERE ArrivalDate <= ?
+    GROUP BY BusinessEntityID
+"""
+
+_CACHED_PLANS_SQL = """
+    SELECT cp.objtype, COUNT(*) AS Plans, SUM(cp.usecounts) AS Uses
+    FROM sys.dm_exec_cached_plans cp
+    CROSS APPLY sys.dm_exec_sql_text(cp.plan_handle) st
+    WHERE st.text LIKE '%FROM zzReporteSaldoDocuments d%' AND st.text NOT LIKE '%dm_exec_cached_plans%'
+    GROUP BY cp.objtype
+"""
+
+
+def _messages(cursor, into: list) -> None:
+    into.extend(text for _, text in (cursor.messages or []))
+
+
+def _run(cursor, sql: str, params: list) -> dict:
+    messages = []
+    t0 = time.perf_counter()
+    cursor.execute(sql, params)
+    _messages(cursor, messages)
+    rows = len(cursor.fetchall())
+    _messages(cursor, messages)
+    while cursor.nextset():
+        _messages(cursor, messages)
+    wall_ms = (time.perf_counter() - t0) * 1000
+    text = "\n".join(messages)
+    return {
+        "wall_ms": wall_ms,
+        "compile_ms": sum(int(m.group(2)) for m in _COMPILE.finditer(text)),
+        "exec_cpu_ms": sum(int(m.group(1)) for m in _EXECUTION.finditer(text)),
+        "rows": rows,
+    }
+
+
+def _pick_customers(conn, as_of: datetime.date, count: int) -> list:
+    cursor = conn.cursor()
+    cursor.execute(_CUSTOMERS_SQL, [as_of])
+    ranked = sorted(cursor.fetchall(), key=lambda r: r.Documents, reverse=True)
+    cursor.close()
+    half = max(1, count // 2)
+    big, small = ranked[:half], ranked[-half:]
+    # Alternados: grande, chico, grande, chico... (el peor caso para un plan "olfateado")
+    picked = []
+    for a, b in zip(big, small):
+        picked += [(a.BusinessEntityID, "big"), (b.BusinessEntityID, "small")]
+    return picked
+
+
+def _cached_plans(conn):
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_CACHED_PLANS_SQL)
+        result = {row.objtype: {"plans": row.Plans, "uses": row.Uses} for row in cursor.fetchall()}
+        cursor.close()
+        return result
+    except Exception as e:  # sin permiso VIEW SERVER STATE
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company", default=next(iter(TENANTS)), choices=list(TENANTS))
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--customers", type=int, default=6)
+    parser.add_argument("--full", action="store_true", help="consulta completa en lugar de la delgada")
+    parser.add_argument("--json", help="guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    catalogs = {"plain": build_report_catalog(recompile=False), "recompile": build_report_catalog(recompile=True)}
+    slim = not args.full
+
+    conn = open_sql_server_conn(args.company)
+    results = {}
+    try:
+        customers = _pick_customers(conn, args.as_of, args.customers)
+        stats_cursor = conn.cursor()
+        stats_cursor.execute("SET STATISTICS TIME ON")
+        stats_cursor.close()
+
+        for mode, catalog_key, reuse in (("fresh", "plain", False), ("prepared", "plain", True), ("recompile", "recompile", True)):
+            samples = []
+            shared = conn.cursor() if reuse else None
+            for _ in range(args.runs):
+                for customer_id, size in customers:
+                    variant, params = select_report_variant(
+                        args.as_of, customer_id, slim=slim, catalog=catalogs[catalog_key]
+                    )
+                    cursor = shared or conn.cursor()
+                    sample = _run(cursor, variant.sql, params)
+                    if shared is None:
+                        cursor.close()
+                    sample["size"] = size
+                    samples.append(sample)
+            if shared is not None:
+                shared.close()
+            conn.rollback()
+            results[mode] = samples
+
+        plans = _cached_plans(conn)
+    finally:
+        conn.close()
+
+    print(f"company {args.company}  as_of {args.as_of}  customers {[c for c, _ in customers]}  slim={slim}")
+    print(f"{'mode':<10} {'size':<6} {'median ms':>10} {'p95 ms':>10} {'compile ms':>11} {'exec cpu ms':>12}")
+    summary = {}
+    for mode, samples in results.items():
+        for size in ("big", "small"):
+            subset = [s for s in samples if s["size"] == size]
+            walls = sorted(s["wall_ms"] for s in subset)
+            row = {
+                "median_ms": round(statistics.median(walls), 1),
+                "p95_ms": round(walls[min(len(walls) - 1, int(len(walls) * 0.95))], 1),
+                "compile_ms": sum(s["compile_ms"] for s in subset),
+                "exec_cpu_ms": sum(s["exec_cpu_ms"] for s in subset),
+            }
+            summary[f"{mode}.{size}"] = row
+            print(f"{mode:<10} {size:<6} {row['median_ms']:>10} {row['p95_ms']:>10} {row['compile_ms']:>11} {row['exec_cpu_ms']:>12}")
+    print(f"cached plans: {plans}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"company": args.company, "as_of": str(args.as_of), "summary": summary, "cached_plans": plans}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
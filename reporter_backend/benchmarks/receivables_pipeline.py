@@ -0,0 +1,324 @@
+# benchmarks/receivables_pipeline.py
+"""Benchmark del camino del reporte de saldos, por etapa y de punta a punta.
+
+Sobre datos sintéticos (benchmarks/synthetic_data.py, servidos por
+app/sql_standin.py) mide para cada escenario (documentos x clientes x monedas):
+
+  fetch          consulta del reporte (fetch_all)
+  term_lookups   Vencimiento / CreditDaysLabel (tablas de términos en frío; 0 sin SLIM_REPORT_QUERY)
+  process        process_report_data
+  serialize      ReceivablesReportData -> JSON, como lo hace /receivables-preview
+                 (ModelJSONResponse; el camino anterior de FastAPI se compara en
+                 benchmarks/preview_serialization.py)
+  excel/pdf/html create_excel_report / create_pdf_report / create_html_report
+  end_to_end     fetch + términos + process + serialize (lo que hace /receivables-preview)
+
+Por etapa se guarda el tiempo (mediana y mínimo de --repeat corridas), el pico
+de RSS sobre el inicio de la etapa (muestreado cada 5 ms) y, en una corrida
+aparte con tracemalloc, el pico de memoria asignada y el número de bloques.
+
+Los resultados van a un JSON. Con --baseline se comparan contra un JSON
+anterior y se marcan como regresión las etapas cuya mediana o pico de
+memoria crezca más de --threshold; en ese caso el proceso termina con 1.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.receivables_pipeline --sizes 10000,100000 --out bench.json
+    python -m benchmarks.receivables_pipeline --sizes 10000,100000 --baseline bench.json --out new.json
+    python -m benchmarks.receivables_pipeline --sizes 50000 --customers 100,5000 --currencies 1,6 --formats excel
+"""
+
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from app.tenants import TENANTS
+from app.sql_server_conn import open_sql_server_conn, fetch_all
+from app.reports.report_schemas import ReportFilters, ReceivablesReportData
+from app.reports.receivables import (
+    process_report_data, resolve_aging_scheme, aging_scheme_info, report_variant_for, SLIM_REPORT_QUERY
+)
+from app.reports.term_lookups import apply_term_lookups, term_lookups_cache
+from app.reports.exports import get_export_format
+from app.reports.json_response import ModelJSONResponse
+from benchmarks.synthetic_data import generate
+
+DOCUMENT_FORMATS = ("excel", "pdf", "html")
+
+
+# --- Memoria ---
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Sin /proc (macOS/Windows): máximo del proceso, menos preciso por etapa
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class _RssSampler:
+    """Pico de RSS durante un bloque, muestreado en un hilo."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        gc.collect()
+        self.start = self.peak = _rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+    @property
+    def delta_mb(self) -> float:
+        return round((self.peak - self.start) / 1_048_576, 1)
+
+
+# --- Escenario ---
+class Scenario:
+    def __init__(self, company: str, documents: int, customers: int | None, currencies: int, as_of: datetime.date):
+        self.company = company
+        self.documents = documents
+        self.customers = customers
+        self.currencies = currencies
+        self.as_of = as_of
+        self.filters = ReportFilters(as_of=as_of, filter_mode="to_date")
+        self.scheme = resolve_aging_scheme(company, self.filters)
+
+    @property
+    def key(self) -> str:
+        return f"docs={self.documents},customers={self.customers or 'auto'},currencies={self.currencies}"
+
+    def fetch(self, conn):
+        variant, params = report_variant_for(self.filters)
+        return fetch_all(conn, variant.sql, params, name=variant.name, company=self.company)
+
+    def term_lookups(self, conn, rows):
+        # Con la consulta completa el término ya viene en las filas
+        if not SLIM_REPORT_QUERY:
+            return rows
+        term_lookups_cache.invalidate()
+        return apply_term_lookups(conn, self.company, rows)
+
+    def process(self, rows):
+        return process_report_data(rows, self.as_of, self.scheme)
+
+    def serialize(self, data) -> bytes:
+        report = ReceivablesReportData.model_construct(
+            data_by_currency=data, customer_credit_info=None, aging_scheme=aging_scheme_info(self.scheme),
+            consolidated=None
+        )
+        return ModelJSONResponse(report).body
+
+    def build(self, fmt: str, data) -> int:
+        content = get_export_format(fmt).load()(
+            data=data, logo_path="", filters=self.filters.model_dump(),
+            credit_info=None, aging_scheme=self.scheme
+        )
+        return len(content.getvalue())
+
+    def end_to_end(self, conn) -> bytes:
+        rows = self.term_lookups(conn, self.fetch(conn))
+        return self.serialize(self.process(rows))
+
+
+def _dataset(data_dir: str, scenario: Scenario, seed: int) -> str:
+    name = f"synthetic_{scenario.documents}_{scenario.customers or 'auto'}_{scenario.currencies}_{seed}_{scenario.as_of:%Y%m%d}.db"
+    path = os.path.join(data_dir, name)
+    if not os.path.exists(path):
+        print(f"  generating {name} ...", flush=True)
+        generate(
+            path + ".tmp", scenario.documents, seed=seed, customers=scenario.customers,
+            as_of=scenario.as_of, currencies=scenario.currencies
+        )
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def _measure(func, repeat: int, trace: bool) -> tuple:
+    """Devuelve (resultado, métricas) de `func` corrida `repeat` veces (+1 con tracemalloc)."""
+    times = []
+    rss = 0.0
+    result = None
+    for _ in range(repeat):
+        result = None
+        with _RssSampler() as sampler:
+            t0 = time.perf_counter()
+            result = func()
+            times.append((time.perf_counter() - t0) * 1000)
+        rss = max(rss, sampler.delta_mb)
+    metrics = {
+        "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(min(times), 2),
+        "runs": repeat,
+        "rss_peak_mb": rss,
+    }
+    if trace:
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+            blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        finally:
+            tracemalloc.stop()
+        metrics["alloc_peak_mb"] = round(peak / 1_048_576, 1)
+        metrics["alloc_live_blocks"] = blocks
+    return result, metrics
+
+
+def run_scenario(scenario: Scenario, formats, repeat: int, trace: bool) -> list:
+    conn = open_sql_server_conn(scenario.company)
+    results = []
+
+    def record(stage: str, metrics: dict, **extra):
+        entry = {"scenario": scenario.key, "stage": stage, **metrics, **extra}
+        results.append(entry)
+        alloc = f"  alloc {metrics['alloc_peak_mb']:>7} MB" if "alloc_peak_mb" in metrics else ""
+        print(f"  {stage:<13} {metrics['median_ms']:>10.1f} ms  rss +{metrics['rss_peak_mb']:>7} MB{alloc}", flush=True)
+
+    # Los generadores se importan al primer uso (exports.py); eso no se mide
+    for fmt in formats:
+        get_export_format(fmt).load()
+
+    try:
+        rows, metrics = _measure(lambda: scenario.fetch(conn), repeat, trace)
+        record("fetch", metrics, rows=len(rows))
+        rows, metrics = _measure(lambda: scenario.term_lookups(conn, scenario.fetch(conn)), repeat, trace)
+        fetch_ms = next(r["median_ms"] for r in results if r["stage"] == "fetch")
+        # El tiempo de términos se reporta sin la consulta del reporte
+        metrics["median_ms"] = round(max(0.0, metrics["median_ms"] - fetch_ms), 2)
+        metrics["min_ms"] = round(max(0.0, metrics["min_ms"] - fetch_ms), 2)
+        record("term_lookups", metrics)
+        data, metrics = _measure(lambda: scenario.process(rows), repeat, trace)
+        record("process", metrics, currencies=len(data))
+        body, metrics = _measure(lambda: scenario.serialize(data), repeat, trace)
+        record("serialize", metrics, bytes=len(body))
+        for fmt in formats:
+            size, metrics = _measure(lambda: scenario.build(fmt, data), repeat, trace)
+            record(fmt, metrics, bytes=size)
+        del data, body
+        _, metrics = _measure(lambda: scenario.end_to_end(conn), repeat, trace)
+        record("end_to_end", metrics)
+    finally:
+        conn.close()
+    return results
+
+
+# --- Comparación ---
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Etapas cuya mediana o pico de asignaciones crece más de `threshold` (0.10 = 10%)."""
+    base = {(r["scenario"], r["stage"]): r for r in baseline}
+    regressions = []
+    print(f"\n{'scenario':<44} {'stage':<13} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for r in results:
+        b = base.get((r["scenario"], r["stage"]))
+        if b is None:
+            continue
+        change = (r["median_ms"] - b["median_ms"]) / b["median_ms"] if b["median_ms"] else 0.0
+        flags = []
+        if change > threshold:
+            flags.append("time")
+        if b.get("alloc_peak_mb") and r.get("alloc_peak_mb") is not None:
+            if (r["alloc_peak_mb"] - b["alloc_peak_mb"]) / b["alloc_peak_mb"] > threshold:
+                flags.append("alloc")
+        mark = "  REGRESSION (" + ", ".join(flags) + ")" if flags else ""
+        print(f"{r['scenario']:<44} {r['stage']:<13} {b['median_ms']:>10.1f} {r['median_ms']:>10.1f} {change:>+8.1%}{mark}")
+        if flags:
+            regressions.append({"scenario": r["scenario"], "stage": r["stage"], "change": round(change, 4), "flags": flags})
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(text: str) -> list:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=_int_list, default=[10_000, 50_000], help="documentos, separados por coma")
+    parser.add_argument("--customers", default="auto", help="clientes por escenario ('auto' = documentos / 40)")
+    parser.add_argument("--currencies", type=_int_list, default=[3])
+    parser.add_argument("--formats", default=",".join(DOCUMENT_FORMATS), help="excel,pdf,html ('' = ninguno)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-trace", action="store_true", help="omite la corrida con tracemalloc")
+    parser.add_argument("--company", default=next(iter(TENANTS)), choices=list(TENANTS))
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date(2025, 12, 31))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "reporter_bench_data"))
+    parser.add_argument("--out", help="archivo JSON de resultados")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    formats = [f for f in args.formats.split(",") if f]
+    customers = [None if c.strip() == "auto" else int(c) for c in args.customers.split(",")]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = []
+    for documents, n_customers, n_currencies in itertools.product(args.sizes, customers, args.currencies):
+        scenario = Scenario(args.company, documents, n_customers, n_currencies, args.as_of)
+        print(f"\n[{scenario.key}]", flush=True)
+        # El escenario se sirve desde SQLite (ver app/sql_standin.py)
+        TENANTS[args.company]["standin_db"] = _dataset(args.data_dir, scenario, args.seed)
+        results.extend(run_scenario(scenario, formats, args.repeat, not args.no_trace))
+
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = {"file": args.baseline, "commit": baseline["meta"].get("commit")}
+        report["regressions"] = compare(results, baseline["results"], args.threshold)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nresults written to {args.out}")
+    if report.get("regressions"):
+        print(f"\n{len(report['regressions'])} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/report_query.py
+"""Tiempo en SQL de la consulta del reporte: original (con CTE) vs delgada.
+
+Para una empresa real mide, con la misma conexión:
+
+  - legacy:        consulta completa (StudentCredit + DocumentTerm en cada llamada)
+  - slim (cold):   consulta delgada + carga de las tablas de términos
+  - slim (warm):   consulta delgada + resolución con las tablas ya en caché
+
+y verifica que Vencimiento / CreditDaysLabel coincidan fila por fila.
+
+Uso (desde reporter_backend/, con el .env de conexión):
+    python -m benchmarks.report_query --company growers_union --runs 3
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+
+from app.sql_server_conn import open_sql_server_conn, fetch_all
+from app.tenants import TENANTS
+from app.reports.receivables import build_report_query
+from app.reports.term_lookups import apply_term_lookups, term_lookups_cache
+
+
+def _timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company", default=next(iter(TENANTS)), choices=list(TENANTS))
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--customer-id", type=int)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    legacy_sql, params = build_report_query(args.as_of, args.customer_id, slim=False)
+    slim_sql, _ = build_report_query(args.as_of, args.customer_id, slim=True)
+
+    conn = open_sql_server_conn(args.company)
+    try:
+        legacy_ms, slim_cold_ms, slim_warm_ms = [], [], []
+        for _ in range(args.runs):
+            ms, legacy_rows = _timed(lambda: fetch_all(conn, legacy_sql, params))
+            legacy_ms.append(ms)
+
+            term_lookups_cache.invalidate()
+            ms, slim_rows = _timed(lambda: apply_term_lookups(conn, args.company, fetch_all(conn, slim_sql, params)))
+            slim_cold_ms.append(ms)
+
+            ms, slim_rows = _timed(lambda: apply_term_lookups(conn, args.company, fetch_all(conn, slim_sql, params)))
+            slim_warm_ms.append(ms)
+    finally:
+        conn.close()
+
+    # Mismo orden en ambos lados aunque el ORDER BY tenga empates
+    order = lambda r: (r.BusinessEntityID, r.Folio or "", str(r.InvoiceDate), r.Modulo or "")
+    mismatches = sum(
+        1 for a, b in zip(sorted(legacy_rows, key=order), sorted(slim_rows, key=order))
+        if (a.Vencimiento, a.CreditDaysLabel) != (b.Vencimiento, b.CreditDaysLabel)
+    )
+    print(f"company {args.company}  as_of {args.as_of}  rows legacy={len(legacy_rows)} slim={len(slim_rows)}  mismatches={mismatches}")
+    for label, values in (("legacy", legacy_ms), ("slim (cold)", slim_cold_ms), ("slim (warm)", slim_warm_ms)):
+        print(f"{label:<12} median {statistics.median(values):9.1f} ms   min {min(values):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/synthetic_data.py
+"""Genera una base SQLite con datos sintéticos para el sustituto de SQL Server.
+
+Las tablas tienen las columnas que lee la app (ver app/sql_standin.py):
+
+  zzReporteSaldoDocuments   documentos con saldo abierto (en SQL Server es una vista)
+  orgCustomer               clientes: término de pago, límite de crédito, moneda, eliminado
+  vwLBSCustomerList         vista sobre orgCustomer para el filtro de clientes
+  engPaymentTerm(Detail)    términos de pago y sus días
+  docDocument               término de pago de cada documento
+  engRefCurrency            catálogo de monedas
+
+La distribución imita la de producción: pocos clientes concentran la mayoría de
+los documentos (Zipf, --skew), cola larga de clientes con uno o dos, varias
+monedas con TC que varía con la fecha, fechas cargadas hacia lo reciente y
+algunos documentos con término distinto al del cliente. Con la misma --seed el
+archivo sale idéntico.
+
+Uso (desde reporter_backend/):
+    python -m benchmarks.synthetic_data --out /tmp/growers.db --documents 1000000
+    STANDIN_DB_GROWERS_UNION=/tmp/growers.db uvicorn app.main:app
+"""
+
+import argparse
+import bisect
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+_SCHEMA = """
+    CREATE TABLE engRefCurrency (CurrencyID INTEGER PRIMARY KEY, Currency TEXT NOT NULL);
+    CREATE TABLE engPaymentTerm (PaymentTermID INTEGER PRIMARY KEY, PaymentTermName TEXT NOT NULL);
+    CREATE TABLE engPaymentTermDetail (
+        PaymentTermID INTEGER NOT NULL, PaymentPeriod INTEGER NOT NULL, PaymentUnit INTEGER NOT NULL
+    );
+    CREATE TABLE orgCustomer (
+        BusinessEntityID INTEGER PRIMARY KEY, BusinessEntity TEXT NOT NULL, PaymentTermID INTEGER,
+        CreditLimit REAL, CurrencyID INTEGER, DeletedBy INTEGER
+    );
+    CREATE VIEW vwLBSCustomerList AS
+        SELECT BusinessEntityID, BusinessEntity,
+               CASE WHEN IFNULL(DeletedBy, 0) = 0 THEN 0 ELSE 1 END AS Deleted
+        FROM orgCustomer;
+    CREATE TABLE docDocument (BusinessEntityID INTEGER NOT NULL, Folio TEXT NOT NULL, PaymentTermID INTEGER);
+    CREATE TABLE zzReporteSaldoDocuments (
+        Cliente TEXT, BusinessEntityID INTEGER, Modulo TEXT, InvoiceDate DATE, Folio TEXT,
+        ArrivalDate DATE, Referencia TEXT, PO TEXT, Moneda TEXT, TC REAL,
+        SubTotal REAL, Total REAL, Pagado REAL, Saldo REAL
+    );
+"""
+
+_INDEXES = """
+    CREATE INDEX ix_saldo_arrival ON zzReporteSaldoDocuments (ArrivalDate);
+    CREATE INDEX ix_saldo_customer ON zzReporteSaldoDocuments (BusinessEntityID, ArrivalDate);
+    CREATE INDEX ix_saldo_folio ON zzReporteSaldoDocuments (BusinessEntityID, Folio);
+    CREATE INDEX ix_doc_customer ON docDocument (BusinessEntityID, Folio);
+    CREATE INDEX ix_term_detail ON engPaymentTermDetail (PaymentTermID);
+"""
+
+# (id, moneda, peso en los clientes, TC base, variación anual del TC); --currencies toma las primeras N
+_CURRENCIES = [
+    (1, "MXN", 0.55, 1.0, 0.0), (2, "USD", 0.38, 17.5, 1.2), (3, "EUR", 0.07, 19.0, 1.0),
+    (4, "CAD", 0.05, 13.0, 0.8), (5, "GBP", 0.03, 22.0, 1.1), (6, "JPY", 0.02, 0.12, 0.01),
+]
+# (id, nombre, días): PaymentPeriod 0 + PaymentUnit = días
+_TERMS = [(1, "Contado", 0), (2, "15 Días", 15), (3, "30 Días", 30), (4, "45 Días", 45), (5, "60 Días", 60), (6, "90 Días", 90)]
+_TERM_WEIGHTS = [0.08, 0.17, 0.35, 0.15, 0.15, 0.10]
+_MODULES = [("Sales Invoice", 0.82), ("Sales Order", 0.10), ("Debit Note", 0.05), ("Credit Note", 0.03)]
+_WORDS = (
+    "Agro Fresh Valle Norte Sur Campo Verde Frutas Hortalizas Del Pacifico Golden Sierra Export Distribuidora "
+    "Mercado Central Produce Farms Growers Berry Citrus Premium Organic Andes Bajio Sonora Sinaloa Trading"
+).split()
+_SUFFIXES = ["S.A. de C.V.", "LLC", "Inc.", "GmbH", "S. de R.L.", "Co."]
+
+_BATCH = 50_000
+
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+
+
+def _customer_name(rng: random.Random, i: int) -> str:
+    return f"{' '.join(rng.sample(_WORDS, 2))} {rng.choice(_SUFFIXES)} #{i}"
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def generate(
+    path: str,
+    documents: int,
+    seed: int = 7,
+    customers: int | None = None,
+    skew: float = 1.1,
+    as_of: datetime.date | None = None,
+    years: int = 3,
+    currencies: int = 3
+) -> dict:
+    """Crea (o reemplaza) el archivo y devuelve un resumen de lo generado."""
+    rng = random.Random(seed)
+    as_of = as_of or datetime.date.today()
+    customers = customers or max(50, documents // 40)
+    currency_list = _CURRENCIES[:max(1, min(currencies, len(_CURRENCIES)))]
+    if os.path.exists(path):
+        os.remove(path)
+
+    t0 = time.perf_counter()
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.executescript(_SCHEMA)
+
+    db.executemany("INSERT INTO engRefCurrency VALUES (?, ?)", [(c[0], c[1]) for c in currency_list])
+    db.executemany("INSERT INTO engPaymentTerm VALUES (?, ?)", [(t[0], t[1]) for t in _TERMS])
+    db.executemany("INSERT INTO engPaymentTermDetail VALUES (?, 0, ?)", [(t[0], t[2]) for t in _TERMS])
+
+    # Clientes: el de rango k tiene peso 1 / k^skew (Zipf); el orden de ids se mezcla
+    currency_cum = _cumulative([c[2] for c in currency_list])
+    term_cum = _cumulative(_TERM_WEIGHTS)
+    ids = list(range(1000, 1000 + customers))
+    rng.shuffle(ids)
+    customer_rows = []
+    for rank, entity_id in enumerate(ids, start=1):
+        currency = currency_list[bisect.bisect_left(currency_cum, rng.random() * currency_cum[-1])]
+        term = _TERMS[bisect.bisect_left(term_cum, rng.random() * term_cum[-1])]
+        deleted = 1 if rng.random() < 0.02 else None
+        customer_rows.append((
+            entity_id, _customer_name(rng, entity_id), term[0],
+            round(rng.lognormvariate(11, 1.2), -3), currency[0], deleted
+        ))
+    db.executemany("INSERT INTO orgCustomer VALUES (?, ?, ?, ?, ?, ?)", customer_rows)
+    weights_cum = _cumulative([1.0 / rank ** skew for rank in range(1, customers + 1)])
+    currency_by_id = {c[0]: c for c in currency_list}
+
+    module_cum = _cumulative([m[1] for m in _MODULES])
+    span_days = 365 * years
+    saldo_batch, doc_batch = [], []
+    folio = itertools.count(100_000)
+    totals_by_customer = {}
+
+    def flush():
+        db.executemany("INSERT INTO zzReporteSaldoDocuments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", saldo_batch)
+        db.executemany("INSERT INTO docDocument VALUES (?, ?, ?)", doc_batch)
+        saldo_batch.clear()
+        doc_batch.clear()
+
+    for _ in range(documents):
+        customer = customer_rows[bisect.bisect_left(weights_cum, rng.random() * weights_cum[-1])]
+        entity_id, name, term_id = customer[0], customer[1], customer[2]
+        # Algunos documentos van en una moneda distinta a la del cliente
+        currency = currency_by_id[customer[4]]
+        if rng.random() < 0.05:
+            currency = currency_list[bisect.bisect_left(currency_cum, rng.random() * currency_cum[-1])]
+        # Fechas cargadas hacia lo reciente (triangular)
+        age = int(rng.triangular(0, span_days, 0))
+        invoice = as_of - datetime.timedelta(days=age)
+        arrival = None if rng.random() < 0.01 else invoice + datetime.timedelta(days=rng.randint(0, 10))
+        module = _MODULES[bisect.bisect_left(module_cum, rng.random() * module_cum[-1])][0]
+        sign = -1 if module == "Credit Note" else 1
+        subtotal = round(rng.lognormvariate(9, 1.3), 2)
+        total = round(subtotal * 1.16, 2) if currency[1] == "MXN" else subtotal
+        paid = 0.0 if rng.random() < 0.6 else round(total * rng.uniform(0.1, 0.95), 2)
+        tc = round(currency[3] + currency[4] * (rng.random() - 0.5) * age / 365, 4) if currency[4] else 1.0
+        doc_folio = str(next(folio))
+        saldo_batch.append((
+            name, entity_id, module, invoice, doc_folio, arrival,
+            f"REF-{rng.randint(1, 999999):06d}", f"PO{rng.randint(1, 99999):05d}" if rng.random() < 0.4 else None,
+            currency[1], tc, sign * subtotal, sign * total, sign * paid, sign * round(total - paid, 2)
+        ))
+        # 15% de los documentos con un término distinto al del cliente
+        doc_term = _TERMS[bisect.bisect_left(term_cum, rng.random() * term_cum[-1])][0] if rng.random() < 0.15 else term_id
+        doc_batch.append((entity_id, doc_folio, doc_term))
+        totals_by_customer[entity_id] = totals_by_customer.get(entity_id, 0) + 1
+        if len(saldo_batch) >= _BATCH:
+            flush()
+    flush()
+
+    db.executescript(_INDEXES)
+    db.execute("ANALYZE")
+    db.commit()
+    db.close()
+
+    counts = sorted(totals_by_customer.values(), reverse=True)
+    top = max(1, len(counts) // 100)
+    return {
+        "path": path,
+        "documents": documents,
+        "customers": customers,
+        "currencies": len(currency_list),
+        "customers_with_documents": len(counts),
+        "top_1pct_share": round(sum(counts[:top]) / documents, 3) if documents else 0.0,
+        "largest_customer": counts[0] if counts else 0,
+        "seconds": round(time.perf_counter() - t0, 1),
+        "size_mb": round(os.path.getsize(path) / 1_048_576, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--documents", type=int, default=100_000, help="10k a 5M")
+    parser.add_argument("--customers", type=int, help="por defecto documentos / 40")
+    parser.add_argument("--skew", type=float, default=1.1, help="exponente Zipf de documentos por cliente")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--currencies", type=int, default=3, help=f"1 a {len(_CURRENCIES)}")
+    args = parser.parse_args()
+    summary = generate(
+        args.out, args.documents, args.seed, args.customers, args.skew, args.as_of, args.years, args.currencies
+    )
+    for key, value in summary.items():
+        print(f"{key:<26} {value}")
+
+
+if __name__ == "__main__":
+    main()
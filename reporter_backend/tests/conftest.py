@@ -0,0 +1,70 @@
+# tests/conftest.py
+"""Configuración común de las pruebas (desde reporter_backend/: python -m pytest tests).
+
+Casi todos los módulos del reporte importan pyodbc; las pruebas que los usan
+hacen `pytest.importorskip("pyodbc", exc_type=ImportError)` y se saltan si el
+driver ODBC no está instalado (pyodbc sin libodbc lanza ImportError). Las que necesitan una base usan el sustituto SQLite (sql_standin.py)
+con datos de benchmarks/synthetic_data.py, nunca SQL Server.
+"""
+
+import datetime
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Columnas que process_report_data lee de cada fila de la consulta del reporte
+REPORT_COLUMNS = (
+    "BusinessEntityID", "Cliente", "Modulo", "InvoiceDate", "Folio", "ArrivalDate", "Vencimiento",
+    "Referencia", "Moneda", "TC", "SubTotal", "Total", "Pagado", "Saldo", "CreditDaysLabel", "PO",
+)
+ReportRow = namedtuple("ReportRow", REPORT_COLUMNS)
+STANDIN_AS_OF = datetime.date(2025, 12, 31)
+
+
+@pytest.fixture
+def make_row():
+    """Fábrica de filas con la forma de la consulta del reporte; los argumentos reemplazan los valores por defecto."""
+    def make(**values) -> ReportRow:
+        day = values.pop("date", datetime.date(2025, 12, 1))
+        row = dict(
+            BusinessEntityID=1, Cliente="Customer 1", Modulo="Invoice", InvoiceDate=day, Folio="F-1",
+            ArrivalDate=day, Vencimiento=day, Referencia="", Moneda="MXN", TC=1.0, SubTotal=100.0,
+            Total=100.0, Pagado=0.0, Saldo=100.0, CreditDaysLabel="30 Days", PO="",
+        )
+        row.update(values)
+        return ReportRow(**row)
+    return make
+
+
+@pytest.fixture
+def standin_db(tmp_path):
+    """
+    Base SQLite chica con datos sintéticos (al 2025-12-31). A uno de cada cinco
+    documentos se le quita su término propio para que el vencimiento salga del
+    término del cliente.
+    """
+    from benchmarks.synthetic_data import generate
+
+    path = str(tmp_path / "standin.db")
+    generate(path, 2000, seed=7, as_of=STANDIN_AS_OF)
+    db = sqlite3.connect(path)
+    db.execute("DELETE FROM docDocument WHERE rowid % 5 = 0")
+    db.commit()
+    db.close()
+    return path
+
+
+@pytest.fixture
+def standin_conn(standin_db):
+    """Conexión al sustituto de SQL Server (necesita pyodbc para sus errores)."""
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    from app import sql_standin
+
+    conn = sql_standin.connect(standin_db)
+    yield conn
+    conn.close()
@@ -0,0 +1,113 @@
+# tests/test_aging.py
+import datetime
+
+import pytest
+
+from app.reports.aging import AGING_SCHEMES, MAX_AGING_BOUNDARIES, NOT_DUE_LABEL, get_scheme, make_scheme
+
+
+@pytest.mark.parametrize("days, label", [
+    (-5, NOT_DUE_LABEL),
+    (0, NOT_DUE_LABEL),
+    (1, "0-21"),
+    (21, "0-21"),
+    (22, "22-30"),
+    (30, "22-30"),
+    (31, "31-45"),
+    (45, "31-45"),
+    (46, "45+"),
+    (400, "45+"),
+])
+def test_standard_bucket_boundaries(days, label):
+    bucketer = get_scheme("standard").compile()
+    assert bucketer.label(days) == label
+    assert bucketer.labels[bucketer.index(days)] == label
+
+
+def test_labels_and_keys():
+    scheme = get_scheme("monthly")
+    assert scheme.labels == ["0-30", "31-60", "61-90", "90+"]
+    assert scheme.bucket_keys == ["bucket_0_30", "bucket_31_60", "bucket_61_90", "bucket_90_plus"]
+    assert scheme.compile().keys[0] == "not_yet_due"
+
+
+def test_compile_is_cached():
+    scheme = get_scheme("standard")
+    assert scheme.compile() is scheme.compile()
+
+
+@pytest.mark.parametrize("boundaries, basis", [
+    ((), "arrival"),
+    ((0, 30), "arrival"),
+    ((30, 30), "arrival"),
+    ((60, 30), "arrival"),
+    ((30,), "posting"),
+    (range(1, MAX_AGING_BOUNDARIES + 2), "arrival"),
+])
+def test_make_scheme_rejects_invalid(boundaries, basis):
+    with pytest.raises(ValueError):
+        make_scheme("bad", "Bad", boundaries, basis)
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError, match="Unknown aging scheme"):
+        get_scheme("nope")
+
+
+def test_overrides_same_basis_returns_original():
+    scheme = get_scheme("standard")
+    assert scheme.with_overrides() is scheme
+    assert scheme.with_overrides(basis="arrival") is scheme
+
+
+def test_overrides_keys_do_not_collide():
+    standard = AGING_SCHEMES["standard"]
+    by_due = standard.with_overrides(basis="due")
+    assert (by_due.key, by_due.basis, by_due.boundaries) == ("standard@due", "due", standard.boundaries)
+    assert by_due.name == "Standard (21/30/45) by due date"
+
+    custom = standard.with_overrides(boundaries=[10, 20])
+    assert (custom.key, custom.name, custom.boundaries) == ("custom", "Custom", (10, 20))
+    custom_due = standard.with_overrides(basis="due", boundaries=[10, 20])
+    assert custom_due.key == "custom@due"
+    assert len({standard.key, by_due.key, custom.key, custom_due.key}) == 4
+
+
+def test_process_report_data_day_zero_is_not_due(make_row):
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    from app.reports.receivables import process_report_data
+
+    as_of = datetime.date(2025, 12, 31)
+    rows = [
+        make_row(Folio="today", date=as_of, Saldo=10.0),
+        make_row(Folio="yesterday", date=as_of - datetime.timedelta(days=1), Saldo=20.0),
+        make_row(Folio="old", date=as_of - datetime.timedelta(days=46), Saldo=40.0),
+    ]
+    group = process_report_data(rows, as_of=as_of, scheme=get_scheme("standard"))["MXN"]
+
+    assert [e.aging_bucket for e in group.entries] == [NOT_DUE_LABEL, "0-21", "45+"]
+    assert group.totals["not_yet_due"] == 10.0
+    assert group.totals["overdue"] == 60.0
+    assert group.totals["bucket_0_21"] == 20.0
+    summary = group.aging_summary["Customer 1"]
+    assert (summary.not_yet_due, summary.overdue, summary.bucket_45_plus) == (10.0, 60.0, 40.0)
+
+
+def test_process_report_data_uses_scheme_basis(make_row):
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    from app.reports.receivables import process_report_data
+
+    as_of = datetime.date(2025, 12, 31)
+    # Llegó hace 40 días pero vence en 5
+    row = make_row(
+        ArrivalDate=as_of - datetime.timedelta(days=40), Vencimiento=as_of + datetime.timedelta(days=5),
+        InvoiceDate=as_of - datetime.timedelta(days=25)
+    )
+    monthly = get_scheme("monthly")
+    by_basis = {
+        basis: process_report_data([row], as_of=as_of, scheme=monthly.with_overrides(basis=basis))["MXN"]
+        for basis in ("arrival", "due", "invoice")
+    }
+    assert by_basis["arrival"].entries[0].aging_bucket == "31-60"
+    assert by_basis["due"].entries[0].aging_bucket == NOT_DUE_LABEL
+    assert by_basis["invoice"].entries[0].aging_bucket == "0-30"
@@ -0,0 +1,134 @@
+# tests/test_artifact_cache.py
+import datetime
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from app.reports import artifact_cache as artifacts
+from app.reports.aging import get_scheme
+from app.reports.artifact_cache import ArtifactCache, artifact_fingerprint
+from app.reports.exports import get_export_format
+from app.reports.report_schemas import CustomerCreditInfo, ReportFilters
+
+KB = 1024
+
+
+def content(size: int) -> io.BytesIO:
+    return io.BytesIO(b"x" * size)
+
+
+def age(cache: ArtifactCache, company: str, name: str, seconds: float) -> None:
+    """Hace que el documento parezca usado hace `seconds` segundos."""
+    path = cache.path_for(company, name)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArtifactCache(str(tmp_path / "artifacts"), max_bytes=10 * KB, grace_seconds=120)
+
+
+def test_put_and_get(cache):
+    path, st = cache.put("acme", "a.pdf", content(KB))
+    assert path == cache.path_for("acme", "a.pdf") and st.st_size == KB
+    assert cache.get("acme", "a.pdf")[0] == path
+    assert cache.get("acme", "missing.pdf") is None
+    assert cache.get("other", "a.pdf") is None
+
+
+def test_evicts_least_recently_used(cache):
+    for i, name in enumerate(("old.pdf", "mid.pdf", "new.pdf")):
+        cache.put("acme", name, content(3 * KB))
+        age(cache, "acme", name, 1000 - i * 100)
+    # Un acierto actualiza la fecha (más de _TOUCH_SECONDS desde el último uso)
+    assert cache.get("acme", "old.pdf") is not None
+    cache.put("beta", "newest.pdf", content(3 * KB))  # 12 KB > 10 KB
+
+    assert cache.get("acme", "mid.pdf") is None
+    assert {"old.pdf", "new.pdf"} <= set(os.listdir(os.path.join(cache.root, "acme")))
+    assert cache.evictions == 1
+    assert cache.stats()["files"] == 3
+
+
+def test_grace_window_protects_recent_files(cache):
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        cache.put("acme", name, content(3 * KB))
+        age(cache, "acme", name, 30)
+    cache.put("acme", "d.pdf", content(3 * KB))
+    # Todos se usaron hace menos de grace_seconds: puede haber una descarga leyéndolos
+    assert cache.evictions == 0 and cache.stats()["files"] == 4
+
+    age(cache, "acme", "a.pdf", 600)
+    cache.put("acme", "e.pdf", content(KB))
+    assert cache.get("acme", "a.pdf") is None
+    assert cache.evictions == 1
+
+
+def test_stale_temporaries_are_removed(cache):
+    cache.put("acme", "a.pdf", content(KB))
+    directory = os.path.join(cache.root, "acme")
+    for name, seconds in (("dead.pdf.1.2.tmp", 7200), ("writing.pdf.1.3.tmp", 10)):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"partial")
+        stamp = time.time() - seconds
+        os.utime(os.path.join(directory, name), (stamp, stamp))
+    cache.put("acme", "b.pdf", content(KB))
+    assert sorted(os.listdir(directory)) == ["a.pdf", "b.pdf", "writing.pdf.1.3.tmp"]
+    assert cache.stats()["files"] == 2
+
+
+def test_get_or_render_renders_once(cache):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def render():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return content(KB)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_render("acme", "r.xlsx", render)))
+        for _ in range(3)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and len({path for path, _ in results}) == 1
+    assert (cache.misses, cache.hits) == (1, 2)
+
+
+def test_fingerprint_changes_with_inputs():
+    fmt = get_export_format("pdf")
+    scheme = get_scheme("standard")
+    filters = ReportFilters(as_of=datetime.date(2025, 12, 31))
+    credit = CustomerCreditInfo(credit_limit=100.0, payment_terms="30 Días", currency="MXN")
+    base = artifact_fingerprint(fmt, {}, filters, None, scheme)
+
+    assert artifact_fingerprint(fmt, {}, filters, None, scheme) == base
+    assert len(base) == 32
+    others = {
+        artifact_fingerprint(get_export_format("excel"), {}, filters, None, scheme),
+        artifact_fingerprint(fmt, {}, filters.model_copy(update={"customer_id": 5}), None, scheme),
+        artifact_fingerprint(fmt, {}, filters, credit, scheme),
+        artifact_fingerprint(fmt, {}, filters, None, scheme.with_overrides(basis="due")),
+    }
+    assert base not in others and len(others) == 4
+
+
+def test_builder_stamp_tracks_source_file(monkeypatch):
+    monkeypatch.setattr(artifacts, "_builder_stamps", {})
+    fmt = get_export_format("html")
+    stamp = artifacts._builder_stamp(fmt)
+    assert stamp.startswith(fmt.builder + ":")
+    assert artifacts._builder_stamp(fmt) is stamp
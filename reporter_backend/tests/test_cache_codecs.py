@@ -0,0 +1,93 @@
+# tests/test_cache_codecs.py
+import datetime
+import decimal
+import os
+import pickle
+import zlib
+from collections import namedtuple
+
+import pytest
+
+from app.reports.aging import get_scheme
+from app.reports.cache_codecs import (
+    CURRENCY_GROUPS_CODEC, PLAIN_CODEC, ROWS_CODEC, ModelCodec, dumps, loads
+)
+from app.reports.report_schemas import CustomerCreditInfo
+
+
+class Unlisted:
+    pass
+
+
+def test_rows_round_trip(make_row):
+    rows = [make_row(Folio="F-1", Saldo=decimal.Decimal("10.50")), make_row(Folio="F-2", Moneda=None)]
+    decoded = ROWS_CODEC.decode(ROWS_CODEC.encode(rows))
+    assert [tuple(r) for r in decoded] == [tuple(r) for r in rows]
+    assert decoded[0].Saldo == decimal.Decimal("10.50") and decoded[1].Moneda is None
+    assert ROWS_CODEC.decode(ROWS_CODEC.encode([])) == []
+
+
+def test_rows_column_names():
+    # pyodbc.Row expone los nombres en cursor_description; un nombre inválido se renombra
+    row = type("PyodbcLike", (tuple,), {"cursor_description": (("Saldo", None), ("class", None))})((1, 2))
+    decoded = ROWS_CODEC.decode(ROWS_CODEC.encode([row]))[0]
+    assert tuple(decoded) == (1, 2) and decoded.Saldo == 1
+    Row = namedtuple("Row", ["a", "b"])
+    assert ROWS_CODEC.decode(ROWS_CODEC.encode([Row(1, 2)]))[0].b == 2
+    with pytest.raises(TypeError):
+        ROWS_CODEC.encode([(1, 2)])
+
+
+def test_rows_round_trip_standin(standin_conn):
+    from app.sql_server_conn import fetch_all
+
+    rows = fetch_all(standin_conn, "SELECT * FROM zzReporteSaldoDocuments ORDER BY rowid LIMIT 200")
+    decoded = ROWS_CODEC.decode(ROWS_CODEC.encode(rows))
+    assert [tuple(r) for r in decoded] == [tuple(r) for r in rows]
+    assert decoded[0].ArrivalDate == rows[0].ArrivalDate
+
+
+def test_currency_groups_round_trip(make_row):
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    from app.reports.receivables import process_report_data
+
+    as_of = datetime.date(2025, 12, 31)
+    rows = [
+        make_row(Folio=f"F-{i}", Cliente=f"Customer {i % 3}", Moneda="USD" if i % 2 else "MXN",
+                 date=as_of - datetime.timedelta(days=i * 7), Saldo=float(i))
+        for i in range(12)
+    ]
+    groups = process_report_data(rows, as_of=as_of, scheme=get_scheme("standard"))
+    decoded = CURRENCY_GROUPS_CODEC.decode(CURRENCY_GROUPS_CODEC.encode(groups))
+    assert {k: g.model_dump() for k, g in decoded.items()} == {k: g.model_dump() for k, g in groups.items()}
+    assert CURRENCY_GROUPS_CODEC.decode(CURRENCY_GROUPS_CODEC.encode({})) == {}
+
+
+def test_model_and_plain_round_trip():
+    codec = ModelCodec(CustomerCreditInfo)
+    info = CustomerCreditInfo(credit_limit=1500.0, payment_terms="30 Días", currency="USD")
+    assert codec.decode(codec.encode(info)) == info
+    value = [{"id": 1, "name": "Alpha", "tags": {"a", "b"}}, (2, None, 3.5)]
+    assert PLAIN_CODEC.decode(PLAIN_CODEC.encode(value)) == value
+
+
+def test_cache_keys_with_dates_and_schemes_round_trip():
+    key = (("growers_union", "SELECT 1", (datetime.date(2025, 1, 1),)), datetime.date(2025, 12, 31),
+           get_scheme("monthly").with_overrides(basis="due"), 10, None, decimal.Decimal("1.5"))
+    assert loads(dumps(key)) == key
+
+
+@pytest.mark.parametrize("value", [os.system, Unlisted(), pickle.Pickler, datetime.tzinfo])
+def test_refuses_disallowed_globals(value):
+    blob = zlib.compress(pickle.dumps(value))
+    with pytest.raises(pickle.UnpicklingError, match="not allowed"):
+        loads(blob)
+
+
+def test_refuses_reduce_payloads():
+    class Exploit:
+        def __reduce__(self):
+            return (os.system, ("echo pwned",))
+
+    with pytest.raises(pickle.UnpicklingError, match="posix.system|nt.system"):
+        PLAIN_CODEC.decode(zlib.compress(pickle.dumps([1, Exploit()])))
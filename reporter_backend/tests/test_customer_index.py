@@ -0,0 +1,81 @@
+# tests/test_customer_index.py
+import datetime
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from app.reports.customer_index import CustomerIndex, customer_index_cache, index_for
+from app.reports.receivables import build_report_query
+from app.reports.report_cache import ResultCache
+from app.sql_server_conn import fetch_all
+
+
+@pytest.fixture(autouse=True)
+def fresh_index_cache():
+    customer_index_cache.invalidate()
+    yield
+    customer_index_cache.invalidate()
+
+
+@pytest.fixture
+def rows(make_row):
+    # Clientes intercalados, como llegan ordenados por fecha
+    return [
+        make_row(BusinessEntityID=2, Cliente="Beta", Folio="B1", Saldo=10.0, Moneda="USD"),
+        make_row(BusinessEntityID=1, Cliente="Alpha", Folio="A1", Saldo=5.0),
+        make_row(BusinessEntityID=2, Cliente="Beta", Folio="B2", Saldo=2.5, Moneda="USD"),
+        make_row(BusinessEntityID=2, Cliente="Beta", Folio="B3", Saldo=1.0, Moneda=None),
+        make_row(BusinessEntityID=1, Cliente="Alpha", Folio="A2", Saldo=None),
+    ]
+
+
+def test_slices_keep_query_order(rows):
+    index = CustomerIndex(rows)
+    assert [r.Folio for r in index.rows_for(2)] == ["B1", "B2", "B3"]
+    assert [r.Folio for r in index.rows_for(1)] == ["A1", "A2"]
+    assert index.rows_for(99) == []
+    assert index.stats() == {"rows": 5, "customers": 2}
+
+
+def test_aggregates(rows):
+    index = CustomerIndex(rows)
+    beta = index.aggregates(2)
+    assert (beta.name, beta.documents) == ("Beta", 3)
+    # Sin moneda cuenta como MXN, como en el reporte
+    assert beta.balance_by_currency == {"USD": 12.5, "MXN": 1.0}
+    alpha = index.aggregates(1)
+    assert (alpha.name, alpha.documents, alpha.balance_by_currency) == ("Alpha", 2, {"MXN": 5.0})
+    assert index.aggregates(99) is None
+
+
+def test_index_for_rebuilds_only_when_version_changes(rows):
+    key = ("test", "sql", ())
+    first = index_for(key, rows, 1.0)
+    assert index_for(key, list(rows), 1.0) is first
+    second = index_for(key, rows[:2], 2.0)
+    assert second is not first and second.stats() == {"rows": 2, "customers": 2}
+
+
+def test_versions_follow_cache_entry(rows):
+    cache = ResultCache(ttl=60, max_entries=4)
+    key = ("test", "sql", ())
+    cache.put(key, rows)
+    index = index_for(key, *cache.get_entry(key))
+    assert index_for(key, *cache.get_entry(key)) is index
+    # Las filas se reemplazan (refresh / warm-up): otra versión, otro índice
+    cache.put(key, rows[:1])
+    rebuilt = index_for(key, *cache.get_entry(key))
+    assert rebuilt is not index and rebuilt.stats()["rows"] == 1
+
+
+def test_slice_matches_single_customer_query(standin_conn):
+    as_of = datetime.date(2025, 12, 31)
+    sql, params = build_report_query(as_of, None)
+    index = CustomerIndex(fetch_all(standin_conn, sql, params))
+    # Los tres clientes con más documentos y uno con pocos
+    by_size = sorted(index.customers, key=lambda c: index.aggregates(c).documents)
+    for customer_id in by_size[-3:] + by_size[:1]:
+        sql, params = build_report_query(as_of, customer_id)
+        expected = [tuple(r) for r in fetch_all(standin_conn, sql, params)]
+        assert [tuple(r) for r in index.rows_for(customer_id)] == expected
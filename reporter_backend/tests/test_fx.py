@@ -0,0 +1,102 @@
+# tests/test_fx.py
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.reports.aging import get_scheme
+from app.reports.fx import FxConsolidator
+
+BUCKET_KEYS = get_scheme("standard").bucket_keys
+N_SLOTS = len(BUCKET_KEYS) + 1
+
+
+def entry(balance, fx_rate, invoice_date=datetime.date(2025, 12, 1), customer="A"):
+    return SimpleNamespace(
+        customer_name=customer, invoice_date=invoice_date, fx_rate=fx_rate,
+        total=balance, paid=0.0, balance=balance, po_balance=0.0, real_balance=balance,
+    )
+
+
+def consolidator(**kwargs) -> FxConsolidator:
+    fx = FxConsolidator("MXN", **kwargs)
+    fx.start(N_SLOTS)
+    return fx
+
+
+def test_local_reporting_currency_uses_rate_one():
+    fx = consolidator()
+    fx.add("MXN", entry(100.0, 0.0), 0)
+    fx.add("USD", entry(10.0, 20.0), 2)
+    result = fx.result(BUCKET_KEYS)
+    assert (result.currency, result.fx_rate, result.fx_rate_source) == ("MXN", 1.0, "local")
+    assert result.totals["balance"] == 300.0
+    assert result.totals["not_yet_due"] == 100.0
+    assert result.totals["overdue"] == 200.0
+    assert result.totals["bucket_22_30"] == 200.0
+
+
+def test_request_rate_wins_over_latest_document():
+    fx = consolidator(reporting_currency="USD", reporting_rate=20.0)
+    fx.add("USD", entry(10.0, 18.0), 1)
+    result = fx.result(BUCKET_KEYS)
+    assert (result.fx_rate, result.fx_rate_source) == (20.0, "request")
+    assert result.totals["balance"] == pytest.approx(10.0 * 18.0 / 20.0)
+
+
+def test_latest_document_rate_by_invoice_date():
+    fx = consolidator(reporting_currency="USD")
+    fx.add("USD", entry(10.0, 17.0, datetime.date(2025, 12, 20)), 1)
+    fx.add("USD", entry(10.0, 19.0, datetime.date(2025, 12, 1)), 1)
+    fx.add("MXN", entry(190.0, 0.0, datetime.date(2025, 12, 31)), 1)
+    result = fx.result(BUCKET_KEYS)
+    assert (result.fx_rate, result.fx_rate_source) == (17.0, "latest_document")
+    assert result.totals["balance"] == pytest.approx((170.0 + 190.0 + 190.0) / 17.0)
+
+
+def test_no_rate_available_raises():
+    fx = consolidator(reporting_currency="EUR")
+    fx.add("MXN", entry(100.0, 0.0), 0)
+    with pytest.raises(ValueError, match="reporting_fx_rate"):
+        fx.result(BUCKET_KEYS)
+
+
+def test_foreign_document_without_rate_is_unconverted():
+    fx = consolidator()
+    fx.add("USD", entry(10.0, 0.0), 1)
+    fx.add("MXN", entry(5.0, None), 1)
+    result = fx.result(BUCKET_KEYS)
+    assert result.unconverted_documents == 1
+    assert result.totals["balance"] == 5.0
+
+
+def test_customer_summary_and_legacy_fields():
+    fx = consolidator(reporting_currency="USD", reporting_rate=20.0)
+    fx.add("MXN", entry(200.0, 1.0, customer="A"), 0)
+    fx.add("USD", entry(10.0, 20.0, customer="A"), 4)
+    fx.add("USD", entry(5.0, 20.0, customer="B"), 1)
+    summary = fx.result(BUCKET_KEYS).aging_summary
+    assert summary["A"].total_balance == pytest.approx(20.0)
+    assert summary["A"].not_yet_due == pytest.approx(10.0)
+    assert summary["A"].bucket_45_plus == pytest.approx(10.0)
+    assert summary["B"].buckets["bucket_0_21"] == pytest.approx(5.0)
+
+    fx = consolidator(include_customers=False)
+    fx.add("MXN", entry(1.0, 1.0), 0)
+    assert fx.result(BUCKET_KEYS).aging_summary == {}
+
+
+def test_process_report_data_feeds_consolidator(make_row):
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    from app.reports.receivables import process_report_data
+
+    as_of = datetime.date(2025, 12, 31)
+    rows = [
+        make_row(Moneda="MXN", TC=1.0, Saldo=100.0, Total=100.0),
+        make_row(Moneda="USD", TC=20.0, Saldo=10.0, Total=10.0, Cliente="Customer 2"),
+    ]
+    fx = FxConsolidator("MXN")
+    groups = process_report_data(rows, as_of=as_of, scheme=get_scheme("standard"), fx=fx)
+    result = fx.result(BUCKET_KEYS)
+    expected = sum(g.totals["balance"] * (20.0 if cur == "USD" else 1.0) for cur, g in groups.items())
+    assert result.totals["balance"] == pytest.approx(expected) == pytest.approx(300.0)
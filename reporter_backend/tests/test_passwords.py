@@ -0,0 +1,128 @@
+# tests/test_passwords.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+from app import passwords
+from app.passwords import LoginRateLimiter, verify_password, verify_password_async
+
+# Costo mínimo: las pruebas no miden bcrypt
+HASHED = bcrypt.using(rounds=4).hash("s3cret")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(passwords.time, "monotonic", clock)
+    return clock
+
+
+def fail(limiter, username, ip, times):
+    for _ in range(times):
+        limiter.check(username, ip)
+        limiter.record_failure(username, ip)
+
+
+def test_locks_user_from_one_ip_only(clock):
+    limiter = LoginRateLimiter(max_failures=3, window=60, max_failures_per_ip=100)
+    fail(limiter, "Alice", "10.0.0.1", 3)
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("alice", "10.0.0.1")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "61"
+    # Fallar con el nombre de otro usuario no le bloquea la cuenta desde su equipo
+    limiter.check("alice", "10.0.0.2")
+
+
+def test_per_ip_limit_across_usernames(clock):
+    limiter = LoginRateLimiter(max_failures=3, window=60, max_failures_per_ip=5)
+    for i in range(5):
+        fail(limiter, f"user{i}", "10.0.0.9", 1)
+    with pytest.raises(HTTPException):
+        limiter.check("someone-else", "10.0.0.9")
+    limiter.check("someone-else", "10.0.0.10")
+
+
+def test_window_expiry(clock):
+    limiter = LoginRateLimiter(max_failures=2, window=60, max_failures_per_ip=100)
+    fail(limiter, "bob", "ip", 2)
+    clock.now += 30
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("bob", "ip")
+    assert exc.value.headers["Retry-After"] == "31"
+    clock.now += 30
+    limiter.check("bob", "ip")
+
+
+def test_reset_clears_user_but_not_ip(clock):
+    limiter = LoginRateLimiter(max_failures=2, window=60, max_failures_per_ip=3)
+    fail(limiter, "carol", "ip", 2)
+    limiter.reset("CAROL", "ip")
+    limiter.check("carol", "ip")
+    limiter.record_failure("dave", "ip")
+    with pytest.raises(HTTPException):
+        limiter.check("erin", "ip")
+
+
+def test_zero_disables_limits(clock):
+    limiter = LoginRateLimiter(max_failures=0, window=60, max_failures_per_ip=0)
+    fail(limiter, "frank", "ip", 50)
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    passwords._verify_cache.invalidate()
+    calls = []
+    original = passwords.pwd_context.verify
+
+    def counting_verify(plain, hashed):
+        calls.append(plain)
+        return original(plain, hashed)
+
+    monkeypatch.setattr(passwords.pwd_context, "verify", counting_verify)
+    yield calls
+    passwords._verify_cache.invalidate()
+
+
+def test_verify_cache_remembers_success_only(verify_calls):
+    assert verify_password("s3cret", HASHED)
+    assert verify_password("s3cret", HASHED)
+    assert verify_calls == ["s3cret"]
+    assert not verify_password("wrong", HASHED)
+    assert not verify_password("wrong", HASHED)
+    assert verify_calls == ["s3cret", "wrong", "wrong"]
+
+
+def test_verify_cache_keyed_by_stored_hash(verify_calls):
+    assert verify_password("s3cret", HASHED)
+    # Otra contraseña guardada (cambio de contraseña): la entrada anterior no aplica
+    new_hash = bcrypt.using(rounds=4).hash("n3w")
+    assert not verify_password("s3cret", new_hash)
+    assert len(verify_calls) == 2
+
+
+def test_async_cache_hit_skips_executor(verify_calls, monkeypatch):
+    assert verify_password("s3cret", HASHED)
+    # Executor saturado: un acierto en caché no lo necesita, un fallo recibe 503
+    monkeypatch.setattr(passwords, "_pending", passwords.PASSWORD_HASH_MAX_PENDING)
+    assert asyncio.run(verify_password_async("s3cret", HASHED))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(verify_password_async("other", HASHED))
+    assert exc.value.status_code == 503
+
+
+def test_async_verify_runs_in_executor(verify_calls):
+    assert asyncio.run(verify_password_async("s3cret", HASHED))
+    assert not asyncio.run(verify_password_async("nope", HASHED))
+    assert verify_calls == ["s3cret", "nope"]
+    assert passwords._pending == 0
@@ -0,0 +1,55 @@
+# tests/test_report_builder.py
+import datetime
+
+import pytest
+from openpyxl import load_workbook
+from pydantic import ValidationError
+
+from app.reports.aging import MAX_AGING_BOUNDARIES, make_scheme
+from app.reports.report_builder import create_excel_report, create_pdf_report
+from app.reports.report_schemas import AgingSummary, CurrencyGroup, ReceivableEntry, ReportFilters
+
+AS_OF = datetime.date(2025, 12, 31)
+
+
+@pytest.fixture
+def long_scheme():
+    # El máximo de límites: el resumen pasa de la columna Z
+    return make_scheme("custom", "Custom", range(10, 10 * MAX_AGING_BOUNDARIES + 1, 10))
+
+
+@pytest.fixture
+def data(long_scheme):
+    entry = ReceivableEntry(
+        customer_name="Alpha", invoice_date=AS_OF, arrival_date=AS_OF, due_date=AS_OF,
+        currency="MXN", fx_rate=1.0, subtotal=100.0, total=100.0, paid=0.0, balance=100.0,
+        days_since=235, days_overdue=235, aging_bucket=long_scheme.labels[-1],
+    )
+    summary = AgingSummary(
+        total_balance=100.0, overdue=100.0, buckets={long_scheme.bucket_keys[-1]: 100.0}
+    )
+    totals = {"total": 100.0, "paid": 0.0, "po_balance": 0.0, "real_balance": 100.0}
+    return {"MXN": CurrencyGroup(currency="MXN", entries=[entry], totals=totals, aging_summary={"Alpha": summary})}
+
+
+def test_excel_summary_with_long_scheme(data, long_scheme):
+    filters = {"as_of": AS_OF, "customer_name": "All Customers"}
+    workbook = load_workbook(create_excel_report(data, "", filters, aging_scheme=long_scheme))
+    ws = workbook["SUMMARY MXN"]
+    columns = 4 + len(long_scheme.labels)
+    assert columns > 26
+    assert {str(r) for r in ws.merged_cells.ranges} == {"C1:AC1", "C2:AC2"}
+    assert ws.cell(3, columns).value == long_scheme.labels[-1] + " DAYS"
+    assert ws.cell(4, columns).value == 100.0
+    assert ws.cell(5, columns).value == "=SUM(AC4:AC4)"
+
+
+def test_pdf_with_long_scheme(data, long_scheme):
+    filters = {"as_of": AS_OF, "customer_name": "All Customers"}
+    assert create_pdf_report(data, "", filters, aging_scheme=long_scheme).getvalue().startswith(b"%PDF")
+
+
+def test_filters_cap_boundaries():
+    ReportFilters(as_of=AS_OF, aging_boundaries=list(range(1, MAX_AGING_BOUNDARIES + 1)))
+    with pytest.raises(ValidationError):
+        ReportFilters(as_of=AS_OF, aging_boundaries=list(range(1, MAX_AGING_BOUNDARIES + 2)))
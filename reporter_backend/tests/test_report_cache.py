@@ -0,0 +1,233 @@
+# tests/test_report_cache.py
+import threading
+
+import pytest
+
+from app import shared_cache
+from app.reports import report_cache
+from app.reports.cache_codecs import PLAIN_CODEC
+from app.reports.report_cache import ResultCache, SharedResultCache
+from app.shared_cache import SharedCache, key_hash
+
+
+class Clock:
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(report_cache.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedCache(str(tmp_path / "cache.db"), max_bytes=10_000, lock_seconds=5)
+
+
+# --- ResultCache ---
+def test_result_cache_ttl_and_lru(monotonic):
+    cache = ResultCache(ttl=10, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2, ttl=100)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" era la menos usada
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    monotonic.now += 11
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_result_cache_entry_version_changes_on_put(monotonic):
+    cache = ResultCache(ttl=10)
+    cache.put("k", "v1")
+    version = cache.get_entry("k")[1]
+    assert cache.get_entry("k") == ("v1", version)
+    monotonic.now += 1
+    cache.put("k", "v2")
+    assert cache.get_entry("k")[1] != version
+
+
+def test_result_cache_disabled():
+    cache = ResultCache(ttl=0)
+    cache.put("k", 1)
+    assert cache.get("k") is None
+    assert cache.get_or_load("k", lambda: 2) == 2
+
+
+def test_get_or_load_single_flight():
+    cache = ResultCache(ttl=60)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["value"] * 4 and len(calls) == 1
+
+
+def test_invalidate_by_predicate():
+    cache = ResultCache(ttl=60)
+    for key in (("a", 1), ("a", 2), ("b", 1)):
+        cache.put(key, key)
+    assert cache.invalidate(lambda k: k[0] == "a") == 2
+    assert cache.get(("b", 1)) == ("b", 1)
+    assert cache.invalidate() == 1
+
+
+# --- SharedCache (almacén) ---
+def test_store_expiry(store, wall_clock):
+    expires = store.put("ns", "d1", b"x", ttl=10)
+    assert store.get("ns", "d1") == (b"x", expires)
+    wall_clock.now += 11
+    assert store.get("ns", "d1") is None
+    assert store.count("ns") == 1
+
+
+def test_store_evicts_expired_then_least_read(store, wall_clock):
+    blob = b"x" * 2500
+    store.put("ns", "expired", blob, ttl=1)
+    for name in ("old", "read", "new"):
+        wall_clock.now += 10
+        store.put("ns", name, blob, ttl=600)
+    wall_clock.now += 10
+    # Leer "old" lo vuelve el más reciente
+    assert store.get("ns", "old") is not None
+    wall_clock.now += 10
+    assert store.get("ns", "read") is not None
+    wall_clock.now += 10
+    store.put("ns", "newest", blob, ttl=600)  # 12 500 bytes > 10 000
+
+    remaining = {digest for digest, _ in store.keys("ns")}
+    assert remaining == {"old", "read", "newest"}
+    assert store.count() == 3 and store.evictions == 2
+    assert store.stats()["namespaces"]["ns"]["entries"] == 3
+
+
+def test_store_locks(store, wall_clock):
+    other_worker = SharedCache(store.path, lock_seconds=5)
+    assert store.try_lock("ns", "d")
+    assert not other_worker.try_lock("ns", "d")
+    assert other_worker.is_locked("ns", "d")
+    # Solo el dueño lo libera
+    other_worker.unlock("ns", "d")
+    assert store.is_locked("ns", "d")
+    store.unlock("ns", "d")
+    assert other_worker.try_lock("ns", "d")
+    # Un candado vencido (el worker murió) se puede tomar
+    wall_clock.now += 6
+    assert store.try_lock("ns", "d")
+
+
+# --- SharedResultCache ---
+@pytest.fixture
+def workers(store):
+    """Dos "workers": cachés distintas sobre el mismo almacén."""
+    return (
+        SharedResultCache("plain", PLAIN_CODEC, store, ttl=60, local_ttl=5),
+        SharedResultCache("plain", PLAIN_CODEC, SharedCache(store.path, lock_seconds=5), ttl=60, local_ttl=5),
+    )
+
+
+def test_shared_value_and_version_across_workers(workers):
+    a, b = workers
+    a.put(("k", 1), {"rows": [1, 2]})
+    value, version = b.get_entry(("k", 1))
+    assert value == {"rows": [1, 2]}
+    assert a.get_entry(("k", 1))[1] == version
+    # Copia local de b
+    assert b.get(("k", 1)) is value
+
+
+def test_shared_version_survives_local_expiry(workers, monotonic):
+    a, b = workers
+    a.put("k", [1])
+    version = b.get_entry("k")[1]
+    monotonic.now += 6
+    # b vuelve a decodificar del almacén: misma versión
+    assert b.get_entry("k")[1] == version
+    a.put("k", [2])
+    monotonic.now += 6
+    assert b.get_entry("k") != ([1], version)
+
+
+def test_ttl_override_applies_to_store(workers, store, wall_clock):
+    a, _ = workers
+    a.put("warm", [1], ttl=1500)
+    _, expires = store.get("plain", key_hash("warm"))
+    assert expires == wall_clock.now + 1500
+    assert a.ttl == 5
+
+
+def test_shared_invalidate_across_workers(workers):
+    a, b = workers
+    a.put(("acme", 1), [1])
+    a.put(("other", 1), [2])
+    assert b.invalidate(lambda k: k[0] == "acme") == 1
+    assert b.get(("acme", 1)) is None
+    assert b.get(("other", 1)) == [2]
+
+
+def test_shared_get_or_load_loads_once_across_workers(workers):
+    a, b = workers
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return ["loaded"]
+
+    assert a.get_or_load("k", loader) == ["loaded"]
+    assert b.get_or_load("k", loader) == ["loaded"]
+    assert len(calls) == 1
+
+
+def test_shared_get_or_load_waits_for_other_worker(workers, store):
+    a, b = workers
+    digest = key_hash("k")
+    assert store.try_lock("plain", digest)
+
+    # El worker "a" tiene el candado y guarda el valor un momento después
+    timer = threading.Timer(0.1, lambda: a.put("k", ["from a"]))
+    timer.start()
+    try:
+        assert b.get_or_load("k", lambda: pytest.fail("b should not load")) == ["from a"]
+    finally:
+        timer.cancel()
+        store.unlock("plain", digest)
+
+
+def test_shared_failed_loader_releases_lock(workers, store):
+    a, b = workers
+
+    def failing():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        a.get_or_load("k", failing)
+    assert not store.is_locked("plain", key_hash("k"))
+    assert b.get_or_load("k", lambda: ["ok"]) == ["ok"]
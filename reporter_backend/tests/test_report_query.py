@@ -0,0 +1,119 @@
+# tests/test_report_query.py
+"""La consulta delgada + tablas de términos da lo mismo que la consulta original."""
+
+import datetime
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from app.reports import term_lookups
+from app.reports.aging import get_scheme
+from app.reports.receivables import build_report_query, process_report_data
+from app.reports.term_lookups import apply_term_lookups, get_term_lookups, term_lookups_cache
+from app.sql_server_conn import fetch_all
+from conftest import REPORT_COLUMNS
+
+AS_OF = datetime.date(2025, 12, 31)
+COMPANY = "test_standin"
+
+
+@pytest.fixture(autouse=True)
+def fresh_lookups():
+    term_lookups_cache.invalidate()
+    yield
+    term_lookups_cache.invalidate()
+
+
+def as_tuples(rows):
+    return sorted(
+        (tuple(getattr(row, c) for c in REPORT_COLUMNS) for row in rows),
+        key=lambda t: tuple("" if v is None else str(v) for v in t)
+    )
+
+
+def legacy_and_slim(conn, **filters):
+    legacy_sql, params = build_report_query(AS_OF, slim=False, **filters)
+    slim_sql, slim_params = build_report_query(AS_OF, slim=True, **filters)
+    assert slim_params == params
+    legacy = fetch_all(conn, legacy_sql, params)
+    slim = apply_term_lookups(conn, COMPANY, fetch_all(conn, slim_sql, params))
+    return legacy, slim
+
+
+def largest_customer(conn) -> int:
+    rows = fetch_all(conn, """
+        SELECT BusinessEntityID, COUNT(*) AS n FROM zzReporteSaldoDocuments
+        GROUP BY BusinessEntityID ORDER BY n DESC
+    """)
+    return rows[0].BusinessEntityID
+
+
+@pytest.mark.parametrize("filters", [
+    dict(customer_id=None),
+    dict(customer_id=None, end_date=datetime.date(2025, 6, 30)),
+    dict(customer_id=None, filter_mode="date_range",
+         start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)),
+    dict(customer_id=None, filter_mode="current_month", start_date=datetime.date(2025, 12, 1)),
+], ids=["to_date", "upto", "between", "from"])
+def test_slim_matches_legacy(standin_conn, filters):
+    legacy, slim = legacy_and_slim(standin_conn, **filters)
+    assert legacy
+    assert as_tuples(slim) == as_tuples(legacy)
+
+
+def test_slim_matches_legacy_for_one_customer(standin_conn):
+    legacy, slim = legacy_and_slim(standin_conn, customer_id=largest_customer(standin_conn))
+    assert len({row.BusinessEntityID for row in legacy}) == 1
+    assert as_tuples(slim) == as_tuples(legacy)
+
+
+def test_processed_report_is_identical(standin_conn):
+    legacy, slim = legacy_and_slim(standin_conn, customer_id=None)
+    scheme = get_scheme("due_monthly")
+    dump = lambda rows: {
+        cur: group.model_dump()
+        for cur, group in process_report_data(sorted(rows, key=lambda r: (r.BusinessEntityID, r.Folio)),
+                                              as_of=AS_OF, scheme=scheme).items()
+    }
+    assert dump(slim) == dump(legacy)
+
+
+def test_documents_without_term_use_customer_term(standin_conn):
+    lookups = get_term_lookups(standin_conn, COMPANY)
+    termless = [key for key, value in lookups.doc_terms.items() if value == (None, None)]
+    assert termless
+    # Quedan registrados en la carga: resolverlos no vuelve a consultar
+    assert lookups.fill_missing(standin_conn, termless, COMPANY) == 0
+
+
+def test_new_documents_are_looked_up_once(standin_db, standin_conn, monkeypatch):
+    legacy_sql, params = build_report_query(AS_OF, None, slim=False)
+    slim_sql, _ = build_report_query(AS_OF, None, slim=True)
+    get_term_lookups(standin_conn, COMPANY)
+
+    # Documento nuevo (posterior a la carga) sin término propio
+    db = sqlite3.connect(standin_db)
+    db.execute("""
+        INSERT INTO zzReporteSaldoDocuments
+        SELECT Cliente, BusinessEntityID, Modulo, InvoiceDate, 'NEW-1', ArrivalDate, Referencia, PO,
+               Moneda, TC, SubTotal, Total, Pagado, Saldo
+        FROM zzReporteSaldoDocuments LIMIT 1
+    """)
+    db.commit()
+    db.close()
+
+    queries = []
+    real_fetch_all = term_lookups.fetch_all
+
+    def counting_fetch_all(conn, sql, params=None, name=None, **kwargs):
+        queries.append(name)
+        return real_fetch_all(conn, sql, params, name=name, **kwargs)
+
+    monkeypatch.setattr(term_lookups, "fetch_all", counting_fetch_all)
+    slim = apply_term_lookups(standin_conn, COMPANY, fetch_all(standin_conn, slim_sql, params))
+    apply_term_lookups(standin_conn, COMPANY, fetch_all(standin_conn, slim_sql, params))
+
+    assert queries == ["term_lookups.new_documents"]
+    assert as_tuples(slim) == as_tuples(fetch_all(standin_conn, legacy_sql, params))
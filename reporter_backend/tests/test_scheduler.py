@@ -0,0 +1,133 @@
+# tests/test_scheduler.py
+import asyncio
+import datetime
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from fastapi import HTTPException
+
+from app import scheduler as warmup
+from app.scheduler import CronEntry, WarmupScheduler, parse_schedule
+
+# 2025-12-29 es lunes
+MONDAY = datetime.datetime(2025, 12, 29)
+
+
+def at(day_offset: int, hour: int, minute: int) -> datetime.datetime:
+    return MONDAY + datetime.timedelta(days=day_offset, hours=hour, minutes=minute)
+
+
+def test_parse_fields():
+    entry = CronEntry("*/20 7-19 * * 1-5")
+    assert entry.minutes == {0, 20, 40}
+    assert entry.hours == set(range(7, 20))
+    assert entry.days == set(range(1, 32))
+    assert entry.weekdays == {1, 2, 3, 4, 5}
+    assert CronEntry("0,30 8 1 1,6 *").months == {1, 6}
+    assert CronEntry("0 0 * * 1-7/2").weekdays == {1, 3, 5, 0}
+
+
+def test_aliases_and_sunday_as_seven():
+    assert CronEntry("@daily").matches(at(3, 0, 0))
+    assert CronEntry("@hourly").matches(at(0, 13, 0))
+    sunday = at(-1, 0, 0)
+    assert CronEntry("0 0 * * 7").matches(sunday)
+    assert CronEntry("0 0 * * 0").matches(sunday)
+    assert not CronEntry("@weekdays").matches(sunday)
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *",
+    "60 * * * *",
+    "* 24 * * *",
+    "* * 0 * *",
+    "*/0 * * * *",
+    "5-1 * * * *",
+    "* * * * 8",
+])
+def test_invalid_entries(expression):
+    with pytest.raises(ValueError):
+        CronEntry(expression)
+
+
+@pytest.mark.parametrize("moment, expected", [
+    (at(0, 6, 50), at(0, 7, 0)),
+    (at(0, 7, 0), at(0, 7, 20)),
+    (at(0, 7, 5) + datetime.timedelta(seconds=59), at(0, 7, 20)),
+    (at(0, 19, 40), at(1, 7, 0)),
+    # Viernes en la noche -> lunes
+    (at(4, 19, 45), at(7, 7, 0)),
+])
+def test_next_after(moment, expected):
+    assert CronEntry("*/20 7-19 * * 1-5").next_after(moment) == expected
+
+
+def test_next_after_beyond_horizon():
+    assert CronEntry("0 0 30 2 *").next_after(MONDAY) is None
+    assert CronEntry("0 0 1 1 *").next_after(MONDAY, horizon_days=8) == datetime.datetime(2026, 1, 1)
+
+
+def test_parse_schedule_and_next_run():
+    entries = parse_schedule("45 6 * * 1-5; ;*/20 7-19 * * 1-5")
+    assert [e.expression for e in entries] == ["45 6 * * 1-5", "*/20 7-19 * * 1-5"]
+    upcoming = [e.next_after(at(0, 6, 0)) for e in entries]
+    assert min(upcoming) == at(0, 6, 45)
+
+
+def test_lock_file_is_exclusive(tmp_path):
+    path = str(tmp_path / "warmup.lock")
+    first = warmup._acquire_lock_file(path)
+    assert first is not None
+    assert warmup._acquire_lock_file(path) is None
+    first.close()
+    again = warmup._acquire_lock_file(path)
+    assert again is not None
+    again.close()
+
+
+def test_only_one_scheduler_starts(tmp_path):
+    path = str(tmp_path / "warmup.lock")
+
+    async def scenario():
+        a = WarmupScheduler(parse_schedule("@hourly"), ["growers_union"])
+        b = WarmupScheduler(parse_schedule("@hourly"), ["growers_union"])
+        a.start(lock_path=path)
+        b.start(lock_path=path)
+        assert a.running and not b.running
+        loop_task = a._task
+        await a.stop()
+        assert loop_task.cancelled() and not a.running
+        # Al detenerse libera el candado
+        b.start(lock_path=path)
+        assert b.running
+        await b.stop()
+
+    asyncio.run(scenario())
+
+
+def test_run_once_records_and_skips(monkeypatch):
+    def fake_warm(company_key):
+        if company_key == "empty":
+            raise HTTPException(status_code=404, detail="No data found for the selected filters.")
+        if company_key == "broken":
+            raise RuntimeError("connection refused")
+        return {"documents": 7}
+
+    monkeypatch.setattr(warmup, "warm_company", fake_warm)
+
+    async def scenario():
+        s = WarmupScheduler([], ["ok", "empty", "broken"])
+        records = await s.run_once("manual")
+        async with s._lock:
+            skipped = await s.run_once("schedule")
+        return records, skipped, list(s.runs)
+
+    records, skipped, runs = asyncio.run(scenario())
+    assert [(r["company"], r["status"], r["documents"]) for r in records] == [
+        ("ok", "ok", 7), ("empty", "empty", 0), ("broken", "error", 0)
+    ]
+    assert records[2]["error"] == "connection refused"
+    assert skipped[0]["status"] == "skipped" and skipped[0]["company"] == "ok,empty,broken"
+    assert len(runs) == 4
@@ -0,0 +1,109 @@
+# tests/test_sql_standin.py
+import datetime
+import threading
+
+import pytest
+
+pyodbc = pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from app.sql_standin import split_batch, translate_sql
+
+# Una consulta que tarda lo suficiente para cancelarla o agotar el timeout
+SLOW_SQL = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000)
+    SELECT COUNT(*) FROM n
+"""
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM dbo.orgCustomer", "SELECT * FROM orgCustomer"),
+    ("SELECT ISNULL(c.DeletedBy, 0) FROM t", "SELECT IFNULL(c.DeletedBy, 0) FROM t"),
+    ("SELECT isnull (x, 1) FROM t", "SELECT IFNULL(x, 1) FROM t"),
+    ("SELECT DATEADD(day, 30, d.ArrivalDate) FROM t", "SELECT date(d.ArrivalDate, (30) || ' days') FROM t"),
+    ("SELECT DATEADD(dd, ISNULL(x, 0), COALESCE(a, b)) FROM t",
+     "SELECT date(COALESCE(a, b), (IFNULL(x, 0)) || ' days') FROM t"),
+    ("SELECT TOP 1 a FROM t ORDER BY a;", "SELECT a FROM t ORDER BY a LIMIT 1"),
+    ("SELECT TOP (5) a FROM t", "SELECT a FROM t LIMIT 5"),
+    ("SELECT a FROM t OPTION (RECOMPILE)", "SELECT a FROM t"),
+])
+def test_translate_sql(sql, expected):
+    # Los espacios que quedan de lo que se quitó no importan
+    assert " ".join(translate_sql(sql).split()) == expected
+
+
+def test_translate_sql_rejects_other_dateadd_units():
+    with pytest.raises(ValueError, match="month"):
+        translate_sql("SELECT DATEADD(month, 1, d) FROM t")
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT 1", ["SELECT 1"]),
+    ("SELECT 1; SELECT 2;", ["SELECT 1", "SELECT 2"]),
+    ("SET NOCOUNT ON;\n SELECT 'a;b' AS x ;; SELECT 3", ["SET NOCOUNT ON", "SELECT 'a;b' AS x", "SELECT 3"]),
+    ("SELECT 'it''s; fine'; SELECT 2", ["SELECT 'it''s; fine'", "SELECT 2"]),
+    ("  ;  ", []),
+])
+def test_split_batch(sql, expected):
+    assert split_batch(sql) == expected
+
+
+def test_rows_behave_like_pyodbc_rows(standin_conn):
+    cursor = standin_conn.cursor()
+    cursor.execute("SELECT TOP 1 BusinessEntityID, Folio, ArrivalDate FROM dbo.zzReporteSaldoDocuments")
+    row = cursor.fetchone()
+    assert row[0] == row.BusinessEntityID and row[1:] == (row.Folio, row.ArrivalDate)
+    assert isinstance(row.ArrivalDate, datetime.date)
+    assert len(row) == 3 and list(row) == [row.BusinessEntityID, row.Folio, row.ArrivalDate]
+    row.Folio = "changed"
+    assert row[1] == "changed"
+    assert cursor.fetchone() is None
+
+
+def test_batch_with_parameters_and_nextset(standin_conn):
+    cursor = standin_conn.cursor()
+    cursor.execute(
+        "SET NOCOUNT ON; SELECT ? AS a, ? AS b; SELECT 'x;?' AS c; SELECT ? AS d",
+        [1, 2, 3]
+    )
+    assert [tuple(r) for r in cursor.fetchall()] == [(1, 2)]
+    assert cursor.nextset()
+    assert [tuple(r) for r in cursor.fetchall()] == [("x;?",)]
+    assert cursor.nextset()
+    assert cursor.fetchone().d == 3
+    assert not cursor.nextset()
+
+
+def test_sql_errors_are_pyodbc_errors(standin_conn):
+    with pytest.raises(pyodbc.Error) as exc:
+        standin_conn.cursor().execute("SELECT * FROM missing_table")
+    assert exc.value.args[0] == "42000"
+
+
+def test_timeout_raises_hyt00(standin_conn):
+    standin_conn.timeout = 0.05
+    with pytest.raises(pyodbc.Error) as exc:
+        standin_conn.cursor().execute(SLOW_SQL).fetchall()
+    assert exc.value.args[0] == "HYT00"
+    # La conexión sigue usable
+    standin_conn.timeout = 0
+    assert standin_conn.cursor().execute("SELECT 1 AS one").fetchone().one == 1
+
+
+def test_cancel_raises_hy008(standin_conn):
+    cursor = standin_conn.cursor()
+    timer = threading.Timer(0.05, cursor.cancel)
+    timer.start()
+    try:
+        with pytest.raises(pyodbc.Error) as exc:
+            cursor.execute(SLOW_SQL).fetchall()
+    finally:
+        timer.cancel()
+    assert exc.value.args[0] == "HY008"
+
+
+def test_opening_missing_file_fails(tmp_path):
+    from app import sql_standin
+
+    with pytest.raises(pyodbc.Error) as exc:
+        sql_standin.connect(str(tmp_path / "nope.db"))
+    assert exc.value.args[0] == "08001"
@@ -0,0 +1,107 @@
+# tests/test_statements.py
+import datetime
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from app.cancellation import CancelToken
+from app.reports import statements
+from app.reports.aging import get_scheme
+from app.reports.customer_index import customer_index_cache
+from app.reports.report_cache import customer_credit_cache, report_rows_cache
+from app.reports.report_schemas import ReportFilters
+from app.reports.statements import build_statement_jobs, iter_statements_zip, statement_filename
+from app.reports.term_lookups import term_lookups_cache
+
+SCHEME = get_scheme("standard")
+AS_OF = datetime.date(2025, 12, 31)
+
+
+def fake_jobs(n: int):
+    return [
+        {"customer_id": i, "filename": f"Statement_{i}.pdf", "groups_blob": b"", "filters": {}, "credit_info": None}
+        for i in range(1, n + 1)
+    ]
+
+
+def read_zip(chunks) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """Sustituye la generación del PDF; el cliente 2 falla."""
+    calls = []
+
+    def render(customer_id, groups_blob, filters, credit_info, scheme):
+        calls.append(customer_id)
+        if customer_id == 2:
+            raise ValueError("bad data")
+        return customer_id, f"%PDF {customer_id}".encode()
+
+    monkeypatch.setattr(statements, "render_statement", render)
+    return calls
+
+
+def test_failed_statement_goes_to_errors_file(rendered):
+    archive = read_zip(iter_statements_zip(fake_jobs(3), SCHEME, workers=0))
+    assert archive.namelist() == ["Statement_1.pdf", "Statement_3.pdf", "_errors.txt"]
+    assert archive.read("Statement_3.pdf") == b"%PDF 3"
+    assert archive.read("_errors.txt").decode() == "Statement_2.pdf: bad data\n"
+    assert rendered == [1, 2, 3]
+
+
+def test_streams_one_chunk_per_statement(rendered):
+    chunks = list(iter_statements_zip(fake_jobs(3), SCHEME, workers=0))
+    # Un trozo por estado más el cierre del ZIP
+    assert len(chunks) == 4 and all(chunks[:1])
+
+
+def test_cancel_stops_remaining_statements(rendered):
+    cancel = CancelToken()
+    stream = iter_statements_zip(fake_jobs(5), SCHEME, cancel=cancel, workers=0)
+    next(stream)
+    cancel.cancel()
+    assert list(stream) == []
+    assert rendered == [1]
+
+
+def test_no_errors_file_when_all_succeed(monkeypatch):
+    monkeypatch.setattr(statements, "render_statement", lambda customer_id, *args: (customer_id, b"%PDF"))
+    archive = read_zip(iter_statements_zip(fake_jobs(2), SCHEME, workers=0))
+    assert archive.namelist() == ["Statement_1.pdf", "Statement_2.pdf"]
+
+
+def test_statement_filename():
+    assert statement_filename(7, "Agro Fresh S.A. de C.V.", AS_OF) == "Statement_Agro_Fresh_S.A._de_C.V._7_20251231.pdf"
+    assert statement_filename(7, "", AS_OF) == "Statement_Customer_7_20251231.pdf"
+    assert statement_filename(7, "../../etc/passwd", AS_OF) == "Statement_.._.._etc_passwd_7_20251231.pdf"
+
+
+@pytest.fixture
+def clean_caches():
+    caches = (report_rows_cache, term_lookups_cache, customer_credit_cache, customer_index_cache)
+    for cache in caches:
+        cache.invalidate()
+    yield
+    for cache in caches:
+        cache.invalidate()
+
+
+def test_statements_from_standin(standin_conn, clean_caches):
+    filters = ReportFilters(as_of=AS_OF, customer_id=123, customer_name="ignored")
+    jobs = build_statement_jobs(standin_conn, "test_standin", filters, SCHEME)
+    customers = {row.BusinessEntityID for row in standin_conn.cursor().execute(
+        "SELECT DISTINCT BusinessEntityID FROM zzReporteSaldoDocuments"
+    ).fetchall()}
+    assert {job["customer_id"] for job in jobs} == customers
+    assert all(job["filters"]["customer_id"] == job["customer_id"] for job in jobs)
+    # El crédito es opcional: quien no tiene registro sale sin él
+    assert any(job["credit_info"] is not None for job in jobs)
+
+    archive = read_zip(iter_statements_zip(jobs[:2], SCHEME, workers=0))
+    assert sorted(archive.namelist()) == sorted(job["filename"] for job in jobs[:2])
+    assert all(archive.read(name).startswith(b"%PDF") for name in archive.namelist())
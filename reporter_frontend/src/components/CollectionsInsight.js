@@ -1,62 +1,29 @@
 // src/components/CollectionsInsight.js
 import React from 'react';
 
-const CollectionsInsight = ({ reportData }) => {
-    if (!reportData || !reportData.data_by_currency) return null;
+// `kpis` es la respuesta de POST /api/reports/receivables-kpis (agregados ya calculados
+// en el servidor). Pide el esquema "monthly" para obtener los rangos 0-30/31-60/61-90/90+.
+const CollectionsInsight = ({ kpis }) => {
+    if (!kpis || !kpis.currencies) return null;
 
-    // Aggregate data across all currencies
-    let total0_30 = 0;
-    let total31_60 = 0;
-    let total61_90 = 0;
-    let total90Plus = 0;
-    let totalBalance = 0;
+    const labels = kpis.aging_scheme.labels;
+    const bucketKeys = kpis.aging_scheme.bucket_keys;
+
+    // Sum across currencies (raw values, not FX-normalized)
+    const bucketTotals = bucketKeys.map(() => 0);
     let expectedThisWeek = 0;
     let scheduledToday = 0;
 
-    // Helper to check if date is in this week
-    const isThisWeek = (dateStr) => {
-        const today = new Date();
-        const due = new Date(dateStr);
-        const diffTime = due - today;
-        const diffDays = Math.ceil(diffTime / (1000 * 60 * 60 * 24));
-        return diffDays >= 0 && diffDays <= 7;
-    };
-
-    Object.keys(reportData.data_by_currency).forEach(cur => {
-        const group = reportData.data_by_currency[cur];
-        const totals = group.totals;
-
-        // Sum buckets (converting to a common base if needed, but for visual breakdown raw sum is okay for now or we assume dominant currency)
-        // Ideally we should normalize, but for this view we'll just sum raw values for simplicity unless multi-currency logic is strict
-        total0_30 += (totals.bucket_0_21 || 0) + (totals.bucket_22_30 || 0);
-        total31_60 += totals.bucket_31_45 || 0;
-        total61_90 += 0; // The API might not split 61-90 specifically, usually it's 45+. We'll map 45+ to 61-90 for now or adjust based on available fields
-        total90Plus += totals.bucket_45_plus || 0; // Mapping 45+ here for now
-
-        totalBalance += totals.balance;
-
-        // Calculate expected payments from entries
-        if (group.entries) {
-            group.entries.forEach(entry => {
-                if (isThisWeek(entry.due_date)) {
-                    expectedThisWeek += entry.balance;
-                }
-                if (new Date(entry.due_date).toDateString() === new Date().toDateString()) {
-                    scheduledToday += entry.balance;
-                }
-            });
-        }
+    kpis.currencies.forEach(cur => {
+        bucketKeys.forEach((key, i) => {
+            bucketTotals[i] += cur.buckets[key] || 0;
+        });
+        expectedThisWeek += cur.expected_this_week;
+        scheduledToday += cur.scheduled_today;
     });
 
-    // Adjust buckets logic if API only gives 45+
-    // Since we only have bucket_45_plus, we'll put it in 90+ for visual impact or split it if we had more data.
-    // For this UI, let's map:
-    // 0-30 -> bucket_0_21 + bucket_22_30
-    // 31-60 -> bucket_31_45
-    // 61-90 -> (Empty or estimated)
-    // 90+ -> bucket_45_plus (Since that's the highest bucket we have)
-
-    const maxVal = Math.max(total0_30, total31_60, total90Plus, 1);
+    const maxVal = Math.max(...bucketTotals, 1);
+    const barColors = ['bg-success', 'bg-primary', 'bg-warning', 'bg-danger'];
 
     return (
         <aside className="w-80 bg-surface border-l border-border flex flex-col h-full shrink-0">
@@ -86,27 +53,15 @@ const CollectionsInsight = ({ reportData }) => {
                 <div>
                     <h4 className="text-xs font-bold text-text-sub uppercase tracking-widest mb-4">Aging Breakdown (Global)</h4>
                     <div className="space-y-3">
-                        <div className="flex items-center gap-3">
-                            <span className="text-[10px] w-8 font-bold text-text-sub">0-30</span>
-                            <div className="flex-1 h-2 bg-background rounded-full overflow-hidden">
-                                <div className="h-full bg-success" style={{ width: `${(total0_30 / maxVal) * 100}%` }}></div>
+                        {labels.map((label, i) => (
+                            <div key={label} className="flex items-center gap-3">
+                                <span className="text-[10px] w-8 font-bold text-text-sub">{label}</span>
+                                <div className="flex-1 h-2 bg-background rounded-full overflow-hidden">
+                                    <div className={`h-full ${barColors[Math.min(i, barColors.length - 1)]}`} style={{ width: `${(bucketTotals[i] / maxVal) * 100}%` }}></div>
+                                </div>
+                                <span className="text-[10px] font-mono text-text-sub">${(bucketTotals[i] / 1000).toFixed(0)}k</span>
                             </div>
-                            <span className="text-[10px] font-mono text-text-sub">${(total0_30 / 1000).toFixed(0)}k</span>
-                        </div>
-                        <div className="flex items-center gap-3">
-                            <span className="text-[10px] w-8 font-bold text-text-sub">31-45</span>
-                            <div className="flex-1 h-2 bg-background rounded-full overflow-hidden">
-                                <div className="h-full bg-primary" style={{ width: `${(total31_60 / maxVal) * 100}%` }}></div>
-                            </div>
-                            <span className="text-[10px] font-mono text-text-sub">${(total31_60 / 1000).toFixed(0)}k</span>
-                        </div>
-                        <div className="flex items-center gap-3">
-                            <span className="text-[10px] w-8 font-bold text-text-sub">45+</span>
-                            <div className="flex-1 h-2 bg-background rounded-full overflow-hidden">
-                                <div className="h-full bg-danger" style={{ width: `${(total90Plus / maxVal) * 100}%` }}></div>
-                            </div>
-                            <span className="text-[10px] font-mono text-text-sub">${(total90Plus / 1000).toFixed(0)}k</span>
-                        </div>
+                        ))}
                     </div>
                 </div>
 
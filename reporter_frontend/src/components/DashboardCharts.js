@@ -13,9 +13,7 @@ const COLORS_CURRENCY = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042'];
 const CustomizedTreemapContent = (props) => {
     const { x, y, width, height, name, value } = props;
 
-    // --- PRUEBA DE DEBUG: TODO ROJO ---
-    // Si ves esto rojo, los cambios SI se están aplicando.
-    const fillColor = '#ff0000';
+    const fillColor = '#3b82f6';
     const strokeColor = '#ffffff';
 
     // Solo mostramos texto si el cuadro es suficientemente grande
@@ -31,7 +29,7 @@ const CustomizedTreemapContent = (props) => {
                 rx={4}
                 ry={4}
                 style={{
-                    fill: fillColor, // <--- AQUÍ ESTÁ EL ROJO FORZADO
+                    fill: fillColor,
                     stroke: strokeColor,
                     strokeWidth: 2,
                 }}
@@ -70,7 +68,6 @@ const CustomTooltip = ({ active, payload }) => {
         const data = payload[0].payload;
         return (
             <div style={{ backgroundColor: '#fff', padding: '10px', border: '1px solid #ccc', borderRadius: '5px' }}>
-                <p style={{ fontWeight: 'bold', margin: 0, color: 'red' }}>MODO PRUEBA (TODO ROJO)</p>
                 <p style={{ fontWeight: 'bold', margin: 0 }}>{data.name}</p>
                 <p style={{ margin: 0 }}>Total Debt: <b>${data.value.toLocaleString()}</b></p>
             </div>
@@ -79,30 +76,23 @@ const CustomTooltip = ({ active, payload }) => {
     return null;
 };
 
-const DashboardCharts = ({ reportData }) => {
-    if (!reportData || !reportData.data_by_currency) return null;
+// `kpis` es la respuesta de POST /api/reports/receivables-kpis?top_n=30.
+// El ranking de clientes ya viene calculado y ordenado desde el servidor.
+const DashboardCharts = ({ kpis }) => {
+    if (!kpis || !kpis.currencies) return null;
 
-    const currencyData = Object.keys(reportData.data_by_currency).map(currencyCode => ({
-        name: currencyCode,
-        value: reportData.data_by_currency[currencyCode].totals.balance
+    const currencyData = kpis.currencies.map(cur => ({
+        name: cur.currency,
+        value: cur.balance
     }));
 
-    let allCustomers = [];
-    Object.keys(reportData.data_by_currency).forEach(currency => {
-        const group = reportData.data_by_currency[currency];
-        Object.entries(group.aging_summary).forEach(([custName, summary]) => {
-            if (summary.total_balance > 1) {
-                allCustomers.push({
-                    name: custName,
-                    value: summary.total_balance,
-                    bucket_31_45: summary.bucket_31_45,
-                    bucket_45_plus: summary.bucket_45_plus,
-                });
-            }
-        });
-    });
+    const allCustomers = kpis.top_customers
+        .filter(c => c.total_balance > 1)
+        .map(c => ({
+            name: c.customer_name,
+            value: c.total_balance,
+        }));
 
-    allCustomers.sort((a, b) => b.value - a.value);
     const treemapData = allCustomers.slice(0, 30);
     const top10Data = allCustomers.slice(0, 10);
 
@@ -143,9 +133,9 @@ const DashboardCharts = ({ reportData }) => {
                 </div>
             </div>
 
-            {/* TREEMAP - ZONA DE PRUEBAS */}
+            {/* TREEMAP */}
             <div className="treemap-card" style={{ height: '500px', padding: '10px' }}>
-                <h3 className="chart-title" style={{ color: 'red' }}>Mapa de Riesgo (PRUEBA DE COLOR)</h3>
+                <h3 className="chart-title">Risk Map</h3>
 
                 <ResponsiveContainer width="100%" height="85%">
                     <Treemap
@@ -7,6 +7,13 @@ import MainLayout from './MainLayout';
 import ReportsFilter from './ReportsFilter';
 import ReportsSummary from './ReportsSummary';
 import ReportsDetails from './ReportsDetails';
+import DashboardCharts from './DashboardCharts';
+import CollectionsInsight from './CollectionsInsight';
+
+// KPIs agregados en el servidor para los widgets del resumen: CollectionsInsight
+// usa los rangos del esquema "monthly" y DashboardCharts el top 30 de clientes
+const fetchKpis = (filters) =>
+  axios.post('/api/reports/receivables-kpis?top_n=30', { ...filters, aging_scheme: 'monthly' });
 
 const downloadFile = async (url, filters, defaultFilename) => {
   try {
@@ -38,6 +45,10 @@ function ReportsPage() {
   // Datos FILTRADOS (Solo para Detalles)
   const [filteredReportData, setFilteredReportData] = useState(null);
 
+  // KPIs del resumen (global y, después de filtrar, del filtro)
+  const [globalKpis, setGlobalKpis] = useState(null);
+  const [filteredKpis, setFilteredKpis] = useState(null);
+
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
   const [activeTab, setActiveTab] = useState('summary');
@@ -60,8 +71,16 @@ function ReportsPage() {
           end_date: formattedToday
         };
 
-        const response = await axios.post('/api/reports/receivables-preview', globalFilters);
+        const [response, kpisResponse] = await Promise.all([
+          axios.post('/api/reports/receivables-preview', globalFilters),
+          fetchKpis(globalFilters).catch((e) => {
+            // Sin KPIs el resumen se muestra igual, solo sin los widgets
+            console.error("Error fetching global KPIs", e);
+            return null;
+          })
+        ]);
         setGlobalSummaryData(response.data);
+        setGlobalKpis(kpisResponse ? kpisResponse.data : null);
       } catch (e) {
         console.error("Error fetching global summary", e);
       }
@@ -74,13 +93,21 @@ function ReportsPage() {
     setIsLoading(true);
     setError('');
     setFilteredReportData(null);
+    setFilteredKpis(null);
 
     // Cambiar a pestaña Detalles automáticamente para ver el resultado
     if (activeTab === 'summary') setActiveTab('details');
 
     try {
-      const response = await axios.post('/api/reports/receivables-preview', filters);
+      const [response, kpisResponse] = await Promise.all([
+        axios.post('/api/reports/receivables-preview', filters),
+        fetchKpis(filters).catch((e) => {
+          console.error("Error fetching KPIs", e);
+          return null;
+        })
+      ]);
       setFilteredReportData(response.data);
+      setFilteredKpis(kpisResponse ? kpisResponse.data : null);
       setIsLoading(false);
     } catch (err) {
       setError(err.response?.data?.detail || 'Error running report');
@@ -135,7 +162,13 @@ function ReportsPage() {
         {activeTab === 'summary' && (
           /* Usa filteredReportData si existe, sino globalSummaryData */
           (filteredReportData || globalSummaryData) ? (
-            <ReportsSummary reportData={filteredReportData || globalSummaryData} />
+            <div className="flex gap-4 items-stretch">
+              <div className="flex-1 min-w-0 space-y-4">
+                <ReportsSummary reportData={filteredReportData || globalSummaryData} />
+                <DashboardCharts kpis={filteredReportData ? filteredKpis : globalKpis} />
+              </div>
+              <CollectionsInsight kpis={filteredReportData ? filteredKpis : globalKpis} />
+            </div>
           ) : (
             <div className="p-4 text-text-sub font-mono text-sm">Loading Summary...</div>
           )